@@ -0,0 +1,114 @@
+"""Băm/kiểm tra mật khẩu trong pool worker giới hạn, kèm rehash khi đổi tham số.
+
+scrypt/pbkdf2 tốn CPU (và RAM với scrypt) trên Pi 4. Khi nhiều người đăng
+nhập cùng lúc (đổi ca), để mỗi thread Flask tự băm sẽ chiếm hết core và làm
+chậm ``/api/status``. Ở đây:
+
+- chỉ ``HASH_WORKERS`` phép băm chạy song song (hashlib nhả GIL khi băm, nên
+  các thread Flask khác vẫn chạy trên core còn lại)
+- tối đa ``HASH_MAX_PENDING`` yêu cầu được nhận (đang chạy + đang chờ); quá số
+  đó => ``HasherBusy`` ngay lập tức (route trả 503 + Retry-After) thay vì xếp
+  hàng vô hạn; chờ quá ``HASH_TIMEOUT`` cũng => ``HasherBusy``, và chỗ chỉ
+  được trả khi phép băm đó thật sự xong
+- tham số băm lấy từ ``AuthConfig.PASSWORD_HASH_METHOD``; hash cũ khác tham số
+  được băm lại sau khi đăng nhập đúng (``needs_rehash``)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import AuthConfig
+
+
+class HasherBusy(RuntimeError):
+    """Quá nhiều yêu cầu băm mật khẩu đang chờ."""
+
+
+_methods: dict = {}
+_methods_lock = threading.Lock()
+
+
+def hash_method() -> str:
+    """Phương thức băm đang cấu hình."""
+    return os.getenv("PASSWORD_HASH_METHOD") or AuthConfig.PASSWORD_HASH_METHOD
+
+
+def _canonical(method: str) -> str:
+    """Dạng đầy đủ của ``method`` như trong hash (ví dụ 'scrypt' -> 'scrypt:32768:8:1')."""
+    with _methods_lock:
+        if method not in _methods:
+            # Werkzeug tự điền tham số mặc định: băm thử một lần để biết (chỉ lần đầu)
+            _methods[method] = generate_password_hash("", method=method).split("$", 1)[0]
+        return _methods[method]
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """Hash được tạo với tham số khác cấu hình hiện tại."""
+    return password_hash.split("$", 1)[0] != _canonical(hash_method())
+
+
+class PasswordHasher:
+    """Pool băm mật khẩu có giới hạn đồng thời và kiểm soát tiếp nhận."""
+
+    def __init__(
+        self,
+        workers: int = AuthConfig.HASH_WORKERS,
+        max_pending: int = AuthConfig.HASH_MAX_PENDING,
+        timeout: float = AuthConfig.HASH_TIMEOUT,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._admission = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.stats = {"verified": 0, "hashed": 0, "rejected": 0, "timed_out": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._admission.acquire(blocking=False):
+            self.stats["rejected"] += 1
+            raise HasherBusy("Hệ thống đang bận xử lý đăng nhập, vui lòng thử lại")
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._admission.release()
+            raise
+        # Trả chỗ khi phép băm thật sự xong (hoặc bị hủy), không phải khi người gọi thôi chờ
+        future.add_done_callback(lambda _: self._admission.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # Còn trong hàng đợi => bỏ luôn; đang chạy thì để chạy nốt
+            self.stats["timed_out"] += 1
+            raise HasherBusy("Hệ thống đang bận xử lý đăng nhập, vui lòng thử lại") from None
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        result = self._run(check_password_hash, password_hash, password)
+        self.stats["verified"] += 1
+        return result
+
+    def hash(self, password: str) -> str:
+        result = self._run(generate_password_hash, password, hash_method())
+        self.stats["hashed"] += 1
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
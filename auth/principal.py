@@ -0,0 +1,139 @@
+"""User principal gọn cho Flask-Login, có cache TTL + LRU.
+
+``load_user`` chạy ở mọi request đã đăng nhập (dashboard poll ``/api/status``
+liên tục). Thay vì tải cả entity ``User`` mỗi lần, ta giữ ``UserPrincipal``
+(id, username, role, is_active, full_name) trong cache theo process:
+
+- mục hết hạn sau ``PRINCIPAL_CACHE_TTL`` giây (giới hạn độ trễ giữa các process)
+- tối đa ``PRINCIPAL_CACHE_SIZE`` mục, bỏ mục ít dùng nhất
+- khi role, trạng thái, mật khẩu (hoặc tên) của user đổi, mục bị xóa sau commit
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect, select
+
+from config import AuthConfig
+from database.db import db
+from database.models import User
+
+_PENDING_KEY = "principal_cache_evict"
+# Thay đổi các cột này => principal (hoặc quyền truy cập) không còn đúng
+WATCHED_FIELDS = ("username", "role", "is_active", "full_name", "password_hash")
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Người dùng hiện tại (thay cho entity ``User`` trong ``current_user``)."""
+
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    full_name: Optional[str] = None
+
+    # Giao diện Flask-Login
+    is_authenticated = True
+    is_anonymous = False
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+class PrincipalCache:
+    """Cache id -> ``UserPrincipal`` với TTL và LRU, an toàn đa luồng."""
+
+    def __init__(self, maxsize: int = AuthConfig.PRINCIPAL_CACHE_SIZE, ttl: float = AuthConfig.PRINCIPAL_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, UserPrincipal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        """Principal của ``user_id`` (tải từ DB nếu chưa có/hết hạn), None nếu không tồn tại."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        principal = load_principal(user_id)
+        if principal is not None:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Xóa một user (hoặc toàn bộ cache nếu không truyền id)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def load_principal(user_id: int) -> Optional[UserPrincipal]:
+    u = User.__table__.c
+    row = db.session.execute(
+        select(u.id, u.username, u.role, u.is_active, u.full_name).where(u.id == user_id)
+    ).first()
+    return UserPrincipal(*row) if row else None
+
+
+principal_cache = PrincipalCache()
+
+
+# ----------------------------------------------------------------------
+# Invalidation: ghi nhận user thay đổi khi flush, xóa khỏi cache sau commit
+# ----------------------------------------------------------------------
+def _remember(target: User) -> None:
+    session = inspect(target).session
+    if session is not None and target.id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+    # Xóa ngay để request trong cùng process không thấy giá trị cũ lâu hơn cần thiết
+    principal_cache.invalidate(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in WATCHED_FIELDS):
+        _remember(target)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    _remember(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
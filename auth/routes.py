@@ -7,6 +7,7 @@ from flask import flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 
 from auth.forms import LoginForm, RegistrationForm
+from auth.hashing import HasherBusy, needs_rehash, password_hasher
 from database.db import db
 from database.models import User
 
@@ -22,7 +23,18 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data) and user.is_active:
+        try:
+            valid = bool(user) and password_hasher.verify(user.password_hash, form.password.data) and user.is_active
+        except HasherBusy as exc:
+            flash(str(exc), "error")
+            return render_template("auth/login.html", form=form), 503, {"Retry-After": "2"}
+        if valid:
+            if needs_rehash(user.password_hash):
+                # Tham số băm đã đổi: băm lại bằng mật khẩu vừa nhập
+                try:
+                    user.password_hash = password_hasher.hash(form.password.data)
+                except HasherBusy:
+                    pass  # để lần đăng nhập sau
             login_user(user, remember=form.remember_me.data)
             user.last_login = datetime.now(UTC)
             db.session.commit()
@@ -51,7 +63,11 @@ def register():
             role="client",  # Default role
             is_active=True,
         )
-        user.set_password(form.password.data)
+        try:
+            user.password_hash = password_hasher.hash(form.password.data)
+        except HasherBusy as exc:
+            flash(str(exc), "error")
+            return render_template("auth/register.html", form=form), 503, {"Retry-After": "2"}
         db.session.add(user)
         db.session.commit()
         flash("Đăng ký thành công! Vui lòng đăng nhập.", "success")
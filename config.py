@@ -63,12 +63,35 @@ class WebConfig:
     HOST = "0.0.0.0"             # Listen on all interfaces
     PORT = 5000                  # Flask default port
     DEBUG = False                # Debug mode (set True for development)
+    STREAM_HEARTBEAT = 15        # Giây giữa hai comment heartbeat trên /api/stream
+    STREAM_RETRY_MS = 3000       # Trình duyệt chờ ngần này trước khi kết nối lại SSE
+    STREAM_MAX_AGE = 600         # Đóng stream sau ngần này giây (client tự nối lại bằng Last-Event-ID)
+    STREAM_BUFFER = 256          # Số delta giữ lại để nối tiếp; cũ hơn => gửi snapshot mới
+    STREAM_TOUCH_INTERVAL = 5    # Chỉ đổi last_update => phát delta tối đa mỗi ngần này giây
+
+
+# Multi-process Web Configuration
+class ServerConfig:
+    SHARED_STATE_NAME = "eparking_state"  # Tên segment shared memory (env SHARED_STATE_NAME)
+    SHARED_STATE_SIZE = 64 * 1024         # Bytes cho JSON state (snapshot ~1 KiB)
+    SHARED_STATE_INTERVAL = 1.0           # Process controller ghi heartbeat/đồng bộ field phụ mỗi ngần này giây
+    SHARED_STATE_POLL = 0.05              # Worker kiểm tra version mới (SSE) mỗi ngần này giây
+    SHARED_STATE_STALE = 5.0              # Heartbeat cũ hơn => worker thử gắn lại segment mới
+    RPC_SOCKET = "/tmp/eparking-controller.sock"  # Unix socket lệnh điều khiển (env CONTROLLER_SOCKET)
+    RPC_TIMEOUT = 5.0                     # Giây chờ controller trả lời một lệnh
+    WORKERS = 1                           # Số process web ở chế độ production (env WEB_WORKERS)
+    THREADS = 16                          # Thread mỗi process (env WEB_THREADS); mỗi stream SSE giữ 1 thread
+    CONNECTION_LIMIT = 200                # Kết nối mở tối đa mỗi process
+    KEEPALIVE_TIMEOUT = 30                # Đóng kết nối keep-alive rảnh sau ngần này giây
+    DRAIN_TIMEOUT = 10.0                  # Chờ request đang chạy tối đa ngần này giây khi SIGTERM
 
 
 # Parking Configuration
 class ParkingConfig:
     TOTAL_SLOTS = 3              # Total parking slots
     SLOT_NAMES = ["Slot 1", "Slot 2", "Slot 3"]
+    LOT_NAME = "Smart E-Parking"  # Tên bãi trên feed công khai /api/public/availability
+    ZONES = {"A": [0, 1, 2]}      # Khu -> index slot thuộc khu đó
 
 
 # Operation Mode Configuration
@@ -78,6 +101,63 @@ class OperationMode:
     DEFAULT_MODE = AUTO          # Chế độ mặc định khi khởi động
 
 
+# Hardware Backend Configuration
+class HardwareConfig:
+    BACKEND = "auto"             # auto (RPi nếu có), rpi, simulated, none
+    SIM_ECHO_LATENCY = 0.00045   # Độ trễ từ TRIG tới lúc ECHO lên HIGH (giây)
+    SIM_DEFAULT_DISTANCE = 120.0 # Khoảng cách mô phỏng mặc định (cm)
+    SIM_POLL_COST = 0.000002     # Chi phí mỗi lần đọc GPIO trên đồng hồ ảo (giây)
+    SIM_I2C_FREQUENCY = 100_000  # Tốc độ bus I2C mô phỏng (Hz)
+
+
+# Authentication Configuration
+class AuthConfig:
+    PRINCIPAL_CACHE_SIZE = 1024  # Số user giữ trong cache load_user (LRU)
+    PRINCIPAL_CACHE_TTL = 60     # Giây; thay đổi từ process khác có hiệu lực chậm nhất sau ngần này
+    # Tham số băm mật khẩu (werkzeug), mặc định như werkzeug (scrypt N=2^15, ~32 MiB
+    # RAM mỗi lần băm). Máy yếu có thể hạ bằng env, ví dụ PASSWORD_HASH_METHOD=scrypt:16384:8:1;
+    # lưu ý hash cũ sẽ được băm lại theo tham số mới ở lần đăng nhập sau.
+    PASSWORD_HASH_METHOD = "scrypt"
+    HASH_WORKERS = 2             # Số phép băm chạy song song (để dành core cho API khác)
+    HASH_MAX_PENDING = 8         # Đang chạy + đang chờ; quá số này => 503
+    HASH_TIMEOUT = 10            # Giây chờ tối đa một phép băm
+
+
+# SQLite Storage Configuration (database/storage.py)
+class StorageConfig:
+    ENABLED = True               # Áp dụng pragma/pool cho SQLite trên đĩa
+    JOURNAL_MODE = "WAL"         # Người đọc không bị chặn bởi người ghi
+    SYNCHRONOUS = "NORMAL"       # Đủ an toàn với WAL, ít fsync hơn FULL
+    BUSY_TIMEOUT_MS = 5000       # Chờ khóa ghi tối đa 5s thay vì lỗi ngay
+    MMAP_SIZE = 64 * 1024 * 1024 # Đọc qua mmap (bytes)
+    CACHE_SIZE_KB = 8192         # Page cache mỗi kết nối (KiB)
+    SPLIT_READS = True           # Pool kết nối chỉ-đọc riêng cho SELECT
+    READ_POOL_SIZE = 4
+    READ_POOL_OVERFLOW = 4
+    WRITER_POOL_TIMEOUT = 30     # Chờ kết nối ghi duy nhất (giây)
+    CHECKPOINT_INTERVAL = 300    # Chu kỳ wal_checkpoint/incremental_vacuum (giây)
+    VACUUM_PAGES = 256           # Số trang trống trả lại mỗi lần
+
+
+# Event Log Store Configuration (database/event_store.py)
+class EventLogConfig:
+    FILENAME = "events.db"       # Tạo cạnh file database chính
+    ARCHIVE_DIR = "event_archive"  # Segment JSONL nén theo ngày
+    BATCH_SIZE = 200             # Ghi ngay khi hàng đợi đủ số sự kiện này
+    FLUSH_INTERVAL = 1.0         # ...hoặc sau tối đa ngần này giây
+    MAX_PENDING = 10_000         # Hàng đợi đầy => bỏ sự kiện cũ nhất
+    BUSY_TIMEOUT_MS = 5000
+    RETENTION_DAYS = 90          # Giữ trong SQLite, cũ hơn thì chuyển sang archive
+    ARCHIVE_RETENTION_DAYS = 730 # Xóa segment archive cũ hơn
+    MAINTENANCE_INTERVAL = 3600  # Chu kỳ kiểm tra retention (giây)
+
+
+# Report / Rollup Configuration
+class ReportConfig:
+    ROLLUP_INTERVAL = 300        # Chu kỳ cập nhật bảng rollup (giây)
+    ROLLUP_CHUNK_DAYS = 7        # Số ngày dựng lại mỗi transaction khi backfill
+
+
 # LCD Display Configuration
 class LCDConfig:
     ROWS = 2
@@ -5,9 +5,10 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from typing import Optional
+from typing import Optional, Sequence
 
 from config import OperationMode, ParkingConfig
+from database.event_store import event_store
 from hardware.actuators.buzzer import Buzzer
 from hardware.actuators.servo import ServoBarrier
 from hardware.display.lcd import LCDDisplay
@@ -44,6 +45,7 @@ class ParkingController:
         
         # Khởi tạo chế độ mặc định
         self.mode_manager.set_mode(OperationMode.DEFAULT_MODE)
+        self._rpc_server = None
 
     def start(self) -> None:
         logger.info("Khởi động ParkingController với %s slot", ParkingConfig.TOTAL_SLOTS)
@@ -59,8 +61,18 @@ class ParkingController:
         self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
         self._heartbeat_thread.start()
 
+    def serve_rpc(self, path: str) -> None:
+        """Nhận lệnh điều khiển từ worker web ở process khác (xem core/rpc.py)."""
+        from .rpc import RpcServer
+
+        self._rpc_server = RpcServer(self, path)
+        self._rpc_server.start()
+
     def stop(self) -> None:
         logger.info("Dừng ParkingController")
+        if self._rpc_server is not None:
+            self._rpc_server.stop()
+            self._rpc_server = None
         self.serial_client.stop()
         if self.servo:
             self.servo.cleanup()
@@ -116,6 +128,13 @@ class ParkingController:
     # --------------------------------------------------------------
     # MANUAL CONTROL METHODS
     # --------------------------------------------------------------
+    def change_mode(self, mode: str, user_id: Optional[int] = None, username: Optional[str] = None) -> bool:
+        """Chuyển chế độ và đồng bộ xuống Arduino."""
+        if not self.mode_manager.set_mode(mode=mode, user_id=user_id, username=username):
+            return False
+        self._sync_mode_to_arduino(mode)
+        return True
+
     def manual_set_gate(self, state: str) -> bool:
         """Điều khiển gate thủ công: 'open' hoặc 'closed' (chỉ trong MANUAL mode)."""
         if state not in ("open", "closed"):
@@ -128,7 +147,7 @@ class ParkingController:
             return False
         
         # Cập nhật state manager
-        self.state_manager.update({"gate": state})
+        self.state_manager.apply_manual(gate=state)
         
         # Gửi command xuống Arduino để điều khiển barrier
         gate_cmd = "BARRIER:OPEN" if state == "open" else "BARRIER:CLOSE"
@@ -157,12 +176,8 @@ class ParkingController:
             logger.warning("Không thể điều khiển slot: đang ở AUTO mode. Chuyển sang MANUAL mode trước.")
             return False
         
-        snapshot = self.state_manager.snapshot()
-        slots = snapshot["slots"].copy()
-        slots[slot_index] = 1 if occupied else 0
-        
         # Cập nhật state
-        self.state_manager.update({"slots": slots})
+        self.state_manager.apply_manual(slots={slot_index: 1 if occupied else 0})
         
         # Gửi command xuống Arduino để cập nhật slot (chỉ Slot 2,3 - Slot 1 từ sensor)
         if slot_index > 0:  # Chỉ gửi cho Slot 2,3 (index 1,2)
@@ -174,6 +189,91 @@ class ParkingController:
         logger.info("Đặt slot %s thủ công: %s (MANUAL mode)", slot_index + 1, "occupied" if occupied else "free")
         return True
 
+    def manual_apply_batch(
+        self,
+        slots: Sequence[Sequence] = (),
+        gate: Optional[str] = None,
+        user_id: Optional[int] = None,
+        username: Optional[str] = None,
+    ) -> dict:
+        """Đặt nhiều slot và gate trong một lần (chỉ trong MANUAL mode).
+
+        ``slots`` là các cặp ``(slot_index, occupied)`` (index từ 0, ``occupied``
+        phải là bool; ``"false"``/``0`` bị từ chối thay vì đoán; một slot chỉ được
+        đặt một lần, các mục lặp lại sau báo lỗi). Mục hợp lệ
+        được áp vào state trong một lần cập nhật, gửi xuống Arduino trong một
+        lần write và ghi một sự kiện; mục lỗi không chặn các mục khác.
+
+        Returns:
+            ``{"ok": bool, "results": [{"target", "slot_id"?, "ok", "error"?}, ...]}``
+            theo đúng thứ tự (slot trước, gate sau).
+        """
+        results = []
+        seen = set()
+        for slot_index, occupied in slots:
+            if not isinstance(slot_index, int) or isinstance(slot_index, bool):
+                results.append({"target": "slot", "slot_id": slot_index, "ok": False, "error": "slot_id phải là số"})
+                continue
+            item = {"target": "slot", "slot_id": slot_index + 1, "ok": False}
+            if not 0 <= slot_index < ParkingConfig.TOTAL_SLOTS:
+                item["error"] = f"Slot {slot_index + 1} không hợp lệ"
+            elif slot_index in seen:
+                # Mục sau không được âm thầm ghi đè mục trước
+                item["error"] = f"Slot {slot_index + 1} bị lặp trong cùng một lệnh"
+            elif not isinstance(occupied, bool):
+                item["error"] = "occupied phải là true hoặc false"
+            else:
+                item.update(ok=True, occupied=occupied)
+                seen.add(slot_index)
+            results.append(item)
+        if gate is not None:
+            item = {"target": "gate", "ok": gate in ("open", "closed")}
+            if not item["ok"]:
+                item["error"] = "Trạng thái gate không hợp lệ, dùng 'open' hoặc 'closed'"
+            results.append(item)
+
+        if not self.mode_manager.can_control_from_web():
+            logger.warning("Không thể điều khiển hàng loạt: đang ở AUTO mode. Chuyển sang MANUAL mode trước.")
+            for item in results:
+                if item["ok"]:
+                    item.update(ok=False, error="Đang ở AUTO mode")
+            return {"ok": False, "results": results}
+
+        slot_values = {
+            item["slot_id"] - 1: 1 if item["occupied"] else 0
+            for item in results if item["ok"] and item["target"] == "slot"
+        }
+        new_gate = gate if gate is not None and results[-1]["ok"] else None
+        if not slot_values and new_gate is None:
+            return {"ok": False, "results": results}
+
+        self.state_manager.apply_manual(slots=slot_values, gate=new_gate)
+
+        # Như manual_set_slot: Slot 1 từ sensor, chỉ gửi command cho Slot 2,3
+        commands = [f"SLOT:{index + 1}:{value}" for index, value in sorted(slot_values.items()) if index > 0]
+        if new_gate is not None:
+            commands.append("BARRIER:OPEN" if new_gate == "open" else "BARRIER:CLOSE")
+            if self.servo and self.mode_manager.is_manual_mode():
+                if new_gate == "open":
+                    self.servo.open()
+                else:
+                    self.servo.close()
+        if commands and not self.serial_client.send_commands(commands):
+            logger.warning("Không thể gửi command hàng loạt xuống Arduino")
+
+        changes = [f"Slot {index + 1}={'occupied' if value else 'free'}" for index, value in sorted(slot_values.items())]
+        if new_gate is not None:
+            changes.append(f"barrier={new_gate}")
+        event_store.append(
+            "manual_control",
+            f"Điều khiển thủ công: {', '.join(changes)}",
+            user_id=user_id,
+            meta={"slots": {str(index + 1): value for index, value in slot_values.items()}, "gate": new_gate,
+                  "username": username},
+        )
+        logger.info("Điều khiển hàng loạt thủ công: %s (MANUAL mode)", ", ".join(changes))
+        return {"ok": all(item["ok"] for item in results), "results": results}
+
     def _update_arduino_lcd(self, line1: str, line2: str) -> None:
         """Cập nhật LCD trên Arduino với format mới."""
         # Format: LCD:UPDATE:line1|line2
@@ -0,0 +1,223 @@
+"""Percentile thời gian đỗ theo slot, theo giờ và theo giờ-trong-tuần bằng quantile sketch.
+
+Mỗi lượt kết thúc (``ParkingService.end_session``) được cộng vào hai sketch:
+- ``hour``: giờ ra (UTC) x slot — để hỏi percentile của một khoảng thời gian bất kỳ
+- ``how``: giờ-trong-tuần lúc vào (0 = Thứ Hai 0h) x slot — hình dạng theo tuần
+
+Job rollup gộp các sketch ``hour`` thành ``day`` để khoảng dài chỉ cần đọc vài
+trăm dòng. Truy vấn gộp các sketch vào một sketch duy nhất nên bộ nhớ không
+phụ thuộc số lượt đỗ trong khoảng.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from config import ParkingConfig
+from core.pricing_engine import HOURS_PER_WEEK, hour_of_week
+from database.db import db
+from database.models import DwellSketch, ParkingSession, RollupWatermark, SessionRollup
+from utils.quantile_sketch import QuantileSketch
+
+SCOPE_HOUR = "hour"
+SCOPE_DAY = "day"
+SCOPE_HOUR_OF_WEEK = "how"
+
+EPOCH = datetime(1970, 1, 1)
+HOURS_PER_DAY = 24
+
+
+def _naive(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        return moment.astimezone(UTC).replace(tzinfo=None)
+    return moment
+
+
+def hour_index(moment: datetime) -> int:
+    """Số giờ (UTC) kể từ epoch."""
+    return int((_naive(moment) - EPOCH).total_seconds() // 3600)
+
+
+def day_index(moment: datetime) -> int:
+    """Số ngày (UTC) kể từ epoch."""
+    return (_naive(moment) - EPOCH).days
+
+
+def _decode(row) -> QuantileSketch:
+    return QuantileSketch.from_bytes(row.data)
+
+
+def record(session: ParkingSession) -> None:
+    """Cộng thời gian đỗ của ``session`` vừa kết thúc vào sketch (trước commit).
+
+    Flush trước để transaction đã giữ khóa ghi của SQLite khi đọc-sửa-ghi sketch,
+    tránh mất cập nhật khi nhiều process cùng kết thúc session.
+    """
+    if session.entry_time is None or session.exit_time is None:
+        return
+    db.session.flush()
+    minutes = session.duration_minutes or 0
+    for scope, bucket in (
+        (SCOPE_HOUR, hour_index(session.exit_time)),
+        (SCOPE_HOUR_OF_WEEK, hour_of_week(_naive(session.entry_time))),
+    ):
+        row = db.session.get(DwellSketch, (scope, bucket, session.slot_id))
+        sketch = _decode(row) if row else QuantileSketch()
+        sketch.add(minutes)
+        if row is None:
+            db.session.add(DwellSketch(scope=scope, bucket=bucket, slot_id=session.slot_id,
+                                       count=sketch.count, data=sketch.to_bytes()))
+        else:
+            row.count = sketch.count
+            row.data = sketch.to_bytes()
+
+
+def merge_days(start: datetime, end: datetime) -> int:
+    """Dựng lại sketch ``day`` trong [start, end) từ sketch ``hour`` (không commit)."""
+    first_day, last_day = day_index(start), day_index(end - timedelta(microseconds=1)) + 1
+    table = DwellSketch.__table__
+    db.session.execute(
+        delete(table).where(table.c.scope == SCOPE_DAY, table.c.bucket >= first_day, table.c.bucket < last_day)
+    )
+    days: Dict[Tuple[int, int], QuantileSketch] = defaultdict(QuantileSketch)
+    hours = select(table.c.bucket, table.c.slot_id, table.c.data).where(
+        table.c.scope == SCOPE_HOUR,
+        table.c.bucket >= first_day * HOURS_PER_DAY,
+        table.c.bucket < last_day * HOURS_PER_DAY,
+    )
+    for row in db.session.execute(hours):
+        days[(row.bucket // HOURS_PER_DAY, row.slot_id)].merge(_decode(row))
+    if days:
+        db.session.execute(insert(table), [
+            {"scope": SCOPE_DAY, "bucket": day, "slot_id": slot_id, "count": sketch.count, "data": sketch.to_bytes()}
+            for (day, slot_id), sketch in days.items()
+        ])
+    return len(days)
+
+
+def rebuild_all() -> int:
+    """Dựng lại toàn bộ sketch ``hour``/``how`` từ ``parking_sessions`` (backfill, không commit).
+
+    Duyệt theo giờ ra nên chỉ giữ sketch của một giờ trong bộ nhớ mỗi lúc.
+    """
+    table = DwellSketch.__table__
+    s = ParkingSession.__table__.c
+    db.session.execute(delete(table).where(table.c.scope.in_((SCOPE_HOUR, SCOPE_HOUR_OF_WEEK))))
+
+    weekly: Dict[Tuple[int, int], QuantileSketch] = defaultdict(QuantileSketch)
+    current_hour: Optional[int] = None
+    hourly: Dict[int, QuantileSketch] = defaultdict(QuantileSketch)
+    written = 0
+
+    def flush_hour() -> None:
+        nonlocal written
+        if hourly:
+            db.session.execute(insert(table), [
+                {"scope": SCOPE_HOUR, "bucket": current_hour, "slot_id": slot_id,
+                 "count": sketch.count, "data": sketch.to_bytes()}
+                for slot_id, sketch in hourly.items()
+            ])
+            written += len(hourly)
+            hourly.clear()
+
+    completed = (
+        select(s.slot_id, s.entry_time, s.exit_time, s.duration_minutes)
+        .where(s.status == "completed", s.entry_time.is_not(None), s.exit_time.is_not(None))
+        .order_by(s.exit_time)
+        .execution_options(yield_per=5000)
+    )
+    for slot_id, entry, exit_time, minutes in db.session.execute(completed):
+        bucket = hour_index(exit_time)
+        if bucket != current_hour:
+            flush_hour()
+            current_hour = bucket
+        hourly[slot_id].add(minutes or 0)
+        weekly[(hour_of_week(entry), slot_id)].add(minutes or 0)
+    flush_hour()
+
+    if weekly:
+        db.session.execute(insert(table), [
+            {"scope": SCOPE_HOUR_OF_WEEK, "bucket": how, "slot_id": slot_id,
+             "count": sketch.count, "data": sketch.to_bytes()}
+            for (how, slot_id), sketch in weekly.items()
+        ])
+    return written + len(weekly)
+
+
+def window_sketch(start: datetime, end: datetime, slot_id: Optional[int] = None) -> QuantileSketch:
+    """Gộp sketch thời gian đỗ cho các lượt ra trong [start, end) (theo giờ tròn).
+
+    Ngày trọn vẹn đã chốt đọc từ sketch ``day``, phần còn lại đọc từ sketch ``hour``.
+    """
+    table = DwellSketch.__table__
+    first_hour, last_hour = hour_index(start), math.ceil((_naive(end) - EPOCH).total_seconds() / 3600)
+    first_day = -(-first_hour // HOURS_PER_DAY)
+    last_day = last_hour // HOURS_PER_DAY
+
+    # Sketch ``day`` chỉ đáng tin cho các ngày rollup đã chốt (trước ngày của watermark)
+    watermark = db.session.get(RollupWatermark, "sessions")
+    last_day = min(last_day, day_index(watermark.watermark)) if watermark else first_day
+
+    ranges = []
+    if first_day < last_day:
+        ranges.append((SCOPE_DAY, first_day, last_day))
+        ranges.append((SCOPE_HOUR, first_hour, first_day * HOURS_PER_DAY))
+        ranges.append((SCOPE_HOUR, last_day * HOURS_PER_DAY, last_hour))
+    else:
+        ranges.append((SCOPE_HOUR, first_hour, last_hour))
+
+    merged = QuantileSketch()
+    for scope, low, high in ranges:
+        if low >= high:
+            continue
+        stmt = select(table.c.data).where(table.c.scope == scope, table.c.bucket >= low, table.c.bucket < high)
+        if slot_id is not None:
+            stmt = stmt.where(table.c.slot_id == slot_id)
+        for (data,) in db.session.execute(stmt.execution_options(yield_per=500)):
+            merged.merge(QuantileSketch.from_bytes(data))
+    return merged
+
+
+def hour_of_week_summaries(slot_id: Optional[int] = None) -> List[dict]:
+    """Percentile thời gian đỗ cho từng giờ trong tuần (toàn bộ lịch sử)."""
+    table = DwellSketch.__table__
+    stmt = select(table.c.bucket, table.c.data).where(table.c.scope == SCOPE_HOUR_OF_WEEK)
+    if slot_id is not None:
+        stmt = stmt.where(table.c.slot_id == slot_id)
+    sketches = [QuantileSketch() for _ in range(HOURS_PER_WEEK)]
+    for bucket, data in db.session.execute(stmt):
+        sketches[bucket].merge(QuantileSketch.from_bytes(data))
+    return [
+        {"hour_of_week": how, "weekday": how // HOURS_PER_DAY, "hour": how % HOURS_PER_DAY, **sketch.summary()}
+        for how, sketch in enumerate(sketches)
+    ]
+
+
+def occupancy_sketch(start: datetime, end: datetime, slot_id: Optional[int] = None) -> QuantileSketch:
+    """Phân bố tỷ lệ lấp đầy (%) theo từng giờ trong [start, end), đọc từ rollup giờ."""
+    r = SessionRollup.__table__.c
+    slots = 1 if slot_id is not None else ParkingConfig.TOTAL_SLOTS
+    start = _naive(start).replace(minute=0, second=0, microsecond=0)
+    end = _naive(end)
+    stmt = (
+        select(r.bucket_start, func.sum(r.occupancy_minutes))
+        .where(r.granularity == "hour", r.bucket_start >= start, r.bucket_start < end)
+        .group_by(r.bucket_start)
+    )
+    if slot_id is not None:
+        stmt = stmt.where(r.slot_id == slot_id)
+
+    sketch = QuantileSketch()
+    hours_with_data = 0
+    for _, minutes in db.session.execute(stmt.execution_options(yield_per=1000)):
+        sketch.add((minutes or 0) / (60 * slots) * 100)
+        hours_with_data += 1
+    total_hours = math.ceil((end - start).total_seconds() / 3600)
+    # Giờ không có dòng rollup = không có xe
+    sketch.add(0, max(total_hours - hours_with_data, 0))
+    return sketch
@@ -0,0 +1,152 @@
+"""Xuất dữ liệu session/nhật ký dạng CSV hoặc NDJSON theo luồng (streaming).
+
+Các hàm ``*_records`` là generator đọc theo khối từ một kết nối riêng (pool
+chỉ-đọc nếu có, xem database/storage.py), không dùng ``db.session`` của
+request, nên không giữ khóa ghi và không cần app context khi Flask lặp
+generator. ``encode`` biến bản ghi thành các khối bytes, tùy chọn nén gzip
+ngay trong luồng; bộ nhớ là hằng số theo số dòng xuất.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from database.event_store import EventStore
+from database.models import ParkingSession, User
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+CHUNK_ROWS = 1000
+FLUSH_BYTES = 64 * 1024
+
+SESSION_COLUMNS = (
+    "id", "slot_id", "user_id", "username", "vehicle_plate", "entry_time", "exit_time",
+    "duration_minutes", "status", "fee_amount", "payment_status", "payment_time", "payment_method",
+)
+LOG_COLUMNS = ("id", "created_at", "event_type", "message", "user_id", "meta_data")
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def session_records(
+    engine: Engine,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    slot_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Sequence[Any]]:
+    """Các dòng ``parking_sessions`` (theo ``SESSION_COLUMNS``, id tăng dần), lọc theo giờ vào."""
+    s = ParkingSession.__table__.c
+    u = User.__table__.c
+    stmt = (
+        select(s.id, s.slot_id, s.user_id, u.username, s.vehicle_plate, s.entry_time, s.exit_time,
+               s.duration_minutes, s.status, s.fee_amount, s.payment_status, s.payment_time, s.payment_method)
+        .select_from(ParkingSession.__table__.outerjoin(User.__table__, s.user_id == u.id))
+        .order_by(s.id)
+    )
+    if start is not None:
+        stmt = stmt.where(s.entry_time >= start)
+    if end is not None:
+        stmt = stmt.where(s.entry_time < end)
+    if slot_id is not None:
+        stmt = stmt.where(s.slot_id == slot_id)
+    if user_id is not None:
+        stmt = stmt.where(s.user_id == user_id)
+    if status:
+        stmt = stmt.where(s.status == status)
+    if payment_status:
+        stmt = stmt.where(s.payment_status == payment_status)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_rows).execute(stmt)
+        for partition in result.partitions():
+            yield from partition
+
+
+def log_records(
+    store: EventStore,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Sequence[Any]]:
+    """Các sự kiện trong kho (theo ``LOG_COLUMNS``, id tăng dần)."""
+    for event in store.iter_events(since=since, until=until, event_type=event_type, chunk=chunk_rows):
+        yield (event.id, event.created_at, event.event_type, event.message, event.user_id, event.meta_data)
+
+
+def _csv_chunks(columns: Sequence[str], records: Iterable[Sequence[Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow([
+            json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else _value(v)
+            for v in record
+        ])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(columns: Sequence[str], records: Iterable[Sequence[Any]]) -> Iterator[str]:
+    lines: List[str] = []
+    size = 0
+    for record in records:
+        line = json.dumps(dict(zip(columns, map(_value, record))), ensure_ascii=False)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= FLUSH_BYTES:
+            yield "\n".join(lines) + "\n"
+            lines, size = [], 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: định dạng gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode(
+    fmt: str,
+    columns: Sequence[str],
+    records: Iterable[Sequence[Any]],
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Khối bytes của file xuất (``fmt`` là 'csv' hoặc 'ndjson')."""
+    if fmt not in FORMATS:
+        raise ValueError("format phải là 'csv' hoặc 'ndjson'")
+    chunks = _csv_chunks(columns, records) if fmt == "csv" else _ndjson_chunks(columns, records)
+    encoded = (chunk.encode("utf-8") for chunk in chunks if chunk)
+    return _gzip(encoded) if compress else encoded
+
+
+def response_headers(name: str, fmt: str, compress: bool) -> Dict[str, str]:
+    """Content-Type + Content-Disposition cho file tải về."""
+    filename = f"{name}.{fmt}" + (".gz" if compress else "")
+    return {
+        "Content-Type": "application/gzip" if compress else f"{FORMATS[fmt]}; charset=utf-8",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Accel-Buffering": "no",
+    }
@@ -7,8 +7,8 @@ from typing import Optional
 
 from config import OperationMode
 from core.state_manager import StateManager
-from database.db import db
-from database.models import SystemLog, User
+from database.event_store import event_store
+from database.models import User
 
 logger = logging.getLogger(__name__)
 
@@ -52,17 +52,12 @@ class ModeManager:
         })
 
         # Log event
-        try:
-            log = SystemLog(
-                event_type="mode_change",
-                message=f"Chuyển sang chế độ {mode.upper()}",
-                user_id=user_id,
-                meta_data={"old_mode": current_mode, "new_mode": mode, "username": username},
-            )
-            db.session.add(log)
-            db.session.commit()
-        except Exception as e:
-            logger.error("Không thể log mode change: %s", e)
+        event_store.append(
+            "mode_change",
+            f"Chuyển sang chế độ {mode.upper()}",
+            user_id=user_id,
+            meta={"old_mode": current_mode, "new_mode": mode, "username": username},
+        )
 
         logger.info("Chế độ đã chuyển từ %s sang %s (bởi user: %s)", current_mode, mode, username)
         return True
@@ -0,0 +1,304 @@
+"""Bảng giá biên dịch sẵn trong bộ nhớ: tra rule theo (thứ, giờ) trong O(1).
+
+Rule đang active được đọc từ DB một lần, biên dịch thành bảng 168 ô
+(7 ngày x 24 giờ) cho giá chung và cho từng user có giá riêng. Bảng chỉ được
+biên dịch lại khi version (lưu trong DB, dùng chung giữa các process) thay đổi.
+
+Tính phí theo khoảng thời gian: mỗi giờ tính tiền (làm tròn lên, bắt đầu từ
+giờ vào) được tính theo rule tính-theo-giờ đang hiệu lực ở ô giờ đó, nên một
+lượt 21h-07h được tách đúng giữa khung đêm và khung ngày. Tổng các ô liên tiếp
+lấy bằng hiệu prefix-sum trên tuần => O(1) bất kể thời gian đỗ dài bao nhiêu.
+Rule ``flat_rate``/``overnight`` là rule theo lượt: nếu thắng ở giờ vào thì
+áp cho cả lượt như trước.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+ALL_TIME_RULE_TYPES = ("flat_rate", "per_hour", "overnight", "custom")
+HOURLY_RULE_TYPES = ("per_hour", "time_based", "custom")
+
+# Giá mặc định khi không có rule nào (giữ như trước đây)
+DEFAULT_FIRST_HOUR_FEE = 10000
+DEFAULT_SUBSEQUENT_HOUR_FEE = 5000
+
+# Version bảng giá dùng chung giữa các process (dòng trong version_counters)
+VERSION_COUNTER = "pricing_rules_version"
+# Process khác kiểm tra version trong DB tối đa mỗi ngần này giây
+REFRESH_INTERVAL = 2.0
+
+
+@dataclass(frozen=True)
+class RuleSpec:
+    """Bản sao bất biến của ``PricingRule`` (tách khỏi ORM session)."""
+
+    id: int
+    name: str
+    rule_type: str
+    priority: int = 0
+    start_hour: Optional[int] = None
+    end_hour: Optional[int] = None
+    days: Optional[FrozenSet[int]] = None  # None = tất cả các ngày
+    first_hour_fee: int = 0
+    subsequent_hour_fee: int = 0
+    flat_rate_fee: int = 0
+    overnight_fee: int = 0
+    user_id: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, rule) -> "RuleSpec":
+        return cls.from_dict({
+            "id": rule.id,
+            "name": rule.name,
+            "rule_type": rule.rule_type,
+            "priority": rule.priority,
+            "start_hour": rule.start_hour,
+            "end_hour": rule.end_hour,
+            "days_of_week": rule.days_of_week,
+            "first_hour_fee": rule.first_hour_fee,
+            "subsequent_hour_fee": rule.subsequent_hour_fee,
+            "flat_rate_fee": rule.flat_rate_fee,
+            "overnight_fee": rule.overnight_fee,
+            "user_id": rule.user_id,
+        })
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RuleSpec":
+        """Tạo từ dict cùng format JSON của ``/api/pricing-rules``."""
+        return cls(
+            id=int(data.get("id") or 0),
+            name=data.get("name") or "",
+            rule_type=data.get("rule_type") or "per_hour",
+            priority=int(data.get("priority") or 0),
+            start_hour=data.get("start_hour"),
+            end_hour=data.get("end_hour"),
+            days=_parse_days(data.get("days_of_week")),
+            first_hour_fee=int(data.get("first_hour_fee") or 0),
+            subsequent_hour_fee=int(data.get("subsequent_hour_fee") or 0),
+            flat_rate_fee=int(data.get("flat_rate_fee") or 0),
+            overnight_fee=int(data.get("overnight_fee") or 0),
+            user_id=data.get("user_id"),
+        )
+
+    def applies_at(self, weekday: int, hour: int) -> bool:
+        """Rule có áp dụng cho xe vào lúc (thứ, giờ) không."""
+        if self.rule_type == "time_based":
+            if self.start_hour is None or self.end_hour is None:
+                return True
+            if self.start_hour > self.end_hour:
+                # Qua đêm: 22h - 6h
+                in_window = hour >= self.start_hour or hour < self.end_hour
+            else:
+                # Trong ngày: 6h - 22h
+                in_window = self.start_hour <= hour < self.end_hour
+            return in_window and (self.days is None or weekday in self.days)
+        return self.rule_type in ALL_TIME_RULE_TYPES
+
+    @property
+    def is_hourly(self) -> bool:
+        return self.rule_type in HOURLY_RULE_TYPES
+
+
+def _parse_days(value) -> Optional[FrozenSet[int]]:
+    if not value:
+        return None
+    days = set()
+    for part in str(value).split(","):
+        part = part.strip()
+        if part.isdigit():
+            days.add(int(part))
+    return frozenset(days)
+
+
+def hour_of_week(moment: datetime) -> int:
+    """Chỉ số ô giờ trong tuần: 0 = Thứ Hai 00h, 167 = Chủ Nhật 23h."""
+    return moment.weekday() * HOURS_PER_DAY + moment.hour
+
+
+def billed_hours(duration_minutes: int) -> int:
+    """Số giờ tính tiền (làm tròn lên)."""
+    return (duration_minutes + 59) // 60
+
+
+class Timeline:
+    """Bảng rule + prefix-sum phí giờ tiếp theo cho một nhóm rule (chung hoặc của 1 user)."""
+
+    __slots__ = ("rules", "rates", "prefix")
+
+    def __init__(self, rules: List[RuleSpec]) -> None:
+        table: List[Optional[RuleSpec]] = [None] * HOURS_PER_WEEK
+        rates: List[int] = [DEFAULT_SUBSEQUENT_HOUR_FEE] * HOURS_PER_WEEK
+        hourly_rules = [r for r in rules if r.is_hourly]
+        for slot in range(HOURS_PER_WEEK):
+            weekday, hour = divmod(slot, HOURS_PER_DAY)
+            # ``rules`` đã sắp theo priority giảm dần => rule đầu tiên khớp thắng
+            table[slot] = next((r for r in rules if r.applies_at(weekday, hour)), None)
+            hourly = next((r for r in hourly_rules if r.applies_at(weekday, hour)), None)
+            if hourly is not None:
+                rates[slot] = hourly.subsequent_hour_fee
+        prefix = [0] * (HOURS_PER_WEEK + 1)
+        for slot, rate in enumerate(rates):
+            prefix[slot + 1] = prefix[slot] + rate
+        self.rules: Tuple[Optional[RuleSpec], ...] = tuple(table)
+        self.rates: Tuple[int, ...] = tuple(rates)
+        self.prefix: Tuple[int, ...] = tuple(prefix)
+
+    def span_cost(self, start_slot: int, hours: int) -> int:
+        """Tổng phí giờ tiếp theo của ``hours`` ô liên tiếp bắt đầu từ ``start_slot``."""
+        if hours <= 0:
+            return 0
+        prefix = self.prefix
+        weeks, rest = divmod(hours, HOURS_PER_WEEK)
+        total = weeks * prefix[HOURS_PER_WEEK]
+        end = start_slot + rest
+        if end <= HOURS_PER_WEEK:
+            return total + prefix[end] - prefix[start_slot]
+        return total + prefix[HOURS_PER_WEEK] - prefix[start_slot] + prefix[end - HOURS_PER_WEEK]
+
+
+class CompiledTariff:
+    """Bảng rule đã biên dịch cho một version của pricing rules."""
+
+    def __init__(self, rules: Iterable[RuleSpec], version: int = 0) -> None:
+        self.version = version
+        self.rules: Tuple[RuleSpec, ...] = tuple(sorted(rules, key=lambda r: (-r.priority, r.id)))
+        global_rules = [r for r in self.rules if r.user_id is None]
+        self._timelines: Dict[Optional[int], Timeline] = {None: Timeline(global_rules)}
+        for user_id in {r.user_id for r in self.rules if r.user_id is not None}:
+            merged = [r for r in self.rules if r.user_id in (None, user_id)]
+            self._timelines[user_id] = Timeline(merged)
+
+    def timeline(self, user_id: Optional[int] = None) -> Timeline:
+        return self._timelines.get(user_id) or self._timelines[None]
+
+    def rule_for(self, moment: datetime, user_id: Optional[int] = None) -> Optional[RuleSpec]:
+        """Rule có priority cao nhất cho xe vào lúc ``moment``."""
+        return self.timeline(user_id).rules[hour_of_week(moment)]
+
+    def price(
+        self,
+        entry_time: datetime,
+        duration_minutes: int,
+        user_id: Optional[int] = None,
+        exit_time: Optional[datetime] = None,
+    ) -> int:
+        """Phí cho khoảng [entry_time, entry_time + duration_minutes)."""
+        hours = billed_hours(duration_minutes or 0)
+        if hours == 0:
+            return 0
+        timeline = self.timeline(user_id)
+        start_slot = hour_of_week(entry_time)
+        rule = timeline.rules[start_slot]
+
+        if rule is not None and rule.rule_type == "flat_rate":
+            # Đồng giá
+            return rule.flat_rate_fee or 0
+
+        if rule is not None and rule.rule_type == "overnight":
+            # Qua đêm: tính theo số đêm nếu vào và ra khác ngày
+            exit_time = exit_time or entry_time + timedelta(minutes=duration_minutes)
+            nights = exit_time.toordinal() - entry_time.toordinal()
+            if nights > 0:
+                return (nights + 1) * (rule.overnight_fee or 0)
+            return (rule.first_hour_fee or 0) + (hours - 1) * (rule.subsequent_hour_fee or 0)
+
+        # Theo giờ: giờ đầu theo rule lúc vào, các giờ sau theo rule của từng ô giờ
+        first_hour_fee = DEFAULT_FIRST_HOUR_FEE if rule is None else (rule.first_hour_fee or 0)
+        return first_hour_fee + timeline.span_cost((start_slot + 1) % HOURS_PER_WEEK, hours - 1)
+
+
+class PricingEngine:
+    """Giữ ``CompiledTariff`` hiện hành, biên dịch lại khi version tăng.
+
+    Version nằm trong DB (dòng ``VERSION_COUNTER`` của ``version_counters``) để
+    mọi process - controller, worker web, script - cùng thấy khi rule đổi:
+    API pricing-rules gọi ``stage()`` trong transaction sửa rule, rồi
+    ``invalidate()`` sau commit. Process khác đọc lại counter tối đa mỗi
+    ``refresh_interval`` giây (một SELECT theo khóa chính).
+    """
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+        self._version = 0  # Giá trị counter trong DB lần đọc gần nhất
+        self._generation = 0  # Số lần invalidate() trong process này
+        self._checked_at: Optional[float] = None
+        self._compiled: Optional[Tuple[Tuple[int, int], CompiledTariff]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Version dùng chung giữa các process (dùng cho ETag)."""
+        self._refresh_version()
+        return self._version
+
+    def stage(self) -> None:
+        """Tăng version dùng chung trong transaction hiện tại (gọi trước ``db.session.commit()``)."""
+        from sqlalchemy import insert, update
+
+        from database.db import db
+        from database.models import VersionCounter
+
+        table = VersionCounter.__table__
+        result = db.session.execute(
+            update(table).where(table.c.name == VERSION_COUNTER).values(value=table.c.value + 1)
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(table).values(name=VERSION_COUNTER, value=1))
+
+    def invalidate(self) -> int:
+        """Bỏ bảng đã biên dịch và đọc lại version ở lần dùng tới (gọi sau commit)."""
+        with self._lock:
+            self._generation += 1
+            self._checked_at = None
+            return self._generation
+
+    def _refresh_version(self) -> None:
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < self.refresh_interval:
+            return
+        from sqlalchemy import select
+
+        from database.db import db
+        from database.models import VersionCounter
+
+        table = VersionCounter.__table__
+        value = db.session.execute(select(table.c.value).where(table.c.name == VERSION_COUNTER)).scalar()
+        with self._lock:
+            self._version = int(value or 0)
+            if self._checked_at is checked_at:
+                self._checked_at = now
+
+    def tariff(self) -> CompiledTariff:
+        """Bảng giá hiện hành; chỉ đọc rule từ DB khi version đã đổi."""
+        self._refresh_version()
+        compiled = self._compiled
+        if compiled is not None and compiled[0] == (self._version, self._generation):
+            return compiled[1]
+        with self._lock:
+            key = (self._version, self._generation)
+            if self._compiled is None or self._compiled[0] != key:
+                self._compiled = (key, CompiledTariff(self._load_rules(), self._version))
+                logger.info(
+                    "Đã biên dịch bảng giá version %s (%s rule)", self._version, len(self._compiled[1].rules)
+                )
+            return self._compiled[1]
+
+    @staticmethod
+    def _load_rules() -> List[RuleSpec]:
+        from database.models import PricingRule
+
+        return [RuleSpec.from_model(r) for r in PricingRule.query.filter_by(is_active=True).all()]
+
+
+pricing_engine = PricingEngine()
@@ -0,0 +1,307 @@
+"""Mô phỏng "nếu đổi bảng giá thì sao" trên các session đã có trong quá khứ.
+
+Các session đã hoàn tất trong một khoảng thời gian được nạp một lần thành các
+mảng cột (ô giờ lúc vào, số phút, số đêm, phí đã thu). Mỗi bộ rule ứng viên
+được biên dịch thành ``CompiledTariff`` rồi tính phí cả mảng bằng
+``VectorTariff``; nhiều ứng viên được chạy song song trên các core bằng
+``ProcessPoolExecutor`` (dữ liệu lịch sử chỉ gửi sang mỗi worker một lần).
+Không ghi gì vào DB: phí thật của các session giữ nguyên.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from core.pricing_engine import HOURS_PER_DAY, CompiledTariff, RuleSpec, billed_hours
+from core.repricing import VectorTariff
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy là tùy chọn
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 365
+DEFAULT_HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+CURRENT_CANDIDATE = "current"
+
+# Thứ Hai bất kỳ, dùng để dựng lại ngày giờ từ ô giờ khi tính phí không có NumPy
+_MONDAY = datetime(2024, 1, 1)
+
+
+@dataclass
+class SessionHistory:
+    """Các session lịch sử dạng cột (mảng NumPy, hoặc list nếu không có NumPy)."""
+
+    start_slot: Sequence[int]
+    minutes: Sequence[int]
+    nights: Sequence[int]
+    recorded_revenue: int = 0
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+
+@dataclass
+class Candidate:
+    """Một bộ rule cần thử."""
+
+    name: str
+    rules: List[RuleSpec]
+
+    @classmethod
+    def from_dict(cls, data: dict, index: int = 0) -> "Candidate":
+        """Tạo từ ``{"name": ..., "rules": [...]}`` (rule cùng format ``/api/pricing-rules``)."""
+        if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+            raise ValueError("Mỗi candidate cần có danh sách 'rules'")
+        rules = []
+        for position, rule in enumerate(data["rules"], start=1):
+            if not isinstance(rule, dict):
+                raise ValueError("Mỗi rule phải là một object")
+            if rule.get("is_active") is False:
+                continue
+            rule = dict(rule)
+            # Giữ thứ tự khai báo khi hai rule cùng priority
+            rule.setdefault("id", position)
+            try:
+                rules.append(RuleSpec.from_dict(rule))
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"Rule không hợp lệ: {exc}") from exc
+        return cls(name=str(data.get("name") or f"candidate-{index + 1}"), rules=rules)
+
+
+@dataclass
+class SimulationResult:
+    """Doanh thu và phân bố phí của một ứng viên."""
+
+    name: str
+    rule_count: int
+    sessions: int
+    revenue: int
+    average_fee: float
+    min_fee: int = 0
+    max_fee: int = 0
+    percentiles: Dict[str, int] = field(default_factory=dict)
+    histogram: List[dict] = field(default_factory=list)
+    revenue_delta: Optional[int] = None
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["average_fee"] = round(self.average_fee, 1)
+        data["elapsed"] = round(self.elapsed, 4)
+        return data
+
+
+def load_history(start: datetime, end: datetime, chunk_size: int = 20_000) -> SessionHistory:
+    """Nạp các session đã hoàn tất có giờ vào trong [start, end) thành mảng cột.
+
+    Cần app context. Đọc theo khối (keyset theo id), chỉ các cột cần thiết.
+    """
+    from sqlalchemy import select
+
+    from database.db import db
+    from database.models import ParkingSession
+
+    table = ParkingSession.__table__
+    columns = (table.c.id, table.c.entry_time, table.c.exit_time, table.c.duration_minutes, table.c.fee_amount)
+    completed = (
+        (table.c.status == "completed")
+        & table.c.entry_time.is_not(None)
+        & (table.c.entry_time >= start)
+        & (table.c.entry_time < end)
+    )
+
+    start_slot: List[int] = []
+    minutes: List[int] = []
+    nights: List[int] = []
+    recorded = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(completed, table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for _, entry, exit_time, duration, fee in rows:
+            duration = duration or 0
+            exit_time = exit_time or entry + timedelta(minutes=duration)
+            start_slot.append(entry.weekday() * HOURS_PER_DAY + entry.hour)
+            minutes.append(duration)
+            nights.append(exit_time.toordinal() - entry.toordinal())
+            recorded += fee or 0
+
+    if np is not None:
+        return SessionHistory(
+            np.array(start_slot, dtype=np.int64),
+            np.array(minutes, dtype=np.int64),
+            np.array(nights, dtype=np.int64),
+            recorded, start, end,
+        )
+    return SessionHistory(start_slot, minutes, nights, recorded, start, end)
+
+
+def candidate_fees(tariff: CompiledTariff, history: SessionHistory):
+    """Phí của mọi session lịch sử theo ``tariff`` (bảng giá chung, giống ``end_session``)."""
+    if np is not None and isinstance(history.minutes, np.ndarray):
+        return VectorTariff(tariff.timeline()).price(history.start_slot, history.minutes, history.nights)
+
+    fees = []
+    for slot, duration, nights in zip(history.start_slot, history.minutes, history.nights):
+        if billed_hours(duration) == 0:
+            fees.append(0)
+            continue
+        # Phí chỉ phụ thuộc ô giờ lúc vào, số phút và số đêm => dựng lại ngày giờ tương đương
+        entry = _MONDAY + timedelta(hours=slot)
+        fees.append(tariff.price(entry, duration, exit_time=entry + timedelta(days=nights)))
+    return fees
+
+
+def summarize(name: str, rule_count: int, fees, bins: int = DEFAULT_HISTOGRAM_BINS) -> SimulationResult:
+    """Tổng hợp doanh thu, phí trung bình, percentile và histogram."""
+    count = len(fees)
+    if count == 0:
+        return SimulationResult(name=name, rule_count=rule_count, sessions=0, revenue=0, average_fee=0.0)
+
+    if np is not None:
+        values = np.asarray(fees, dtype=np.int64)
+        revenue = int(values.sum())
+        low, high = int(values.min()), int(values.max())
+        percentiles = {f"p{p}": int(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES, method="nearest"))}
+        counts, edges = np.histogram(values, bins=bins, range=(low, max(high, low + 1)))
+        histogram = [
+            {"from": int(edges[i]), "to": int(edges[i + 1]), "count": int(c)}
+            for i, c in enumerate(counts)
+        ]
+    else:
+        values = sorted(int(f) for f in fees)
+        revenue = sum(values)
+        low, high = values[0], values[-1]
+        percentiles = {
+            f"p{p}": values[min(count - 1, max(0, -(-p * count // 100) - 1))] for p in PERCENTILES
+        }
+        width = max(high - low, 1) / bins
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        histogram = [
+            {"from": int(low + i * width), "to": int(low + (i + 1) * width), "count": c}
+            for i, c in enumerate(counts)
+        ]
+
+    return SimulationResult(
+        name=name,
+        rule_count=rule_count,
+        sessions=count,
+        revenue=revenue,
+        average_fee=revenue / count,
+        min_fee=low,
+        max_fee=high,
+        percentiles=percentiles,
+        histogram=histogram,
+    )
+
+
+def evaluate_candidate(candidate: Candidate, history: SessionHistory, bins: int = DEFAULT_HISTOGRAM_BINS) -> SimulationResult:
+    """Tính phí lịch sử theo một ứng viên và tổng hợp kết quả."""
+    started = time.perf_counter()
+    tariff = CompiledTariff(candidate.rules)
+    result = summarize(candidate.name, len(candidate.rules), candidate_fees(tariff, history), bins)
+    result.revenue_delta = result.revenue - history.recorded_revenue
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+# Dữ liệu lịch sử của process worker (gửi một lần qua initializer)
+_worker_history: Optional[SessionHistory] = None
+
+
+def _init_worker(history: SessionHistory) -> None:
+    global _worker_history
+    _worker_history = history
+
+
+def _evaluate_in_worker(candidate: Candidate, bins: int) -> SimulationResult:
+    return evaluate_candidate(candidate, _worker_history, bins)
+
+
+def simulate(
+    candidates: Sequence[Candidate],
+    history: SessionHistory,
+    workers: Optional[int] = None,
+    bins: int = DEFAULT_HISTOGRAM_BINS,
+) -> List[SimulationResult]:
+    """Chạy mọi ứng viên trên ``history``; song song nếu có nhiều ứng viên và nhiều core."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(candidates)))
+    if workers == 1:
+        return [evaluate_candidate(c, history, bins) for c in candidates]
+
+    # Server có nhiều thread (controller, serial) => không fork, dùng spawn
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(history,)
+    ) as pool:
+        return list(pool.map(_evaluate_in_worker, candidates, [bins] * len(candidates)))
+
+
+def run_simulation(
+    candidate_data: Sequence[dict],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_current: bool = True,
+    workers: Optional[int] = None,
+    bins: int = DEFAULT_HISTOGRAM_BINS,
+) -> dict:
+    """Điểm vào cho API/CLI: nạp lịch sử, chạy ứng viên, trả về dict JSON được.
+
+    Cần app context. ``ValueError`` nếu dữ liệu ứng viên không hợp lệ.
+    """
+    from core.pricing_engine import pricing_engine
+
+    if not isinstance(candidate_data, (list, tuple)):
+        raise ValueError("'candidates' phải là một danh sách")
+    if bins < 1:
+        raise ValueError("'bins' phải >= 1")
+    candidates = [Candidate.from_dict(c, i) for i, c in enumerate(candidate_data)]
+    if include_current:
+        candidates.insert(0, Candidate(CURRENT_CANDIDATE, list(pricing_engine.tariff().rules)))
+    if not candidates:
+        raise ValueError("Cần ít nhất một candidate")
+
+    # entry_time lưu dạng UTC không kèm tzinfo
+    end = end or datetime.now(UTC).replace(tzinfo=None)
+    start = start or end - timedelta(days=DEFAULT_WINDOW_DAYS)
+    if start >= end:
+        raise ValueError("'start' phải trước 'end'")
+
+    started = time.perf_counter()
+    history = load_history(start, end)
+    loaded = time.perf_counter()
+    results = simulate(candidates, history, workers=workers, bins=bins)
+    finished = time.perf_counter()
+    logger.info(
+        "Mô phỏng %s bảng giá trên %s session: nạp %.2fs, tính %.2fs",
+        len(candidates), len(history), loaded - started, finished - loaded,
+    )
+    return {
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "sessions": len(history),
+        "recorded_revenue": history.recorded_revenue,
+        "load_seconds": round(loaded - started, 3),
+        "simulate_seconds": round(finished - loaded, 3),
+        "results": [r.to_dict() for r in results],
+    }
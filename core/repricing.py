@@ -0,0 +1,251 @@
+"""Tính lại phí hàng loạt cho các session chưa thanh toán khi pricing rules thay đổi.
+
+Đọc ``parking_sessions`` theo từng khối (keyset theo id, chỉ các cột cần thiết),
+tính phí cả khối bằng mảng NumPy trên bảng giá đã biên dịch, rồi ghi lại các
+dòng thay đổi bằng một lệnh UPDATE ``executemany`` mỗi khối. Không có NumPy thì
+dùng ``CompiledTariff.price`` từng dòng (cùng kết quả, chậm hơn).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, update
+
+from core.pricing_engine import (
+    DEFAULT_FIRST_HOUR_FEE,
+    HOURS_PER_DAY,
+    HOURS_PER_WEEK,
+    CompiledTariff,
+    Timeline,
+    pricing_engine,
+)
+from database.db import db
+from database.models import ParkingSession
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy là tùy chọn
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 20_000
+
+_KIND_HOURLY, _KIND_FLAT, _KIND_OVERNIGHT = 0, 1, 2
+
+# (id, entry_time, exit_time, duration_minutes, fee_amount)
+SessionRow = Tuple[int, datetime, Optional[datetime], Optional[int], Optional[int]]
+
+
+@dataclass
+class RepricingReport:
+    """Kết quả (hoặc tiến độ) của một lần tính lại phí."""
+
+    tariff_version: int
+    scanned: int = 0
+    updated: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    vectorized: bool = field(default_factory=lambda: np is not None)
+    finished: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["elapsed"] = round(self.elapsed, 3)
+        data["rows_per_second"] = round(self.rows_per_second, 1)
+        return data
+
+
+ProgressCallback = Callable[[RepricingReport], None]
+
+
+class VectorTariff:
+    """Bảng giá dạng mảng NumPy để tính phí cả khối session một lần."""
+
+    def __init__(self, timeline: Timeline) -> None:
+        kinds, first, flat, night, night_first, night_sub = [], [], [], [], [], []
+        for rule in timeline.rules:
+            rule_type = rule.rule_type if rule is not None else None
+            kinds.append(
+                _KIND_FLAT if rule_type == "flat_rate"
+                else _KIND_OVERNIGHT if rule_type == "overnight"
+                else _KIND_HOURLY
+            )
+            first.append(DEFAULT_FIRST_HOUR_FEE if rule is None else rule.first_hour_fee)
+            flat.append(rule.flat_rate_fee if rule is not None else 0)
+            night.append(rule.overnight_fee if rule is not None else 0)
+            night_first.append(rule.first_hour_fee if rule is not None else 0)
+            night_sub.append(rule.subsequent_hour_fee if rule is not None else 0)
+        self.kind = np.array(kinds, dtype=np.int8)
+        self.first = np.array(first, dtype=np.int64)
+        self.flat = np.array(flat, dtype=np.int64)
+        self.overnight = np.array(night, dtype=np.int64)
+        self.overnight_first = np.array(night_first, dtype=np.int64)
+        self.overnight_sub = np.array(night_sub, dtype=np.int64)
+        self.prefix = np.array(timeline.prefix, dtype=np.int64)
+
+    def price(self, start_slot: "np.ndarray", duration_minutes: "np.ndarray", nights: "np.ndarray") -> "np.ndarray":
+        """Giống ``CompiledTariff.price`` nhưng cho cả mảng."""
+        hours = (duration_minutes + 59) // 60
+        span = np.maximum(hours - 1, 0)
+        weeks, rest = np.divmod(span, HOURS_PER_WEEK)
+        begin = (start_slot + 1) % HOURS_PER_WEEK
+        end = begin + rest
+        prefix = self.prefix
+        wrapped = end > HOURS_PER_WEEK
+        span_cost = weeks * prefix[HOURS_PER_WEEK] + np.where(
+            wrapped,
+            prefix[HOURS_PER_WEEK] - prefix[begin] + prefix[np.maximum(end - HOURS_PER_WEEK, 0)],
+            prefix[np.minimum(end, HOURS_PER_WEEK)] - prefix[begin],
+        )
+
+        kind = self.kind[start_slot]
+        hourly = self.first[start_slot] + span_cost
+        overnight = np.where(
+            nights > 0,
+            (nights + 1) * self.overnight[start_slot],
+            self.overnight_first[start_slot] + span * self.overnight_sub[start_slot],
+        )
+        fee = np.where(kind == _KIND_FLAT, self.flat[start_slot],
+                       np.where(kind == _KIND_OVERNIGHT, overnight, hourly))
+        return np.where(hours == 0, 0, fee)
+
+
+def price_rows(tariff: CompiledTariff, rows: Sequence[SessionRow], vector: Optional[VectorTariff] = None) -> List[int]:
+    """Tính phí cho các dòng session (theo bảng giá chung, giống ``end_session``)."""
+    if vector is None or np is None:
+        return [_price_row(tariff, row) for row in rows]
+
+    count = len(rows)
+    start_slot = np.empty(count, dtype=np.int64)
+    minutes = np.empty(count, dtype=np.int64)
+    nights = np.empty(count, dtype=np.int64)
+    for index, (_, entry, exit_time, duration, _) in enumerate(rows):
+        duration = duration or 0
+        exit_time = exit_time or entry + timedelta(minutes=duration)
+        start_slot[index] = entry.weekday() * HOURS_PER_DAY + entry.hour
+        minutes[index] = duration
+        nights[index] = exit_time.toordinal() - entry.toordinal()
+    return vector.price(start_slot, minutes, nights).tolist()
+
+
+def _price_row(tariff: CompiledTariff, row: SessionRow) -> int:
+    _, entry, exit_time, duration, _ = row
+    if not duration:
+        return 0
+    return tariff.price(entry, duration, exit_time=exit_time)
+
+
+def reprice_pending_sessions(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[ProgressCallback] = None,
+) -> RepricingReport:
+    """Tính lại ``fee_amount`` cho mọi session đã kết thúc nhưng chưa thanh toán.
+
+    Cần app context. Mỗi khối được commit riêng để giao dịch ghi luôn ngắn.
+    """
+    tariff = pricing_engine.tariff()
+    vector = VectorTariff(tariff.timeline()) if np is not None else None
+    report = RepricingReport(tariff_version=tariff.version)
+    table = ParkingSession.__table__
+    columns = (table.c.id, table.c.entry_time, table.c.exit_time, table.c.duration_minutes, table.c.fee_amount)
+    pending = (table.c.status == "completed") & (table.c.payment_status == "pending")
+    update_stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.payment_status == "pending")
+        .values(fee_amount=bindparam("b_fee"))
+    )
+
+    started = time.perf_counter()
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(pending, table.c.id > last_id, table.c.entry_time.is_not(None))
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        fees = price_rows(tariff, rows, vector)
+        changes = [
+            {"b_id": row[0], "b_fee": int(fee)}
+            for row, fee in zip(rows, fees)
+            if (row[4] or 0) != fee
+        ]
+        if changes:
+            db.session.execute(update_stmt, changes)
+        db.session.commit()
+
+        report.scanned += len(rows)
+        report.updated += len(changes)
+        report.chunks += 1
+        report.elapsed = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    report.elapsed = time.perf_counter() - started
+    report.finished = True
+    logger.info(
+        "Đã tính lại phí %s session (%s thay đổi) trong %.2fs (%.0f dòng/s, bảng giá v%s)",
+        report.scanned, report.updated, report.elapsed, report.rows_per_second, report.tariff_version,
+    )
+    return report
+
+
+class RepricingRunner:
+    """Chạy tính lại phí ở thread nền; các yêu cầu dồn dập được gộp lại."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._rerun = False
+        self.last_report: Optional[RepricingReport] = None
+
+    def trigger(self, app) -> None:
+        """Yêu cầu tính lại (gọi sau khi commit thay đổi pricing rules)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                self._rerun = True
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), daemon=True)
+            self._thread.start()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def _run(self, app) -> None:
+        while True:
+            try:
+                with app.app_context():
+                    self.last_report = reprice_pending_sessions(progress=self._set_report)
+            except Exception as exc:  # pragma: no cover - chỉ log
+                logger.exception("Lỗi khi tính lại phí: %s", exc)
+            with self._lock:
+                if not self._rerun:
+                    self._thread = None
+                    return
+                self._rerun = False
+
+    def _set_report(self, report: RepricingReport) -> None:
+        self.last_report = report
+
+
+repricing_runner = RepricingRunner()
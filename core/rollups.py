@@ -0,0 +1,298 @@
+"""Bảng rollup session theo giờ/ngày/slot, cập nhật dần từ một watermark.
+
+Mỗi dòng ``session_rollups`` là một bucket (giờ hoặc ngày, UTC) của một slot:
+số lượt vào, số lượt ra, tổng phút có xe, doanh thu đã thu và tổng thời gian
+đỗ của các lượt kết thúc (=> thời gian đỗ trung bình).
+
+Job nền dựng lại các bucket từ ``min(watermark, giờ vào của session active cũ
+nhất)`` tới hiện tại bằng cách xóa rồi ghi lại (idempotent), từng khối vài
+ngày mỗi transaction. Backfill chỉ là lùi watermark rồi chạy cùng đường đó.
+Báo cáo chỉ đọc bảng rollup, không quét ``parking_sessions``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from config import ParkingConfig, ReportConfig
+from core import dwell_sketches
+from database.db import db
+from database.models import ParkingSession, RollupWatermark, SessionRollup
+
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+GRANULARITIES = {"hour": HOUR, "day": DAY}
+SESSIONS_WATERMARK = "sessions"
+
+_COUNTERS = ("sessions_started", "sessions_ended", "occupancy_minutes", "revenue", "dwell_minutes")
+
+BucketKey = Tuple[datetime, int]
+
+
+def utcnow() -> datetime:
+    """Giờ hiện tại dạng UTC không kèm tzinfo (như các cột DateTime)."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _naive(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(UTC).replace(tzinfo=None)
+    return moment
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _empty_bucket() -> dict:
+    return dict.fromkeys(_COUNTERS, 0)
+
+
+def compute_hourly(start: datetime, end: datetime, now: Optional[datetime] = None) -> Dict[BucketKey, dict]:
+    """Tính các bucket giờ trong [start, end) trực tiếp từ ``parking_sessions``."""
+    now = now or utcnow()
+    s = ParkingSession.__table__.c
+    buckets: Dict[BucketKey, dict] = defaultdict(_empty_bucket)
+
+    # Session giao với [start, end), tách thành ba phần rời nhau để mỗi phần
+    # đi theo một index có cận dưới (một OR chung chỉ dùng được
+    # ``entry_time < end`` => đọc lại mọi session từ đầu lịch sử mỗi lần chạy)
+    columns = (s.slot_id, s.entry_time, s.exit_time, s.duration_minutes, s.status)
+    overlapping = (
+        # vào trong khoảng: ix_parking_sessions_entry_id
+        select(*columns).where(s.entry_time >= start, s.entry_time < end),
+        # vào trước, ra trong hoặc sau khoảng: ix_parking_sessions_exit_time
+        select(*columns).where(s.exit_time >= start, s.entry_time < start, s.status != "active"),
+        # vào trước, vẫn đang đỗ: index một phần ix_parking_sessions_active_entry
+        select(*columns).where(s.status == "active", s.entry_time < start),
+    )
+    rows = chain.from_iterable(
+        db.session.execute(query.execution_options(yield_per=5000)) for query in overlapping
+    )
+    for slot_id, entry, exit_time, duration, status in rows:
+        if start <= entry < end:
+            buckets[(floor_hour(entry), slot_id)]["sessions_started"] += 1
+        if status == "completed" and exit_time is not None and start <= exit_time < end:
+            bucket = buckets[(floor_hour(exit_time), slot_id)]
+            bucket["sessions_ended"] += 1
+            bucket["dwell_minutes"] += duration or 0
+
+        # Phút có xe: phần giao của [entry, exit) với từng giờ trong [start, end)
+        if status == "active":
+            occupied_until = now
+        elif exit_time is not None:
+            occupied_until = exit_time
+        else:
+            occupied_until = entry + timedelta(minutes=duration or 0)
+        cursor = max(entry, start)
+        stop = min(occupied_until, end)
+        while cursor < stop:
+            hour = floor_hour(cursor)
+            boundary = min(hour + HOUR, stop)
+            buckets[(hour, slot_id)]["occupancy_minutes"] += (boundary - cursor).total_seconds() / 60
+            cursor = boundary
+
+    paid = select(s.slot_id, s.payment_time, s.fee_amount).where(
+        s.payment_status == "paid", s.payment_time >= start, s.payment_time < end
+    )
+    for slot_id, payment_time, fee in db.session.execute(paid):
+        buckets[(floor_hour(payment_time), slot_id)]["revenue"] += fee or 0
+
+    return buckets
+
+
+def _daily(hourly: Dict[BucketKey, dict]) -> Dict[BucketKey, dict]:
+    daily: Dict[BucketKey, dict] = defaultdict(_empty_bucket)
+    for (hour, slot_id), values in hourly.items():
+        bucket = daily[(floor_day(hour), slot_id)]
+        for name in _COUNTERS:
+            bucket[name] += values[name]
+    return daily
+
+
+def rebuild(start: datetime, end: datetime, chunk_days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """Dựng lại (xóa rồi ghi) bucket giờ và ngày trong [start, end), căn theo ngày.
+
+    Idempotent: chạy lại cùng khoảng cho cùng kết quả. Trả về số dòng đã ghi.
+    """
+    chunk = DAY * (chunk_days or ReportConfig.ROLLUP_CHUNK_DAYS)
+    now = now or utcnow()
+    start = floor_day(_naive(start))
+    end = _naive(end)
+    if end != floor_day(end):
+        end = floor_day(end) + DAY
+
+    table = SessionRollup.__table__
+    written = 0
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + chunk, end)
+        hourly = compute_hourly(window_start, window_end, now)
+        rows = [
+            {"granularity": granularity, "bucket_start": bucket_start, "slot_id": slot_id, **values}
+            for granularity, buckets in (("hour", hourly), ("day", _daily(hourly)))
+            for (bucket_start, slot_id), values in buckets.items()
+        ]
+        db.session.execute(
+            delete(table).where(table.c.bucket_start >= window_start, table.c.bucket_start < window_end)
+        )
+        if rows:
+            db.session.execute(insert(table), rows)
+        dwell_sketches.merge_days(window_start, window_end)
+        db.session.commit()
+        written += len(rows)
+        window_start = window_end
+    return written
+
+
+def get_watermark(name: str = SESSIONS_WATERMARK) -> Optional[datetime]:
+    row = db.session.get(RollupWatermark, name)
+    return row.watermark if row else None
+
+
+def set_watermark(moment: datetime, name: str = SESSIONS_WATERMARK) -> None:
+    row = db.session.get(RollupWatermark, name)
+    if row is None:
+        db.session.add(RollupWatermark(name=name, watermark=moment))
+    else:
+        row.watermark = moment
+    db.session.commit()
+
+
+def run_once(now: Optional[datetime] = None) -> dict:
+    """Cập nhật rollup từ watermark tới ``now`` rồi dời watermark (cần app context)."""
+    now = now or utcnow()
+    s = ParkingSession.__table__.c
+    watermark = get_watermark()
+    if watermark is None:
+        # Lần đầu: backfill toàn bộ lịch sử
+        watermark = db.session.execute(select(func.min(s.entry_time))).scalar() or now
+
+    written = rebuild(watermark, now, now=now)
+
+    # Bucket chứa session còn active sẽ còn thay đổi => watermark không vượt qua chúng
+    oldest_active = db.session.execute(select(func.min(s.entry_time)).where(s.status == "active")).scalar()
+    new_watermark = min(now, oldest_active) if oldest_active else now
+    set_watermark(new_watermark)
+    logger.debug("Rollup: dựng lại từ %s, %s dòng, watermark mới %s", watermark, written, new_watermark)
+    return {"from": watermark.isoformat(), "rows": written, "watermark": new_watermark.isoformat()}
+
+
+def request_backfill(start: Optional[datetime] = None) -> datetime:
+    """Lùi watermark về ``start`` để lần chạy sau dựng lại.
+
+    Không truyền ``start``: backfill toàn bộ, kể cả dựng lại sketch thời gian đỗ.
+    """
+    if start is None:
+        s = ParkingSession.__table__.c
+        dwell_sketches.rebuild_all()
+        db.session.commit()
+        start = db.session.execute(select(func.min(s.entry_time))).scalar() or utcnow()
+    start = floor_day(_naive(start))
+    current = get_watermark()
+    if current is None or start < current:
+        set_watermark(start)
+    return start
+
+
+def query_usage(
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    slot_id: Optional[int] = None,
+    by_slot: bool = False,
+) -> List[dict]:
+    """Chuỗi bucket trong [start, end), chỉ đọc bảng rollup."""
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity phải là 'hour' hoặc 'day'")
+    r = SessionRollup.__table__.c
+    group = [r.bucket_start] + ([r.slot_id] if by_slot else [])
+    stmt = (
+        select(*group, *(func.sum(getattr(r, name)) for name in _COUNTERS))
+        .where(r.granularity == granularity, r.bucket_start >= _naive(start), r.bucket_start < _naive(end))
+        .group_by(*group)
+        .order_by(*group)
+    )
+    if slot_id is not None:
+        stmt = stmt.where(r.slot_id == slot_id)
+
+    slots = 1 if (by_slot or slot_id is not None) else ParkingConfig.TOTAL_SLOTS
+    bucket_minutes = GRANULARITIES[granularity].total_seconds() / 60
+    series = []
+    for row in db.session.execute(stmt):
+        values = dict(zip(_COUNTERS, row[len(group):]))
+        item = {"bucket_start": row[0].isoformat()}
+        if by_slot:
+            item["slot_id"] = row[1]
+        ended = values["sessions_ended"] or 0
+        item.update({
+            "sessions_started": values["sessions_started"] or 0,
+            "sessions_ended": ended,
+            "occupancy_minutes": round(values["occupancy_minutes"] or 0, 1),
+            "occupancy_rate": round((values["occupancy_minutes"] or 0) / (bucket_minutes * slots) * 100, 2),
+            "revenue": values["revenue"] or 0,
+            "average_dwell_minutes": round((values["dwell_minutes"] or 0) / ended, 1) if ended else None,
+        })
+        series.append(item)
+    return series
+
+
+class RollupJob:
+    """Thread nền chạy ``run_once`` định kỳ."""
+
+    def __init__(self, interval: float = ReportConfig.ROLLUP_INTERVAL) -> None:
+        self.interval = interval
+        self.last_result: Optional[dict] = None
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self, app) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._app = app
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="rollup-job", daemon=True)
+        self._thread.start()
+        logger.info("Rollup job đã khởi động (chu kỳ %ss)", self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Chạy ngay lần kế tiếp (ví dụ sau khi yêu cầu backfill)."""
+        self._wake.set()
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self._app.app_context():
+                    self.last_result = run_once()
+            except Exception as exc:  # pragma: no cover - chỉ log
+                logger.exception("Lỗi khi cập nhật rollup: %s", exc)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+rollup_job = RollupJob()
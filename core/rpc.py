@@ -0,0 +1,217 @@
+"""RPC cục bộ qua Unix socket cho lệnh điều khiển của ``ParkingController``.
+
+Worker web (web/wsgi.py) chạy ở process khác với controller (process giữ cổng
+serial). Lệnh gate/slot/mode được gửi tới controller qua socket này:
+
+- frame: 4 byte độ dài (big-endian) + JSON
+  ``{"id": 1, "method": "manual_set_gate", "args": ["open"]}``
+  => ``{"id": 1, "result": true}`` hoặc ``{"id": 1, "error": "..."}``
+- một kết nối có thể gửi nhiều request liên tiếp không chờ (pipelining);
+  server trả lời đúng thứ tự
+- chỉ các method trong ``RPC_METHODS`` được gọi
+- client giữ một kết nối mỗi thread và tự nối lại khi controller khởi động
+  lại; controller không chạy => ``RpcUnavailable`` (route trả 503)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from config import ServerConfig
+
+logger = logging.getLogger(__name__)
+
+# Lệnh web được phép gọi trên controller (đều là lệnh "đặt trạng thái", gửi lại không sao)
+RPC_METHODS = frozenset({"manual_set_gate", "manual_set_slot", "manual_apply_batch", "change_mode"})
+
+_LENGTH = struct.Struct("!I")
+MAX_FRAME = 64 * 1024
+
+
+class RpcError(RuntimeError):
+    """Controller trả lỗi cho lệnh (method không được phép, tham số sai...)."""
+
+
+class RpcUnavailable(RpcError):
+    """Không kết nối được tới process controller."""
+
+
+def _encode(message: dict) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return _LENGTH.pack(len(body)) + body
+
+
+def _read_frame(stream) -> Optional[dict]:
+    header = stream.read(_LENGTH.size)
+    if not header:
+        return None
+    if len(header) < _LENGTH.size:
+        raise ConnectionError("Frame bị cắt")
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise ConnectionError(f"Frame quá lớn ({length} bytes)")
+    body = stream.read(length)
+    if len(body) < length:
+        raise ConnectionError("Frame bị cắt")
+    return json.loads(body)
+
+
+# ----------------------------------------------------------------------
+# Server (trong process controller)
+# ----------------------------------------------------------------------
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self) -> None:
+        super().setup()
+        with self.server.connections_lock:
+            self.server.connections.add(self.connection)
+
+    def handle(self) -> None:
+        server: RpcServer = self.server  # type: ignore[assignment]
+        while True:
+            try:
+                request = _read_frame(self.rfile)
+            except (ConnectionError, ValueError) as exc:
+                logger.warning("RPC: bỏ kết nối lỗi: %s", exc)
+                return
+            if request is None:
+                return
+            # rfile có buffer: các request pipelined được đọc từ cùng một lần recv
+            self.wfile.write(_encode(server.dispatch(request)))
+
+    def finish(self) -> None:
+        with self.server.connections_lock:
+            self.server.connections.discard(self.connection)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+
+class RpcServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Phục vụ các method trong ``methods`` của ``target`` trên Unix socket ``path``."""
+
+    daemon_threads = True
+
+    def __init__(self, target: Any, path: str, methods: Iterable[str] = RPC_METHODS) -> None:
+        self.target = target
+        self.path = path
+        self.methods = frozenset(methods)
+        if os.path.exists(path):
+            os.unlink(path)  # socket sót lại từ lần chạy trước
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o660)
+        self._thread: Optional[threading.Thread] = None
+
+    def dispatch(self, request: dict) -> dict:
+        request_id = request.get("id")
+        method = request.get("method")
+        if method not in self.methods:
+            return {"id": request_id, "error": f"Method không được phép: {method}"}
+        try:
+            result = getattr(self.target, method)(*request.get("args", ()), **request.get("kwargs", {}))
+        except Exception as exc:
+            logger.exception("RPC %s lỗi", method)
+            return {"id": request_id, "error": str(exc)}
+        return {"id": request_id, "result": result}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name="controller-rpc", daemon=True)
+        self._thread.start()
+        logger.info("Controller RPC lắng nghe tại %s", self.path)
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        # Đóng cả các kết nối đang mở để client biết mà nối lại
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# ----------------------------------------------------------------------
+# Client (trong worker web)
+# ----------------------------------------------------------------------
+class ControllerClient:
+    """Proxy gọi lệnh controller qua RPC, cùng chữ ký với ``ParkingController``.
+
+    ``client.manual_set_gate("open")`` tương đương ``controller.manual_set_gate("open")``.
+    """
+
+    def __init__(self, path: str = ServerConfig.RPC_SOCKET, timeout: float = ServerConfig.RPC_TIMEOUT) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __getattr__(self, name: str):
+        if name in RPC_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def _connection(self) -> Tuple[socket.socket, Any]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as exc:
+                sock.close()
+                raise RpcUnavailable(f"Không kết nối được controller ({self.path}): {exc}") from exc
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        result = self.pipeline([(method, args, kwargs)])[0]
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    def pipeline(self, calls: Sequence[Tuple]) -> List[Any]:
+        """Gửi nhiều lệnh ``(method, args[, kwargs])`` một lượt, trả về kết quả theo thứ tự.
+
+        Lỗi của từng lệnh được trả về dưới dạng ``RpcError`` trong danh sách.
+        """
+        payload = b"".join(
+            _encode({"id": index, "method": call[0], "args": list(call[1]), "kwargs": call[2] if len(call) > 2 else {}})
+            for index, call in enumerate(calls)
+        )
+        # Controller có thể vừa khởi động lại: kết nối cũ hỏng => nối lại một lần
+        for attempt in (1, 2):
+            sock, stream = self._connection()
+            try:
+                sock.sendall(payload)
+                responses = [_read_frame(stream) for _ in calls]
+                if None in responses:
+                    raise ConnectionError("Controller đóng kết nối")
+                break
+            except (OSError, ConnectionError, ValueError) as exc:
+                self.close()
+                if attempt == 2:
+                    raise RpcUnavailable(f"Mất kết nối controller: {exc}") from exc
+        return [RpcError(r["error"]) if "error" in r else r.get("result") for r in responses]
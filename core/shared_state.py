@@ -0,0 +1,380 @@
+"""Chia sẻ state giữa process controller và các worker web qua shared memory.
+
+Chỉ một process (``main.py``) giữ cổng serial và ``StateManager`` thật. Mỗi
+version state được ghi vào một segment ``multiprocessing.shared_memory``; các
+worker WSGI (``web/wsgi.py``) gắn vào segment chỉ-đọc và phục vụ ``/status``,
+``/api/status``, ``/api/stream`` từ đó, nên đọc state chạy song song trên cả 4
+core của Pi.
+
+Bố cục segment (little-endian)::
+
+    seq u64 | version u64 | heartbeat_ms u64 | length u32 | crc32 u32 | JSON...
+
+Ghi theo seqlock: ``seq`` lẻ trong lúc ghi, chẵn khi xong. Người đọc chép
+payload rồi đọc lại ``seq``; khác nhau (hoặc CRC sai) => đọc lại. Python không
+có memory fence nên CRC là lớp bảo vệ thứ hai chống đọc dở trên ARM.
+``heartbeat_ms`` được làm mới mỗi ``SHARED_STATE_INTERVAL`` giây để worker
+biết process controller còn sống (và gắn lại segment mới sau khi nó khởi động
+lại).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+from datetime import UTC, datetime
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Tuple
+
+from config import ServerConfig
+from core.mode_manager import ModeManager
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<QQQII")
+_SEQ = struct.Struct("<Q")
+_HEARTBEAT_OFFSET = 16
+_READ_RETRIES = 100
+
+
+_created = set()  # segment do process này tạo (resource_tracker đã giữ sẵn)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Gắn vào segment có sẵn mà không để resource_tracker xóa nó khi process thoát."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        if name in _created:
+            return segment
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(segment._name, "shared_memory")
+        except Exception:  # pragma: no cover - tùy nền tảng
+            pass
+        return segment
+
+
+class SharedStateSegment:
+    """Segment chứa JSON state mới nhất; một người ghi, nhiều người đọc."""
+
+    def __init__(self, segment: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = segment
+        self._buf = segment.buf
+        self.owner = owner
+        self.capacity = segment.size - _HEADER.size
+        self._seq = _SEQ.unpack_from(self._buf, 0)[0]
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(cls, name: str = ServerConfig.SHARED_STATE_NAME, size: int = ServerConfig.SHARED_STATE_SIZE) -> "SharedStateSegment":
+        """Tạo segment mới (process controller); xóa segment sót lại từ lần chạy trước."""
+        try:
+            segment = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            segment = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + size)
+        _created.add(name)
+        segment.buf[:_HEADER.size] = bytes(_HEADER.size)
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = ServerConfig.SHARED_STATE_NAME) -> "SharedStateSegment":
+        """Gắn vào segment đã có (worker); ``FileNotFoundError`` nếu controller chưa chạy."""
+        return cls(_attach(name), owner=False)
+
+    # ------------------------------------------------------------------
+    # Ghi (chỉ process controller)
+    # ------------------------------------------------------------------
+    def write(self, version: int, data: Dict) -> bool:
+        payload = json.dumps(data, separators=(",", ":")).encode()
+        if len(payload) > self.capacity:
+            logger.error("State %s bytes vượt quá segment %s bytes, bỏ qua", len(payload), self.capacity)
+            return False
+        self._seq += 1
+        _SEQ.pack_into(self._buf, 0, self._seq)
+        self._buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(
+            self._buf, 0, self._seq, version, int(time.time() * 1000), len(payload), zlib.crc32(payload),
+        )
+        self._seq += 1
+        _SEQ.pack_into(self._buf, 0, self._seq)
+        return True
+
+    def heartbeat(self) -> None:
+        _SEQ.pack_into(self._buf, _HEARTBEAT_OFFSET, int(time.time() * 1000))
+
+    # ------------------------------------------------------------------
+    # Đọc
+    # ------------------------------------------------------------------
+    def sequence(self) -> int:
+        """Số thứ tự ghi hiện tại (rẻ: chỉ đọc 8 byte)."""
+        return _SEQ.unpack_from(self._buf, 0)[0]
+
+    def heartbeat_age(self) -> float:
+        """Số giây từ lần heartbeat cuối của người ghi."""
+        return time.time() - _SEQ.unpack_from(self._buf, _HEARTBEAT_OFFSET)[0] / 1000
+
+    def read(self) -> Optional[Tuple[int, int, Dict]]:
+        """(seq, version, data) nhất quán, hoặc None nếu chưa có gì được ghi."""
+        for _ in range(_READ_RETRIES):
+            seq, version, _heartbeat, length, crc = _HEADER.unpack_from(self._buf, 0)
+            if seq == 0:
+                return None
+            if seq % 2:
+                time.sleep(0)
+                continue
+            payload = bytes(self._buf[_HEADER.size:_HEADER.size + length])
+            if _SEQ.unpack_from(self._buf, 0)[0] == seq and zlib.crc32(payload) == crc:
+                return seq, version, json.loads(payload)
+            time.sleep(0)
+        raise RuntimeError("Không đọc được state nhất quán từ shared memory")
+
+    def close(self) -> None:
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            _created.discard(self.name)
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedStatePublisher:
+    """Thread trong process controller: ghi mỗi version mới của state vào segment.
+
+    ``sync`` (tùy chọn) được gọi trước mỗi lần ghi để đưa field phụ (thống kê,
+    chế độ, kết nối Arduino) vào ``state_manager``.
+    """
+
+    def __init__(
+        self,
+        state_manager,
+        segment: SharedStateSegment,
+        sync: Optional[Callable[[], None]] = None,
+        interval: float = ServerConfig.SHARED_STATE_INTERVAL,
+    ) -> None:
+        self.state_manager = state_manager
+        self.segment = segment
+        self.sync = sync
+        self.interval = interval
+        self._written: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish_once(self) -> bool:
+        """Ghi nếu version đã đổi; trả về True nếu có ghi."""
+        if self.sync is not None:
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Lỗi khi đồng bộ field phụ cho shared state")
+        version, state, extra = self.state_manager.export()
+        self.segment.heartbeat()
+        if version == self._written:
+            return False
+        if self.segment.write(version, {"state": state, "extra": extra, "boot": self.state_manager.boot_id}):
+            self._written = version
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.publish_once()
+            self.state_manager.wait(self._written if self._written is not None else -1, timeout=self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.publish_once()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-state", daemon=True)
+        self._thread.start()
+        logger.info("Đang chia sẻ state qua shared memory '%s'", self.segment.name)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.state_manager.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.segment.close()
+
+
+class SharedStateView:
+    """Thay thế chỉ-đọc cho ``StateManager`` trong worker web.
+
+    Cùng giao diện đọc (``snapshot``, ``last_update``, ``version``,
+    ``live_snapshot``, ``changes_since``, ``wait``); version là version của
+    process controller nên giống nhau giữa các worker (SSE nối lại vào worker
+    khác vẫn đúng). ``update`` không được phép: lệnh điều khiển phải đi qua
+    process controller.
+    """
+
+    read_only = True
+
+    def __init__(
+        self,
+        name: str = ServerConfig.SHARED_STATE_NAME,
+        poll_interval: float = ServerConfig.SHARED_STATE_POLL,
+        stale_after: float = ServerConfig.SHARED_STATE_STALE,
+    ) -> None:
+        self.name = name
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._segment = SharedStateSegment.attach(name)
+        self._lock = threading.Lock()
+        self._seq = -1
+        self._version = 0
+        self._state: Dict = {}
+        self._extra: Dict = {}
+        self._boot = ""
+        self._previous: Optional[Tuple[int, Dict]] = None
+        self._next_reattach = 0.0
+        self._wakeups = 0
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._segment.heartbeat_age() > self.stale_after and time.monotonic() >= self._next_reattach:
+                self._next_reattach = time.monotonic() + self.stale_after
+                self._reattach()
+            seq = self._segment.sequence()
+            if seq == self._seq:
+                return
+            result = self._segment.read()
+            if result is None:
+                return
+            seq, version, data = result
+            if version != self._version:
+                self._previous = (self._version, {**self._state, **self._extra})
+            self._seq, self._version = seq, version
+            self._state, self._extra = data["state"], data["extra"]
+            self._boot = data.get("boot", "")
+
+    def _reattach(self) -> None:
+        """Controller có thể đã khởi động lại với segment mới cùng tên."""
+        try:
+            segment = SharedStateSegment.attach(self.name)
+        except FileNotFoundError:
+            return
+        if segment.heartbeat_age() < self.stale_after:
+            self._segment.close()
+            self._segment, self._seq, self._previous = segment, -1, None
+            logger.info("Đã gắn lại shared state '%s'", self.name)
+        else:
+            segment.close()
+
+    # ------------------------------------------------------------------
+    # Giao diện giống StateManager
+    # ------------------------------------------------------------------
+    @property
+    def version(self) -> int:
+        self._refresh()
+        return self._version
+
+    @property
+    def boot_id(self) -> str:
+        """``boot_id`` của process controller: mọi worker cùng một giá trị (ETag giống nhau)."""
+        self._refresh()
+        return self._boot
+
+    def snapshot(self) -> Dict:
+        self._refresh()
+        return dict(self._state)
+
+    def last_update(self) -> datetime:
+        value = self.snapshot().get("last_update")
+        # Controller chưa ghi lần nào => coi như rất cũ (health báo degraded)
+        return datetime.fromisoformat(value) if value else datetime.fromtimestamp(0, UTC)
+
+    def export(self) -> Tuple[int, Dict, Dict]:
+        self._refresh()
+        with self._lock:
+            return self._version, dict(self._state), dict(self._extra)
+
+    def live_snapshot(self) -> Tuple[int, Dict]:
+        version, data, extra = self.export()
+        data.update(extra)
+        return version, data
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[Dict]]:
+        """Chỉ giữ version liền trước: đủ cho SSE theo kịp, còn lại => snapshot."""
+        current, data = self.live_snapshot()
+        if version == current:
+            return current, {}
+        previous = self._previous
+        if previous is not None and previous[0] == version:
+            return current, {k: v for k, v in data.items() if previous[1].get(k) != v}
+        return current, None
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + (timeout if timeout is not None else float("inf"))
+        wakeups = self._wakeups
+        while self.version == version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._wakeups != wakeups:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+        return True
+
+    def notify(self) -> None:
+        """Đánh thức người đang ``wait`` (field phụ đã có trong segment, chỉ cần khi dừng server)."""
+        self._wakeups += 1
+
+    def publish(self, fields: Dict) -> None:
+        """Như ``notify``."""
+
+    def update(self, payload: Dict) -> None:
+        raise RuntimeError("State trong worker web là chỉ-đọc; lệnh phải gửi tới process controller")
+
+    def apply_manual(self, slots: Optional[Dict] = None, gate: Optional[str] = None) -> None:
+        self.update({})
+
+    def close(self) -> None:
+        self._segment.close()
+
+
+class _SerialStatusView:
+    """Trạng thái kết nối Arduino như process controller đã công bố."""
+
+    def __init__(self, view: SharedStateView) -> None:
+        self._view = view
+
+    def is_connected(self) -> bool:
+        return bool(self._view.live_snapshot()[1].get("arduino_connected"))
+
+    def get_last_received_time(self) -> Optional[float]:
+        # Xấp xỉ bằng last_update của state (chênh tối đa STREAM_TOUCH_INTERVAL)
+        return self._view.last_update().timestamp() if self.is_connected() else None
+
+
+class SharedControllerView:
+    """Thay cho ``ParkingController`` trong worker web.
+
+    Trạng thái đọc từ shared memory; lệnh điều khiển (``manual_set_gate``,
+    ``manual_set_slot``, ``change_mode``) chuyển cho ``commands`` - thường là
+    ``core.rpc.ControllerClient`` tới process controller.
+    """
+
+    def __init__(self, view: SharedStateView, commands=None) -> None:
+        self.state_manager = view
+        self.mode_manager = ModeManager(view)
+        self.serial_client = _SerialStatusView(view)
+        self.commands = commands
+
+    def __getattr__(self, name: str):
+        commands = self.__dict__.get("commands")
+        if commands is None:
+            raise AttributeError(name)
+        return getattr(commands, name)
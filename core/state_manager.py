@@ -1,14 +1,24 @@
-"""Quản lý trạng thái bãi đỗ xe và cung cấp snapshot thread-safe."""
+"""Quản lý trạng thái bãi đỗ xe và cung cấp snapshot thread-safe.
+
+Ngoài snapshot, ``StateManager`` giữ một luồng thay đổi có version cho
+``/api/stream`` (SSE): mỗi lần state thực sự đổi, version tăng 1 và các field
+đổi được lưu vào ring buffer ``WebConfig.STREAM_BUFFER`` mục. Người xem chờ
+bằng ``wait`` rồi lấy delta gộp bằng ``changes_since``, nên chi phí tỉ lệ với
+số lần thay đổi chứ không với số trình duyệt x tần suất poll.
+"""
 
 from __future__ import annotations
 
 import logging
+import os
 import threading
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 
-from config import OperationMode, ParkingConfig
+from config import OperationMode, ParkingConfig, WebConfig
 
 logger = logging.getLogger(__name__)
 
@@ -83,14 +93,25 @@ class ParkingState:
 
         self.last_update = datetime.now(UTC)
 
+    def apply_manual(self, slots: Dict[int, int], gate: Optional[str] = None) -> None:
+        """Lệnh thủ công từ web: đặt slot/gate bất kể ``apply_payload`` chỉ nhận từ Arduino ở AUTO."""
+        for index, occupied in slots.items():
+            self.slots[index] = 1 if occupied else 0
+        if slots:
+            self.free = self.total_slots - sum(self.slots)
+        if gate is not None:
+            self.gate = gate
+        self.last_update = datetime.now(UTC)
+
     def to_dict(self) -> Dict:
+        # Copy list: apply_payload có thể sửa tại chỗ (slots[0] ở chế độ MANUAL)
         return {
-            "slots": self.slots,
+            "slots": list(self.slots),
             "free": self.free,
             "total_slots": self.total_slots,
             "gate": self.gate,
             "last_update": self.last_update.isoformat(),
-            "errors": self.errors,
+            "errors": list(self.errors),
             "operation_mode": self.operation_mode,
             "mode_locked_by": self.mode_locked_by,
             "button_pressed": self.button_pressed,
@@ -99,13 +120,44 @@ class ParkingState:
 
 
 class StateManager:
-    def __init__(self) -> None:
+    read_only = False
+
+    def __init__(
+        self,
+        buffer_size: int = WebConfig.STREAM_BUFFER,
+        touch_interval: float = WebConfig.STREAM_TOUCH_INTERVAL,
+    ) -> None:
         self._state = ParkingState()
+        # Version bắt đầu lại từ 0 mỗi lần khởi động: boot_id phân biệt các lần chạy (ETag)
+        self.boot_id = os.urandom(8).hex()
         self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._version = 0
+        self._changes: Deque[Tuple[int, Dict]] = deque(maxlen=buffer_size)
+        self._extra: Dict = {}
+        self._touch_interval = touch_interval
+        self._last_touch = 0.0
 
     def update(self, payload: Dict) -> None:
+        self._mutate(lambda state: state.apply_payload(payload))
+
+    def apply_manual(self, slots: Optional[Dict[int, int]] = None, gate: Optional[str] = None) -> None:
+        """Đặt nhiều slot và gate trong một lần cập nhật (một version, một delta)."""
+        self._mutate(lambda state: state.apply_manual(slots or {}, gate))
+
+    def _mutate(self, apply) -> None:
         with self._lock:
-            self._state.apply_payload(payload)
+            before = self._state.to_dict()
+            apply(self._state)
+            after = self._state.to_dict()
+            delta = {k: v for k, v in after.items() if k != "last_update" and v != before[k]}
+            # Arduino gửi liên tục: payload không đổi gì chỉ làm mới last_update,
+            # phát tối đa mỗi ``touch_interval`` giây để dashboard biết vẫn còn kết nối
+            now = time.monotonic()
+            if delta or now - self._last_touch >= self._touch_interval:
+                delta["last_update"] = after["last_update"]
+                self._last_touch = now
+                self._record(delta)
 
     def snapshot(self) -> Dict:
         with self._lock:
@@ -115,3 +167,72 @@ class StateManager:
         with self._lock:
             return self._state.last_update
 
+    # ------------------------------------------------------------------
+    # Luồng thay đổi cho /api/stream
+    # ------------------------------------------------------------------
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def _record(self, delta: Dict) -> None:
+        """Ghi một thay đổi (giữ ``_lock``) và đánh thức người đang chờ."""
+        self._version += 1
+        self._changes.append((self._version, delta))
+        self._changed.notify_all()
+
+    def publish(self, fields: Dict) -> None:
+        """Đưa field ngoài ``ParkingState`` (thống kê, chế độ, kết nối...) vào luồng.
+
+        Chỉ các field có giá trị khác lần trước mới tạo thay đổi mới.
+        """
+        with self._lock:
+            delta = {k: v for k, v in fields.items() if k not in self._extra or self._extra[k] != v}
+            if delta:
+                self._extra.update(delta)
+                self._record(delta)
+
+    def live_snapshot(self) -> Tuple[int, Dict]:
+        """(version, state đầy đủ kèm các field đã ``publish``) nhất quán với nhau."""
+        version, data, extra = self.export()
+        data.update(extra)
+        return version, data
+
+    def export(self) -> Tuple[int, Dict, Dict]:
+        """(version, state, field phụ) tách riêng - dùng khi ghi ra shared memory."""
+        with self._lock:
+            return self._version, self._state.to_dict(), dict(self._extra)
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[Dict]]:
+        """(version hiện tại, delta gộp các thay đổi sau ``version``).
+
+        Delta là ``{}`` nếu chưa có gì mới, ``None`` nếu ``version`` không còn
+        trong buffer (quá cũ, hoặc từ process trước) => cần gửi snapshot.
+        """
+        with self._lock:
+            current = self._version
+            if version == current:
+                return current, {}
+            oldest = self._changes[0][0] if self._changes else current + 1
+            if version > current or version < oldest - 1:
+                return current, None
+            merged: Dict = {}
+            for changed_version, delta in self._changes:
+                if changed_version > version:
+                    merged.update(delta)
+            return current, merged
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Chờ tới khi version khác ``version`` (hoặc có ``notify``/hết giờ).
+
+        Trả về True nếu đã có thay đổi mới.
+        """
+        with self._lock:
+            if self._version == version:
+                self._changed.wait(timeout)
+            return self._version != version
+
+    def notify(self) -> None:
+        """Đánh thức người chờ để họ đồng bộ lại field phụ (ví dụ thống kê vừa đổi)."""
+        with self._lock:
+            self._changed.notify_all()
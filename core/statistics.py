@@ -0,0 +1,244 @@
+"""Thống kê session/doanh thu được cập nhật dần thay vì COUNT/SUM mỗi lần poll.
+
+Các bộ đếm nằm trong bảng ``stats_counters`` (một dòng mỗi bộ đếm, kể cả bộ
+đếm theo ngày như ``sessions:2025-01-31``) và trong cache bộ nhớ:
+
+- ``ParkingService`` gọi ``stage()`` trong cùng transaction với thay đổi session,
+  nên bộ đếm trong DB luôn khớp dữ liệu đã commit.
+- Sau khi commit, các key bị đổi được xóa khỏi cache (listener ``after_commit``);
+  lần đọc sau nạp lại đúng các key đó bằng một query theo khóa chính.
+- ``reconcile()`` dựng lại toàn bộ bảng từ ``parking_sessions`` (khởi tạo lần
+  đầu, hoặc khi nghi lệch).
+
+``get_statistics()`` vì vậy tốn O(1) bất kể lịch sử lớn đến đâu.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import UTC, date, datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import delete, event, func, insert, select, update
+
+from database.db import db
+from database.models import ParkingSession, StatsCounter, as_utc
+
+logger = logging.getLogger(__name__)
+
+TOTAL_SESSIONS = "total_sessions"
+ACTIVE_SESSIONS = "active_sessions"
+COMPLETED_SESSIONS = "completed_sessions"
+TOTAL_REVENUE = "total_revenue"
+SESSIONS_PREFIX = "sessions:"
+REVENUE_PREFIX = "revenue:"
+
+GLOBAL_KEYS = (TOTAL_SESSIONS, ACTIVE_SESSIONS, COMPLETED_SESSIONS, TOTAL_REVENUE)
+
+# Nạp lại từ DB định kỳ để các process khác (worker WSGI, script) cũng thấy thay đổi
+REFRESH_INTERVAL = 10.0
+
+_PENDING_KEY = "stats_pending"
+
+
+def day_key(prefix: str, moment: Optional[datetime]) -> str:
+    """Key bộ đếm theo ngày (UTC) của ``moment``."""
+    moment = as_utc(moment) or datetime.now(UTC)
+    return f"{prefix}{moment.astimezone(UTC).date().isoformat()}"
+
+
+def _today_keys(today: Optional[date] = None) -> tuple:
+    today = (today or datetime.now(UTC).date()).isoformat()
+    return (SESSIONS_PREFIX + today, REVENUE_PREFIX + today)
+
+
+class StatisticsStore:
+    """Cache bộ đếm trong bộ nhớ, đồng bộ với bảng ``stats_counters``."""
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+        self._cache: Dict[str, int] = {}
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def version(self) -> int:
+        """Tăng mỗi khi bộ đếm thay đổi (dùng cho ETag)."""
+        return self._version
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Gọi ``callback()`` (không tham số) mỗi khi bộ đếm đổi, sau khi cache đã cập nhật."""
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Ghi
+    # ------------------------------------------------------------------
+    def stage(self, deltas: Dict[str, int]) -> None:
+        """Cộng ``deltas`` vào ``stats_counters`` trong transaction hiện tại.
+
+        Phải gọi trước ``db.session.commit()`` của thay đổi tương ứng.
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        table = StatsCounter.__table__
+        for name, delta in deltas.items():
+            result = db.session.execute(
+                update(table).where(table.c.name == name).values(value=table.c.value + delta)
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(name=name, value=delta))
+        pending = db.session.info.setdefault(_PENDING_KEY, set())
+        pending.update(deltas)
+
+    def session_started(self, session: ParkingSession) -> None:
+        self.stage({
+            TOTAL_SESSIONS: 1,
+            ACTIVE_SESSIONS: 1,
+            day_key(SESSIONS_PREFIX, session.entry_time): 1,
+        })
+
+    def session_ended(self, session: ParkingSession) -> None:
+        self.stage({ACTIVE_SESSIONS: -1, COMPLETED_SESSIONS: 1})
+
+    def revenue_changed(self, session: ParkingSession, amount: int) -> None:
+        """Doanh thu đã thu thay đổi ``amount`` (thanh toán, hoặc sửa phí session đã trả)."""
+        self.stage({
+            TOTAL_REVENUE: amount,
+            day_key(REVENUE_PREFIX, session.payment_time): amount,
+        })
+
+    def invalidate(self, names: Optional[Iterable[str]] = None) -> None:
+        """Bỏ các key khỏi cache (tất cả nếu ``names`` là None)."""
+        with self._lock:
+            if names is None:
+                self._cache.clear()
+                self._loaded_at = 0.0
+            else:
+                for name in names:
+                    self._cache.pop(name, None)
+            self._generation += 1
+            self._version += 1
+        for callback in self._listeners:
+            callback()
+
+    # ------------------------------------------------------------------
+    # Đọc
+    # ------------------------------------------------------------------
+    def counters(self, names: Iterable[str]) -> Dict[str, int]:
+        """Giá trị các bộ đếm; chỉ query DB cho key chưa có trong cache."""
+        names = tuple(names)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._loaded_at > self.refresh_interval:
+                self._cache.clear()
+                self._loaded_at = now
+            missing = [n for n in names if n not in self._cache]
+            generation = self._generation
+            if not missing:
+                return {n: self._cache[n] for n in names}
+
+        table = StatsCounter.__table__
+        rows = dict(db.session.execute(select(table.c.name, table.c.value).where(table.c.name.in_(missing))).all())
+        loaded = {n: int(rows.get(n) or 0) for n in missing}
+
+        with self._lock:
+            # Có commit xen giữa => không lưu giá trị có thể đã cũ
+            if generation == self._generation:
+                self._cache.update(loaded)
+            values = {n: self._cache.get(n, loaded.get(n, 0)) for n in names}
+            values.update({n: loaded[n] for n in missing})
+            return values
+
+    def get_statistics(self) -> dict:
+        """Cùng format với ``ParkingService.get_statistics`` trước đây."""
+        today_sessions, today_revenue = _today_keys()
+        values = self.counters(GLOBAL_KEYS + (today_sessions, today_revenue))
+        return {
+            "total_sessions": values[TOTAL_SESSIONS],
+            "active_sessions": values[ACTIVE_SESSIONS],
+            "completed_sessions": values[COMPLETED_SESSIONS],
+            "today_sessions": values[today_sessions],
+            "total_revenue": values[TOTAL_REVENUE],
+            "today_revenue": values[today_revenue],
+        }
+
+    # ------------------------------------------------------------------
+    # Đối soát
+    # ------------------------------------------------------------------
+    def compute(self) -> Dict[str, int]:
+        """Tính toàn bộ bộ đếm trực tiếp từ ``parking_sessions``."""
+        s = ParkingSession.__table__.c
+        counters: Dict[str, int] = {
+            TOTAL_SESSIONS: db.session.execute(select(func.count()).select_from(ParkingSession.__table__)).scalar() or 0,
+            ACTIVE_SESSIONS: db.session.execute(select(func.count()).where(s.status == "active")).scalar() or 0,
+            COMPLETED_SESSIONS: db.session.execute(select(func.count()).where(s.status == "completed")).scalar() or 0,
+            TOTAL_REVENUE: db.session.execute(
+                select(func.sum(s.fee_amount)).where(s.payment_status == "paid")
+            ).scalar() or 0,
+        }
+        day = func.date(s.entry_time)
+        for value, count in db.session.execute(
+            select(day, func.count()).where(s.entry_time.is_not(None)).group_by(day)
+        ):
+            counters[f"{SESSIONS_PREFIX}{value}"] = count
+        day = func.date(s.payment_time)
+        for value, total in db.session.execute(
+            select(day, func.sum(s.fee_amount))
+            .where(s.payment_status == "paid", s.payment_time.is_not(None))
+            .group_by(day)
+        ):
+            counters[f"{REVENUE_PREFIX}{value}"] = total or 0
+        return {k: int(v) for k, v in counters.items()}
+
+    def reconcile(self) -> Dict[str, int]:
+        """Dựng lại ``stats_counters`` từ đầu; trả về các giá trị đã lệch (key -> chênh lệch).
+
+        Xóa bảng trước để giữ khóa ghi của SQLite trong suốt lúc tính, tránh
+        lẫn với session được ghi song song.
+        """
+        table = StatsCounter.__table__
+        previous = dict(db.session.execute(select(table.c.name, table.c.value)).all())
+        db.session.execute(delete(table))
+        counters = self.compute()
+        if counters:
+            db.session.execute(insert(table), [{"name": k, "value": v} for k, v in counters.items()])
+        db.session.commit()
+        self.invalidate()
+
+        drift = {
+            name: counters.get(name, 0) - previous.get(name, 0)
+            for name in set(counters) | set(previous)
+            if counters.get(name, 0) != previous.get(name, 0)
+        }
+        if drift:
+            logger.warning("Đối soát thống kê: %s bộ đếm bị lệch: %s", len(drift), drift)
+        else:
+            logger.info("Đối soát thống kê: khớp (%s bộ đếm)", len(counters))
+        return drift
+
+    def ensure_initialized(self) -> None:
+        """Dựng bảng lần đầu cho DB đã có dữ liệu từ trước (cần app context)."""
+        if db.session.execute(select(StatsCounter.name).limit(1)).first() is None:
+            self.reconcile()
+
+
+statistics = StatisticsStore()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session) -> None:
+    names = session.info.pop(_PENDING_KEY, None)
+    if names:
+        statistics.invalidate(names)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
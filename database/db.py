@@ -5,17 +5,31 @@ from __future__ import annotations
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from database import storage
+
+db = SQLAlchemy(session_options={"class_": storage.RoutingSession})
 
 
 def init_db(app: Flask) -> None:
     """Initialize database with app."""
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        storage.engine_options(app.config.get("SQLALCHEMY_DATABASE_URI", "")),
+    )
     db.init_app(app)
 
     with app.app_context():
+        # WAL/pragma + pool chỉ-đọc cho SQLite trên đĩa
+        storage.configure(db.engine)
+
         # Create all tables
         db.create_all()
 
+        # Index/thay đổi cho bảng đã có từ trước
+        from database.migrations import run_migrations
+
+        run_migrations(db.engine)
+
         # Create default admin user if not exists
         from database.models import User
 
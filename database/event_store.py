@@ -0,0 +1,478 @@
+"""Kho nhật ký sự kiện append-only, tách khỏi database session.
+
+Sự kiện (session_start, session_end, payment_completed, mode_change...) được
+ghi vào một file SQLite riêng (mặc định ``events.db`` cạnh ``parking.db``):
+
+- ``append`` chỉ đưa sự kiện vào hàng đợi trong RAM; một thread ghi gom theo
+  lô (``BATCH_SIZE`` hoặc mỗi ``FLUSH_INTERVAL`` giây) vào một transaction.
+  Transaction session/thanh toán không còn ghi log cùng file, cùng khóa.
+- Giữ lại ``RETENTION_DAYS`` ngày; sự kiện cũ hơn được chuyển sang file
+  ``events-YYYY-MM-DD.jsonl.gz`` (mỗi ngày một segment nén) rồi xóa khỏi
+  SQLite. Segment quá ``ARCHIVE_RETENTION_DAYS`` ngày bị xóa hẳn.
+- Đọc theo con trỏ ``id`` giảm dần (``query(before=...)``), mỗi trang chỉ tốn
+  O(limit) nhờ khóa chính.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import EventLogConfig
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        event_type TEXT NOT NULL,
+        message TEXT NOT NULL,
+        user_id INTEGER,
+        meta TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_events_type_id ON events (event_type, id)",
+    "CREATE INDEX IF NOT EXISTS ix_events_created ON events (created_at)",
+)
+
+_INSERT = "INSERT INTO events (created_at, event_type, message, user_id, meta) VALUES (?, ?, ?, ?, ?)"
+_ARCHIVE_NAME = re.compile(r"^events-(\d{4}-\d{2}-\d{2})\.jsonl\.gz$")
+
+Row = Tuple[float, str, str, Optional[int], Optional[str]]
+
+
+@dataclass
+class Event:
+    """Một sự kiện đọc từ kho (thuộc tính giống ``SystemLog`` để template dùng chung)."""
+
+    id: int
+    created_at: datetime
+    event_type: str
+    message: str
+    user_id: Optional[int] = None
+    meta_data: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Event":
+        return cls(
+            id=row["id"],
+            created_at=datetime.fromtimestamp(row["created_at"], UTC),
+            event_type=row["event_type"],
+            message=row["message"],
+            user_id=row["user_id"],
+            meta_data=json.loads(row["meta"]) if row["meta"] else None,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "event_type": self.event_type,
+            "message": self.message,
+            "user_id": self.user_id,
+            "meta_data": self.meta_data,
+        }
+
+
+def _timestamp(moment: Optional[datetime]) -> float:
+    if moment is None:
+        return time.time()
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return moment.timestamp()
+
+
+class EventStore:
+    """Kho sự kiện: hàng đợi + thread ghi theo lô, đọc bằng kết nối riêng mỗi thread."""
+
+    def __init__(
+        self,
+        batch_size: int = EventLogConfig.BATCH_SIZE,
+        flush_interval: float = EventLogConfig.FLUSH_INTERVAL,
+        max_pending: int = EventLogConfig.MAX_PENDING,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.path: Optional[str] = None
+        self.archive_dir: Optional[str] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._queue: Deque[Row] = deque()
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._written = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._flush_requested = False
+        self._next_maintenance = 0.0
+        self.stats = {"written": 0, "batches": 0, "dropped": 0, "archived": 0, "errors": 0}
+
+    # ------------------------------------------------------------------
+    # Vòng đời
+    # ------------------------------------------------------------------
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def open(self, path: str, archive_dir: Optional[str] = None, start_thread: bool = True) -> None:
+        """Mở (tạo nếu chưa có) file sự kiện và khởi động thread ghi."""
+        self.close()
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(EventLogConfig.BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._writer = conn
+        self.path = path
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(path), EventLogConfig.ARCHIVE_DIR)
+        self._local = threading.local()
+        self._stop = False
+        self._next_maintenance = time.monotonic() + EventLogConfig.MAINTENANCE_INTERVAL
+        if start_thread:
+            self._thread = threading.Thread(target=self._loop, name="event-store-writer", daemon=True)
+            self._thread.start()
+        logger.info("Event store: %s", path)
+
+    def close(self) -> None:
+        """Ghi nốt hàng đợi rồi đóng kết nối."""
+        if self._writer is None:
+            return
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self._drain()
+        with self._write_lock:
+            self._writer.close()
+            self._writer = None
+        self.path = None
+
+    # ------------------------------------------------------------------
+    # Ghi
+    # ------------------------------------------------------------------
+    def append(
+        self,
+        event_type: str,
+        message: str,
+        user_id: Optional[int] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        """Đưa sự kiện vào hàng đợi (không chặn, không đụng tới DB)."""
+        row = (
+            _timestamp(created_at),
+            event_type,
+            message,
+            user_id,
+            json.dumps(meta, ensure_ascii=False, default=str) if meta is not None else None,
+        )
+        with self._cond:
+            if len(self._queue) >= self.max_pending:
+                # Thread ghi không theo kịp (hoặc kho chưa mở): bỏ sự kiện cũ nhất
+                self._queue.popleft()
+                self.stats["dropped"] += 1
+            self._queue.append(row)
+            self._enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Chờ tới khi mọi sự kiện đã ``append`` được ghi xuống đĩa."""
+        if self._writer is None:
+            return False
+        if self._thread is None:
+            self._drain()
+            return True
+        with self._cond:
+            target = self._enqueued
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def _take_batch(self) -> Tuple[List[Row], int]:
+        batch = list(self._queue)
+        self._queue.clear()
+        self._flush_requested = False
+        return batch, self._enqueued
+
+    def _write(self, rows: List[Row]) -> None:
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_INSERT, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self.stats["written"] += len(rows)
+        self.stats["batches"] += 1
+
+    def _drain(self) -> None:
+        with self._cond:
+            batch, upto = self._take_batch()
+        if batch and self._writer is not None:
+            self._write(batch)
+        with self._cond:
+            self._written = max(self._written, upto)
+            self._cond.notify_all()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stop or self._flush_requested or len(self._queue) >= self.batch_size,
+                    self.flush_interval,
+                )
+                if self._stop:
+                    return
+                batch, upto = self._take_batch()
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception as exc:  # pragma: no cover - chỉ log
+                self.stats["errors"] += 1
+                logger.warning("Không ghi được %s sự kiện: %s", len(batch), exc)
+            with self._cond:
+                self._written = max(self._written, upto)
+                self._cond.notify_all()
+            if time.monotonic() >= self._next_maintenance:
+                self._next_maintenance = time.monotonic() + EventLogConfig.MAINTENANCE_INTERVAL
+                try:
+                    self.enforce_retention()
+                except Exception as exc:  # pragma: no cover - chỉ log
+                    self.stats["errors"] += 1
+                    logger.warning("Lỗi dọn kho sự kiện: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Đọc
+    # ------------------------------------------------------------------
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {int(EventLogConfig.BUSY_TIMEOUT_MS)}")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def query(
+        self,
+        before: Optional[int] = None,
+        limit: int = 100,
+        event_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Tuple[List[Event], Optional[int]]:
+        """Một trang sự kiện mới nhất trước ``before`` (id), kèm con trỏ trang sau."""
+        if self._writer is None:
+            return [], None
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(int(before))
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(_timestamp(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(int(limit) + 1)
+        rows = self._reader().execute(
+            f"SELECT id, created_at, event_type, message, user_id, meta FROM events {where} "
+            "ORDER BY id DESC LIMIT ?",
+            params,
+        ).fetchall()
+        events = [Event.from_row(row) for row in rows[:limit]]
+        next_before = events[-1].id if len(rows) > limit else None
+        return events, next_before
+
+    def iter_events(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        event_type: Optional[str] = None,
+        chunk: int = 1000,
+    ) -> Iterator[Event]:
+        """Duyệt sự kiện theo id tăng dần, từng khối ``chunk`` dòng (dùng cho xuất file)."""
+        if self._writer is None:
+            return
+        clauses, params = ["id > ?"], []
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(_timestamp(until))
+        sql = (
+            "SELECT id, created_at, event_type, message, user_id, meta FROM events "
+            f"WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            rows = self._reader().execute(sql, [last_id, *params, chunk]).fetchall()
+            for row in rows:
+                yield Event.from_row(row)
+            if len(rows) < chunk:
+                return
+            last_id = rows[-1]["id"]
+
+    def event_types(self) -> List[str]:
+        if self._writer is None:
+            return []
+        return [row[0] for row in self._reader().execute("SELECT DISTINCT event_type FROM events ORDER BY 1")]
+
+    # ------------------------------------------------------------------
+    # Retention / archive
+    # ------------------------------------------------------------------
+    def enforce_retention(self, now: Optional[datetime] = None, chunk: int = 5000) -> int:
+        """Chuyển sự kiện quá hạn sang segment JSONL nén theo ngày, xóa segment quá cũ."""
+        if self._writer is None:
+            return 0
+        now = now or datetime.now(UTC)
+        cutoff = _timestamp(now - timedelta(days=EventLogConfig.RETENTION_DAYS))
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived = 0
+        while True:
+            with self._write_lock:
+                conn = self._writer
+                rows = conn.execute(
+                    "SELECT id, created_at, event_type, message, user_id, meta FROM events "
+                    "WHERE created_at < ? ORDER BY id LIMIT ?",
+                    (cutoff, chunk),
+                ).fetchall()
+                if not rows:
+                    break
+                by_day: Dict[str, List[str]] = {}
+                for row_id, created_at, event_type, message, user_id, meta in rows:
+                    moment = datetime.fromtimestamp(created_at, UTC)
+                    line = json.dumps({
+                        "id": row_id,
+                        "created_at": moment.isoformat(),
+                        "event_type": event_type,
+                        "message": message,
+                        "user_id": user_id,
+                        "meta_data": json.loads(meta) if meta else None,
+                    }, ensure_ascii=False)
+                    by_day.setdefault(moment.strftime("%Y-%m-%d"), []).append(line)
+                # Ghi segment trước, xóa sau: lỗi giữa chừng chỉ gây trùng, không mất dữ liệu
+                for day, lines in by_day.items():
+                    with gzip.open(os.path.join(self.archive_dir, f"events-{day}.jsonl.gz"), "at", encoding="utf-8") as fh:
+                        fh.write("\n".join(lines) + "\n")
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM events WHERE created_at < ? AND id <= ?", (cutoff, rows[-1][0]))
+                conn.execute("COMMIT")
+            archived += len(rows)
+        if archived:
+            with self._write_lock:
+                self._writer.execute("PRAGMA incremental_vacuum").fetchall()
+            self.stats["archived"] += archived
+            logger.info("Event store: đã chuyển %s sự kiện cũ sang archive", archived)
+        self._prune_archives(now)
+        return archived
+
+    def _prune_archives(self, now: datetime) -> None:
+        oldest = (now - timedelta(days=EventLogConfig.ARCHIVE_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        for name in self.archives():
+            if _ARCHIVE_NAME.match(name).group(1) < oldest:
+                os.remove(os.path.join(self.archive_dir, name))
+
+    def archives(self) -> List[str]:
+        """Tên các segment đã nén, cũ trước."""
+        if not self.archive_dir or not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(name for name in os.listdir(self.archive_dir) if _ARCHIVE_NAME.match(name))
+
+    # ------------------------------------------------------------------
+    # Chuyển dữ liệu cũ từ bảng system_logs
+    # ------------------------------------------------------------------
+    def import_legacy_logs(self, chunk: int = 2000) -> int:
+        """Chuyển các dòng ``system_logs`` sang kho sự kiện rồi xóa khỏi DB chính (cần app context)."""
+        from sqlalchemy import delete, select
+
+        from database.db import db
+        from database.models import SystemLog
+
+        if self._writer is None:
+            return 0
+        table = SystemLog.__table__
+        moved = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.created_at, table.c.event_type, table.c.message,
+                       table.c.user_id, table.c.meta_data)
+                .order_by(table.c.id)
+                .limit(chunk)
+            ).all()
+            if not rows:
+                break
+            self._write([
+                (_timestamp(created_at), event_type, message, user_id,
+                 json.dumps(meta, ensure_ascii=False, default=str) if meta is not None else None)
+                for _, created_at, event_type, message, user_id, meta in rows
+            ])
+            db.session.execute(delete(table).where(table.c.id <= rows[-1].id))
+            db.session.commit()
+            moved += len(rows)
+        if moved:
+            logger.info("Event store: đã chuyển %s dòng system_logs cũ", moved)
+        return moved
+
+    def describe(self) -> dict:
+        """Số liệu cho ``/api/admin/storage``."""
+        info = {
+            "path": self.path,
+            "pending": len(self._queue),
+            "archives": len(self.archives()),
+            **self.stats,
+        }
+        if self.path and os.path.exists(self.path):
+            info["db_bytes"] = os.path.getsize(self.path)
+        return info
+
+
+def init_event_store(app, store: Optional[EventStore] = None) -> EventStore:
+    """Mở kho sự kiện cho ``app`` (mặc định ``events.db`` cạnh file database chính)."""
+    from database.db import db
+
+    store = store or event_store
+    path = app.config.get("EVENTS_DATABASE_PATH") or os.getenv("EVENTS_DATABASE_PATH")
+    with app.app_context():
+        if not path:
+            main_path = db.engine.url.database
+            if not main_path or main_path == ":memory:":
+                return store
+            path = os.path.join(os.path.dirname(os.path.abspath(main_path)), EventLogConfig.FILENAME)
+        store.open(path)
+        store.import_legacy_logs()
+    return store
+
+
+event_store = EventStore()
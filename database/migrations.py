@@ -0,0 +1,61 @@
+"""Migration schema đơn giản theo ``PRAGMA user_version`` của SQLite.
+
+``db.create_all()`` chỉ tạo bảng mới, không thêm index vào bảng đã có, nên
+các thay đổi trên bảng cũ được ghi thành migration đánh số tăng dần. Mỗi
+migration phải chạy lại được nhiều lần (``CREATE INDEX IF NOT EXISTS``...).
+Với DB khác SQLite (không có ``user_version``) mọi migration được chạy lại
+mỗi lần khởi động, nhờ tính idempotent ở trên.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+
+def _create_model_indexes(*table_names: str) -> Callable[[Connection], None]:
+    def migrate(conn: Connection) -> None:
+        from database.db import db
+
+        for name in table_names:
+            for index in db.metadata.tables[name].indexes:
+                index.create(conn, checkfirst=True)
+
+    return migrate
+
+
+# (version, mô tả, hàm migrate)
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Index cho các truy vấn nóng trên parking_sessions/system_logs",
+     _create_model_indexes("parking_sessions", "system_logs")),
+    (2, "Index cho phân trang keyset lịch sử theo slot và danh sách user",
+     _create_model_indexes("parking_sessions", "users")),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: Connection) -> int:
+    if conn.dialect.name != "sqlite":
+        return 0
+    return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+
+def run_migrations(engine) -> int:
+    """Chạy các migration chưa áp dụng; trả về version sau khi chạy."""
+    with engine.begin() as conn:
+        current = get_version(conn)
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Áp dụng migration %s: %s", version, description)
+            migrate(conn)
+            if conn.dialect.name == "sqlite":
+                # PRAGMA không nhận tham số bind
+                conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+            current = version
+    return current
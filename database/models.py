@@ -11,10 +11,21 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from database.db import db
 
 
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite trả datetime không có tzinfo (đã lưu theo UTC) => gắn lại UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
 class User(UserMixin, db.Model):
     """User model with authentication."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Phân trang keyset danh sách user theo (created_at, id)
+        db.Index("ix_users_created", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
@@ -31,8 +42,10 @@ class User(UserMixin, db.Model):
     parking_sessions = db.relationship("ParkingSession", back_populates="user", lazy="dynamic")
 
     def set_password(self, password: str) -> None:
-        """Hash and set password."""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set password (tham số theo AuthConfig, xem auth/hashing.py)."""
+        from auth.hashing import hash_method
+
+        self.password_hash = generate_password_hash(password, method=hash_method())
 
     def check_password(self, password: str) -> bool:
         """Check password."""
@@ -50,6 +63,27 @@ class ParkingSession(db.Model):
     """Parking session record."""
 
     __tablename__ = "parking_sessions"
+    __table_args__ = (
+        # start/end_session: tìm session active của một slot
+        db.Index("ix_parking_sessions_slot_status", "slot_id", "status"),
+        # Chỉ chứa session đang đỗ: danh sách active, session active cũ nhất
+        db.Index(
+            "ix_parking_sessions_active_entry",
+            "entry_time",
+            sqlite_where=db.text("status = 'active'"),
+            postgresql_where=db.text("status = 'active'"),
+        ),
+        # Lịch sử của một user, mới nhất trước
+        db.Index("ix_parking_sessions_user_entry", "user_id", "entry_time"),
+        # Lịch sử một slot (lọc slot_id khi phân trang)
+        db.Index("ix_parking_sessions_slot_entry", "slot_id", "entry_time"),
+        # Doanh thu đã thu theo thời điểm thanh toán
+        db.Index("ix_parking_sessions_payment", "payment_status", "payment_time"),
+        # Lịch sử toàn bãi và phân trang keyset theo (entry_time, id)
+        db.Index("ix_parking_sessions_entry_id", "entry_time", "id"),
+        # Rollup/sketch: session kết thúc trong một khoảng thời gian
+        db.Index("ix_parking_sessions_exit_time", "exit_time"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
@@ -74,7 +108,7 @@ class ParkingSession(db.Model):
         """Mark session as completed."""
         self.exit_time = datetime.now(UTC)
         if self.entry_time:
-            delta = self.exit_time - self.entry_time
+            delta = self.exit_time - as_utc(self.entry_time)
             self.duration_minutes = int(delta.total_seconds() / 60)
         self.status = "completed"
 
@@ -118,9 +152,12 @@ class PricingRule(db.Model):
 
 
 class SystemLog(db.Model):
-    """System event log."""
+    """System event log (cũ: sự kiện mới ghi vào database/event_store.py, bảng này chỉ còn để chuyển dữ liệu)."""
 
     __tablename__ = "system_logs"
+    __table_args__ = (
+        db.Index("ix_system_logs_event_created", "event_type", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     event_type = db.Column(db.String(50), nullable=False)  # gate_open, gate_close, slot_change, etc.
@@ -132,3 +169,72 @@ class SystemLog(db.Model):
     def __repr__(self) -> str:
         return f"<SystemLog {self.event_type} at {self.created_at}>"
 
+
+class StatsCounter(db.Model):
+    """Bộ đếm thống kê được cập nhật dần (xem core/statistics.py)."""
+
+    __tablename__ = "stats_counters"
+
+    name = db.Column(db.String(64), primary_key=True)  # total_sessions, sessions:2025-01-31, ...
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<StatsCounter {self.name}={self.value}>"
+
+
+class VersionCounter(db.Model):
+    """Version dùng chung giữa các process (ví dụ bảng giá, xem core/pricing_engine.py)."""
+
+    __tablename__ = "version_counters"
+
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<VersionCounter {self.name}={self.value}>"
+
+
+class SessionRollup(db.Model):
+    """Tổng hợp session theo giờ/ngày và theo slot (xem core/rollups.py)."""
+
+    __tablename__ = "session_rollups"
+
+    granularity = db.Column(db.String(8), primary_key=True)  # hour, day
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Đầu giờ/ngày (UTC)
+    slot_id = db.Column(db.Integer, primary_key=True)
+    sessions_started = db.Column(db.Integer, nullable=False, default=0)
+    sessions_ended = db.Column(db.Integer, nullable=False, default=0)
+    occupancy_minutes = db.Column(db.Float, nullable=False, default=0.0)  # Tổng phút có xe trong bucket
+    revenue = db.Column(db.Integer, nullable=False, default=0)  # Phí đã thu (theo payment_time)
+    dwell_minutes = db.Column(db.Integer, nullable=False, default=0)  # Tổng thời gian đỗ của các lượt kết thúc
+
+    def __repr__(self) -> str:
+        return f"<SessionRollup {self.granularity} {self.bucket_start} slot {self.slot_id}>"
+
+
+class RollupWatermark(db.Model):
+    """Mốc thời gian mà trước đó các rollup đã chốt."""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = db.Column(db.String(32), primary_key=True)
+    watermark = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+    def __repr__(self) -> str:
+        return f"<RollupWatermark {self.name}={self.watermark}>"
+
+
+class DwellSketch(db.Model):
+    """Quantile sketch thời gian đỗ đã tuần tự hóa (xem core/dwell_sketches.py)."""
+
+    __tablename__ = "dwell_sketches"
+
+    scope = db.Column(db.String(8), primary_key=True)  # hour, day, how (giờ trong tuần)
+    bucket = db.Column(db.Integer, primary_key=True)  # Số giờ/ngày từ epoch (UTC), hoặc 0-167 với how
+    slot_id = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<DwellSketch {self.scope}:{self.bucket} slot {self.slot_id} n={self.count}>"
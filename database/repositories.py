@@ -0,0 +1,197 @@
+"""Lớp đọc (read model) cho các API JSON: chỉ chọn đúng cột cần, không tạo ORM entity.
+
+Mỗi truy vấn là một ``SELECT`` cột tường minh (kèm ``JOIN`` khi cần tên user),
+kết quả là dataclass nhẹ (``slots``) thay vì đối tượng ORM đầy đủ: không có
+identity map, không lazy-load quan hệ (hết N+1 ``s.user.username``), ít cấp
+phát hơn cho mỗi request. Ghi dữ liệu vẫn đi qua model/service như cũ.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database.db import db
+from database.event_store import Event, event_store
+from database.models import ParkingSession, PricingRule, User
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page, split_page
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+# ----------------------------------------------------------------------
+# Parking sessions
+# ----------------------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class SessionRow:
+    id: int
+    slot_id: int
+    user_id: Optional[int]
+    username: Optional[str]
+    vehicle_plate: Optional[str]
+    entry_time: datetime
+    exit_time: Optional[datetime]
+    duration_minutes: Optional[int]
+    status: str
+    fee_amount: Optional[int]
+    payment_status: Optional[str]
+
+
+_s = ParkingSession.__table__.c
+_u = User.__table__.c
+_SESSION_COLUMNS = (
+    _s.id, _s.slot_id, _s.user_id, _u.username, _s.vehicle_plate, _s.entry_time, _s.exit_time,
+    _s.duration_minutes, _s.status, _s.fee_amount, _s.payment_status,
+)
+
+
+def _session_select():
+    return select(*_SESSION_COLUMNS).select_from(
+        ParkingSession.__table__.outerjoin(User.__table__, _s.user_id == _u.id)
+    )
+
+
+class SessionRepository:
+    """Truy vấn chỉ-đọc trên ``parking_sessions``."""
+
+    @staticmethod
+    def get(session_id: int) -> Optional[SessionRow]:
+        row = db.session.execute(_session_select().where(_s.id == session_id)).first()
+        return SessionRow(*row) if row else None
+
+    @staticmethod
+    def for_user(user_id: int, limit: int = 10) -> List[SessionRow]:
+        stmt = _session_select().where(_s.user_id == user_id).order_by(_s.entry_time.desc()).limit(limit)
+        return [SessionRow(*row) for row in db.session.execute(stmt)]
+
+    @staticmethod
+    def page(
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        slot_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[List[SessionRow], Optional[str]]:
+        """Một trang lịch sử (mới nhất trước) theo keyset ``(entry_time, id)``.
+
+        ``start``/``end`` lọc theo giờ vào. Lỗi cursor => ``InvalidCursor`` (ValueError).
+        """
+        stmt = _session_select()
+        if slot_id is not None:
+            stmt = stmt.where(_s.slot_id == slot_id)
+        if user_id is not None:
+            stmt = stmt.where(_s.user_id == user_id)
+        if status:
+            stmt = stmt.where(_s.status == status)
+        if payment_status:
+            stmt = stmt.where(_s.payment_status == payment_status)
+        if start is not None:
+            stmt = stmt.where(_s.entry_time >= start)
+        if end is not None:
+            stmt = stmt.where(_s.entry_time < end)
+        stmt = keyset_page(stmt, (_s.entry_time, _s.id), cursor, limit)
+        rows = [SessionRow(*row) for row in db.session.execute(stmt)]
+        return split_page(rows, limit, lambda r: (r.entry_time, r.id))
+
+
+# ----------------------------------------------------------------------
+# Users
+# ----------------------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class UserRow:
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    created_at: datetime
+    last_login: Optional[datetime]
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = _iso(self.created_at)
+        data["last_login"] = _iso(self.last_login)
+        return data
+
+
+class UserRepository:
+    """Danh sách user cho trang admin/API (không tải ``password_hash``)."""
+
+    @staticmethod
+    def page(
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        role: Optional[str] = None,
+        is_active: Optional[bool] = None,
+    ) -> Tuple[List[UserRow], Optional[str]]:
+        stmt = select(_u.id, _u.username, _u.email, _u.full_name, _u.role, _u.is_active, _u.created_at, _u.last_login)
+        if role:
+            stmt = stmt.where(_u.role == role)
+        if is_active is not None:
+            stmt = stmt.where(_u.is_active == is_active)
+        stmt = keyset_page(stmt, (_u.created_at, _u.id), cursor, limit)
+        rows = [UserRow(*row) for row in db.session.execute(stmt)]
+        return split_page(rows, limit, lambda r: (r.created_at, r.id))
+
+
+# ----------------------------------------------------------------------
+# Pricing rules
+# ----------------------------------------------------------------------
+@dataclass(frozen=True, slots=True)
+class PricingRuleRow:
+    id: int
+    name: str
+    rule_type: str
+    is_active: bool
+    priority: Optional[int]
+    start_hour: Optional[int]
+    end_hour: Optional[int]
+    days_of_week: Optional[str]
+    first_hour_fee: Optional[int]
+    subsequent_hour_fee: Optional[int]
+    flat_rate_fee: Optional[int]
+    overnight_fee: Optional[int]
+    user_id: Optional[int]
+    description: Optional[str]
+    created_at: datetime
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = _iso(self.created_at)
+        return data
+
+
+class PricingRuleRepository:
+    @staticmethod
+    def list_all() -> List[PricingRuleRow]:
+        """Mọi rule, ưu tiên cao và mới tạo trước."""
+        r = PricingRule.__table__.c
+        stmt = select(
+            r.id, r.name, r.rule_type, r.is_active, r.priority, r.start_hour, r.end_hour, r.days_of_week,
+            r.first_hour_fee, r.subsequent_hour_fee, r.flat_rate_fee, r.overnight_fee, r.user_id,
+            r.description, r.created_at,
+        ).order_by(r.priority.desc(), r.created_at.desc())
+        return [PricingRuleRow(*row) for row in db.session.execute(stmt)]
+
+
+# ----------------------------------------------------------------------
+# Nhật ký sự kiện (bảng system_logs cũ đã chuyển sang database/event_store.py)
+# ----------------------------------------------------------------------
+class LogRepository:
+    @staticmethod
+    def page(cursor: Optional[str] = None, limit: int = 100, **filters) -> Tuple[List[Event], Optional[str]]:
+        """Trang nhật ký mới nhất trước; con trỏ là id sự kiện (tăng theo thứ tự ghi) dạng opaque."""
+        before = decode_cursor(cursor, 1)[0] if cursor else None
+        if before is not None and not isinstance(before, int):
+            raise InvalidCursor("cursor không hợp lệ")
+        logs, next_before = event_store.query(before=before, limit=limit, **filters)
+        return logs, encode_cursor(next_before) if next_before is not None else None
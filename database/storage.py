@@ -0,0 +1,237 @@
+"""Cấu hình lưu trữ SQLite cho chạy thật trên Raspberry Pi (thẻ SD).
+
+- Pragma áp dụng cho mỗi kết nối: WAL, ``synchronous=NORMAL``, ``busy_timeout``,
+  ``mmap_size``, ``cache_size`` (xem ``StorageConfig``).
+- Một engine ghi duy nhất (pool 1 kết nối) và một pool kết nối chỉ-đọc
+  (``mode=ro``) cho request handler. ``RoutingSession`` gửi SELECT sang pool đọc,
+  trừ khi session đang flush hoặc đã ghi trong transaction hiện tại (khi đó
+  đọc từ kết nối ghi để thấy dữ liệu chưa commit của chính nó).
+- Thread bảo trì chạy ``wal_checkpoint`` và ``incremental_vacuum`` định kỳ.
+
+Với WAL, người đọc không bao giờ bị chặn bởi người ghi, nên dashboard poll
+không phải chờ các transaction session/thống kê.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+from config import StorageConfig
+
+logger = logging.getLogger(__name__)
+
+_WRITER_PINNED = "storage_writer_pinned"
+
+# engine ghi -> engine chỉ-đọc tương ứng
+_readers: Dict[Engine, Engine] = {}
+
+
+def _apply_pragmas(dbapi_connection, readonly: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(StorageConfig.BUSY_TIMEOUT_MS)}")
+        if not readonly:
+            # Chỉ có tác dụng với DB mới (phải đặt trước journal_mode); DB cũ cần VACUUM một lần
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute(f"PRAGMA journal_mode = {StorageConfig.JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {StorageConfig.SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {int(StorageConfig.MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size = {-int(StorageConfig.CACHE_SIZE_KB)}")
+        if readonly:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+def sqlite_file_path(url: str) -> Optional[str]:
+    """Đường dẫn file nếu ``url`` là SQLite trên đĩa, ngược lại None."""
+    if not url.startswith("sqlite:"):
+        return None
+    path = url.split("sqlite:///", 1)[-1] if "sqlite:///" in url else ""
+    path = path.split("?", 1)[0]
+    if not path or path == ":memory:" or path.startswith("file::memory:"):
+        return None
+    return path
+
+
+def engine_options(url: str) -> dict:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` cho engine ghi."""
+    if not StorageConfig.ENABLED or sqlite_file_path(url) is None:
+        return {}
+    return {
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": StorageConfig.WRITER_POOL_TIMEOUT,
+        "connect_args": {"check_same_thread": False, "timeout": StorageConfig.BUSY_TIMEOUT_MS / 1000},
+    }
+
+
+def configure(writer: Engine) -> Optional[Engine]:
+    """Gắn pragma cho engine ghi và tạo engine chỉ-đọc (gọi sau ``db.init_app``)."""
+    if not StorageConfig.ENABLED or writer.dialect.name != "sqlite":
+        return None
+    path = writer.url.database
+    if not path or path == ":memory:":
+        return None
+
+    event.listen(writer, "connect", lambda conn, _record: _apply_pragmas(conn, readonly=False))
+    # Mở kết nối ghi trước để file WAL/-shm tồn tại cho kết nối chỉ-đọc
+    with writer.connect():
+        pass
+
+    if not StorageConfig.SPLIT_READS:
+        return None
+    reader = create_engine(
+        f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true",
+        pool_size=StorageConfig.READ_POOL_SIZE,
+        max_overflow=StorageConfig.READ_POOL_OVERFLOW,
+        connect_args={"check_same_thread": False, "timeout": StorageConfig.BUSY_TIMEOUT_MS / 1000},
+    )
+    event.listen(reader, "connect", lambda conn, _record: _apply_pragmas(conn, readonly=True))
+    _readers[writer] = reader
+    logger.info("SQLite: WAL + pool đọc %s kết nối cho %s", StorageConfig.READ_POOL_SIZE, path)
+    return reader
+
+
+def reader_for(writer: Engine) -> Optional[Engine]:
+    return _readers.get(writer)
+
+
+class RoutingSession(Session):
+    """Session gửi SELECT sang engine chỉ-đọc khi an toàn."""
+
+    reads_routed = 0
+    reads_on_writer = 0
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not isinstance(clause, Select):
+            return engine
+        reader = _readers.get(engine)
+        if reader is None:
+            return engine
+        if self._flushing or self.info.get(_WRITER_PINNED):
+            RoutingSession.reads_on_writer += 1
+            return engine
+        RoutingSession.reads_routed += 1
+        return reader
+
+
+def pin_writer(session) -> None:
+    """Các lần đọc sau trong transaction này dùng kết nối ghi."""
+    session.info[_WRITER_PINNED] = True
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _pin_on_flush(session, flush_context, instances) -> None:
+    pin_writer(session)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _pin_on_write(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        pin_writer(orm_execute_state.session)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _unpin(session) -> None:
+    session.info.pop(_WRITER_PINNED, None)
+
+
+class StorageMaintenance:
+    """Thread chạy WAL checkpoint và incremental vacuum định kỳ, giữ số liệu để xem."""
+
+    def __init__(self, interval: float = StorageConfig.CHECKPOINT_INTERVAL) -> None:
+        self.interval = interval
+        self._engine: Optional[Engine] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {
+            "checkpoints": 0,
+            "last_checkpoint": None,
+            "last_checkpoint_ms": None,
+            "wal_frames_checkpointed": 0,
+            "checkpoint_busy": 0,
+            "vacuum_runs": 0,
+            "pages_vacuumed": 0,
+            "errors": 0,
+        }
+
+    def start(self, engine: Engine) -> None:
+        if engine.dialect.name != "sqlite" or (self._thread and self._thread.is_alive()):
+            return
+        self._engine = engine
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sqlite-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as exc:  # pragma: no cover - chỉ log
+                self.stats["errors"] += 1
+                logger.warning("Lỗi bảo trì SQLite: %s", exc)
+
+    def run_once(self, engine: Optional[Engine] = None) -> dict:
+        """Checkpoint WAL (PASSIVE: không chặn ai) rồi trả lại tối đa VACUUM_PAGES trang trống."""
+        engine = engine or self._engine
+        with self._lock, engine.connect() as conn:
+            started = time.perf_counter()
+            busy, wal_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").one()
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stats["checkpoints"] += 1
+            self.stats["checkpoint_busy"] += int(busy)
+            self.stats["wal_frames_checkpointed"] += max(int(checkpointed), 0)
+            self.stats["last_checkpoint"] = {"busy": busy, "wal_frames": wal_frames, "checkpointed": checkpointed}
+            self.stats["last_checkpoint_ms"] = round(elapsed, 2)
+
+            freelist = conn.exec_driver_sql("PRAGMA freelist_count").scalar() or 0
+            auto_vacuum = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+            if freelist and auto_vacuum == 2:  # INCREMENTAL
+                pages = min(freelist, StorageConfig.VACUUM_PAGES)
+                conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(pages)})").all()
+                conn.commit()
+                self.stats["vacuum_runs"] += 1
+                self.stats["pages_vacuumed"] += pages
+        return dict(self.stats)
+
+    def describe(self, engine: Engine) -> dict:
+        """Số liệu hiện tại cho ``/api/admin/storage``."""
+        info: dict = {"maintenance": dict(self.stats), "running": bool(self._thread and self._thread.is_alive())}
+        if engine.dialect.name != "sqlite":
+            return info
+        with engine.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size",
+                           "auto_vacuum", "page_size", "page_count", "freelist_count"):
+                info[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        path = engine.url.database
+        if path and path != ":memory:":
+            info["db_bytes"] = os.path.getsize(path) if os.path.exists(path) else 0
+            info["wal_bytes"] = os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else 0
+        info["writer_pool"] = engine.pool.status()
+        reader = reader_for(engine)
+        info["reader_pool"] = reader.pool.status() if reader is not None else None
+        info["reads_routed"] = RoutingSession.reads_routed
+        info["reads_on_writer"] = RoutingSession.reads_on_writer
+        return info
+
+
+storage_maintenance = StorageMaintenance()
@@ -3,26 +3,21 @@
 from __future__ import annotations
 
 import logging
-import time
 from typing import Optional
 
 from config import BuzzerConfig, GPIOPins
-
-try:
-    import RPi.GPIO as GPIO  # type: ignore
-except ImportError:  # pragma: no cover
-    GPIO = None
+from hardware.backends import HardwareBackend, get_backend
 
 logger = logging.getLogger(__name__)
 
 
 class Buzzer:
-    def __init__(self, pin: int = GPIOPins.BUZZER_PIN) -> None:
+    def __init__(self, pin: int = GPIOPins.BUZZER_PIN, backend: Optional[HardwareBackend] = None) -> None:
         self.pin = pin
-        self._enabled = GPIO is not None
+        self._backend = backend or get_backend()
+        self._enabled = self._backend is not None and self._backend.supports_gpio
         if self._enabled:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(self.pin, GPIO.OUT)
+            self._backend.setup_output(self.pin)
         else:
             logger.warning("RPi.GPIO chưa sẵn sàng, buzzer sẽ không hoạt động.")
 
@@ -34,9 +29,8 @@ class Buzzer:
 
     def _emit(self, duration: float) -> None:
         if self._enabled:
-            GPIO.output(self.pin, GPIO.HIGH)
-            time.sleep(duration)
-            GPIO.output(self.pin, GPIO.LOW)
+            self._backend.write(self.pin, True)
+            self._backend.sleep(duration)
+            self._backend.write(self.pin, False)
         else:
             logger.debug("Giả lập buzzer trong %.2fs", duration)
-
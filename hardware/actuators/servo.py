@@ -7,11 +7,7 @@ import time
 from typing import Optional
 
 from config import GPIOPins, ServoConfig
-
-try:
-    import RPi.GPIO as GPIO  # type: ignore
-except ImportError:  # pragma: no cover
-    GPIO = None
+from hardware.backends import HardwareBackend, PWMChannel, get_backend
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +17,17 @@ class ServoBarrier:
         self,
         pin: int = GPIOPins.SERVO_PIN,
         frequency: int = ServoConfig.PWM_FREQUENCY,
+        backend: Optional[HardwareBackend] = None,
     ) -> None:
         self.pin = pin
         self.frequency = frequency
-        self._pwm: Optional["GPIO.PWM"] = None
-        self._enabled = GPIO is not None
+        self._pwm: Optional[PWMChannel] = None
+        self._backend = backend or get_backend()
+        self._enabled = self._backend is not None and self._backend.supports_gpio
 
         if self._enabled:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(self.pin, GPIO.OUT)
-            self._pwm = GPIO.PWM(self.pin, self.frequency)
+            self._backend.setup_output(self.pin)
+            self._pwm = self._backend.pwm(self.pin, self.frequency)
             self._pwm.start(self._angle_to_duty(ServoConfig.CLOSE_ANGLE))
             logger.info("Servo barrier khởi tạo trên pin %s", pin)
         else:
@@ -41,23 +38,28 @@ class ServoBarrier:
 
     def _set_angle(self, angle: float) -> None:
         if self._enabled and self._pwm:
-            self._pwm.ChangeDutyCycle(self._angle_to_duty(angle))
+            self._pwm.change_duty_cycle(self._angle_to_duty(angle))
         else:
             logger.debug("Giả lập servo set angle=%s", angle)
 
+    def _sleep(self, seconds: float) -> None:
+        if self._backend is not None:
+            self._backend.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
     def open(self) -> None:
         logger.info("Mở barrier")
         self._set_angle(ServoConfig.OPEN_ANGLE)
-        time.sleep(ServoConfig.OPEN_DELAY)
+        self._sleep(ServoConfig.OPEN_DELAY)
 
     def close(self) -> None:
         logger.info("Đóng barrier")
         self._set_angle(ServoConfig.CLOSE_ANGLE)
-        time.sleep(ServoConfig.CLOSE_DELAY)
+        self._sleep(ServoConfig.CLOSE_DELAY)
 
     def cleanup(self) -> None:
         if self._enabled:
             if self._pwm:
                 self._pwm.stop()
-            GPIO.cleanup(self.pin)
-
+            self._backend.cleanup(self.pin)
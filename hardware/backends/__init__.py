@@ -0,0 +1,61 @@
+"""Chọn backend phần cứng (Pi thật hoặc mô phỏng) cho các driver."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Optional
+
+from config import HardwareConfig
+
+from .base import HardwareBackend, PWMChannel
+from .rpi import RPiBackend
+from .simulated import SimulatedBackend, SimulatedCharLCD, SimulatedPWM
+
+logger = logging.getLogger(__name__)
+
+_backend: Optional[HardwareBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: Optional[str] = None) -> Optional[HardwareBackend]:
+    """Tạo backend theo tên: ``auto``, ``rpi``, ``simulated`` hoặc ``none``."""
+    name = (name or os.getenv("HARDWARE_BACKEND") or HardwareConfig.BACKEND).lower()
+    if name in ("auto", "rpi"):
+        return RPiBackend()
+    if name in ("simulated", "sim"):
+        logger.info("Dùng backend phần cứng mô phỏng.")
+        return SimulatedBackend()
+    if name == "none":
+        return None
+    raise ValueError(f"Hardware backend không hợp lệ: {name}")
+
+
+def get_backend() -> Optional[HardwareBackend]:
+    """Backend dùng chung cho các driver (khởi tạo lười theo cấu hình)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend: Optional[HardwareBackend]) -> None:
+    """Thay backend dùng chung (dùng trong test/benchmark)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+__all__ = [
+    "HardwareBackend",
+    "PWMChannel",
+    "RPiBackend",
+    "SimulatedBackend",
+    "SimulatedCharLCD",
+    "SimulatedPWM",
+    "create_backend",
+    "get_backend",
+    "set_backend",
+]
@@ -0,0 +1,81 @@
+"""Giao diện chung cho backend GPIO/I2C."""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class PWMChannel(ABC):
+    """Kênh PWM trên một chân GPIO."""
+
+    @abstractmethod
+    def start(self, duty_cycle: float) -> None:
+        """Bắt đầu phát xung với duty cycle (%)."""
+
+    @abstractmethod
+    def change_duty_cycle(self, duty_cycle: float) -> None:
+        """Đổi duty cycle (%)."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Dừng phát xung."""
+
+
+class HardwareBackend(ABC):
+    """Backend phần cứng mà các driver trong ``hardware/`` sử dụng.
+
+    Driver không import ``RPi.GPIO``/``RPLCD`` trực tiếp nữa mà gọi qua backend,
+    nhờ đó cùng một đoạn code chạy được trên Pi thật lẫn trên máy Linux thường
+    (backend mô phỏng).
+    """
+
+    name = "base"
+
+    @property
+    def supports_gpio(self) -> bool:
+        return True
+
+    @property
+    def supports_lcd(self) -> bool:
+        return True
+
+    @abstractmethod
+    def setup_output(self, pin: int) -> None:
+        """Cấu hình chân output."""
+
+    @abstractmethod
+    def setup_input(self, pin: int) -> None:
+        """Cấu hình chân input."""
+
+    @abstractmethod
+    def write(self, pin: int, value: bool) -> None:
+        """Ghi mức logic ra chân output."""
+
+    @abstractmethod
+    def read(self, pin: int) -> int:
+        """Đọc mức logic (0/1) của chân input."""
+
+    @abstractmethod
+    def pwm(self, pin: int, frequency: float) -> PWMChannel:
+        """Tạo kênh PWM trên chân ``pin``."""
+
+    @abstractmethod
+    def char_lcd(self, address: int, cols: int, rows: int) -> Any:
+        """Tạo LCD ký tự qua I2C (API giống ``RPLCD.i2c.CharLCD``)."""
+
+    def cleanup(self, pin: Optional[int] = None) -> None:
+        """Giải phóng chân GPIO (mặc định không làm gì)."""
+
+    # Đồng hồ: driver dùng hai hàm này thay cho ``time`` để backend mô phỏng
+    # có thể chạy trên đồng hồ ảo.
+    def monotonic(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def stats(self) -> dict:
+        """Thống kê hoạt động của backend (nếu có)."""
+        return {"backend": self.name}
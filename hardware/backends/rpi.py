@@ -0,0 +1,78 @@
+"""Backend dùng RPi.GPIO và RPLCD trên Raspberry Pi thật."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+from .base import HardwareBackend, PWMChannel
+
+try:
+    import RPi.GPIO as GPIO  # type: ignore
+except ImportError:  # pragma: no cover - chỉ có trên Pi
+    GPIO = None
+
+try:
+    from RPLCD.i2c import CharLCD  # type: ignore
+except ImportError:  # pragma: no cover
+    CharLCD = None
+
+logger = logging.getLogger(__name__)
+
+
+class _RPiPWM(PWMChannel):
+    def __init__(self, pwm: "GPIO.PWM") -> None:
+        self._pwm = pwm
+
+    def start(self, duty_cycle: float) -> None:
+        self._pwm.start(duty_cycle)
+
+    def change_duty_cycle(self, duty_cycle: float) -> None:
+        self._pwm.ChangeDutyCycle(duty_cycle)
+
+    def stop(self) -> None:
+        self._pwm.stop()
+
+
+class RPiBackend(HardwareBackend):
+    """Bọc RPi.GPIO (BCM) và RPLCD; thiếu thư viện nào thì tắt phần đó."""
+
+    name = "rpi"
+
+    def __init__(self) -> None:
+        if GPIO is not None:
+            GPIO.setmode(GPIO.BCM)
+
+    @property
+    def supports_gpio(self) -> bool:
+        return GPIO is not None
+
+    @property
+    def supports_lcd(self) -> bool:
+        return CharLCD is not None
+
+    def setup_output(self, pin: int) -> None:
+        GPIO.setup(pin, GPIO.OUT)
+
+    def setup_input(self, pin: int) -> None:
+        GPIO.setup(pin, GPIO.IN)
+
+    def write(self, pin: int, value: bool) -> None:
+        GPIO.output(pin, GPIO.HIGH if value else GPIO.LOW)
+
+    def read(self, pin: int) -> int:
+        return GPIO.input(pin)
+
+    def pwm(self, pin: int, frequency: float) -> PWMChannel:
+        return _RPiPWM(GPIO.PWM(pin, frequency))
+
+    def char_lcd(self, address: int, cols: int, rows: int) -> Any:
+        return CharLCD(i2c_expander="PCF8574", address=address, cols=cols, rows=rows)
+
+    def cleanup(self, pin: Optional[int] = None) -> None:
+        if GPIO is None:
+            return
+        if pin is None:
+            GPIO.cleanup()
+        else:
+            GPIO.cleanup(pin)
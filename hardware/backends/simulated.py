@@ -0,0 +1,285 @@
+"""Backend mô phỏng GPIO/I2C có mô hình thời gian để test và benchmark trên PC.
+
+Mô hình:
+- HC-SR04: sau sườn xuống của TRIG, ECHO lên HIGH sau ``echo_latency`` giây và
+  giữ HIGH trong ``distance / 17150`` giây (đúng công thức driver dùng).
+- PWM: ghi lại lịch sử duty cycle để đo độ trễ actuator.
+- LCD PCF8574 (4-bit): mỗi byte HD44780 = 2 nibble x 3 giao dịch I2C
+  (data, E=1, E=0), mỗi giao dịch ~20 bit clock; cộng thời gian thực thi lệnh.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from config import HardwareConfig
+
+from .base import HardwareBackend, PWMChannel
+
+logger = logging.getLogger(__name__)
+
+SPEED_OF_SOUND_HALF = 17150.0  # cm/s, chia 2 cho quãng đường đi-về
+
+I2C_BITS_PER_TRANSACTION = 20  # start + địa chỉ + data + ACK + stop
+I2C_TRANSACTIONS_PER_LCD_BYTE = 6  # 2 nibble x (data, E=1, E=0)
+HD44780_CMD_EXEC = 0.000037
+HD44780_CLEAR_EXEC = 0.00152
+
+Distance = Union[None, float, Callable[[float], Optional[float]]]
+
+
+class _VirtualClock:
+    """Đồng hồ ảo: chỉ tiến khi sleep hoặc khi có thao tác tốn thời gian."""
+
+    def __init__(self) -> None:
+        self._now = 0.0
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._now += seconds
+
+
+@dataclass
+class _EchoChannel:
+    trig_pin: int
+    echo_pin: int
+    distance: Distance = None
+    rise_at: Optional[float] = None
+    fall_at: Optional[float] = None
+
+
+class SimulatedPWM(PWMChannel):
+    """Kênh PWM mô phỏng, lưu lịch sử (thời điểm, duty cycle)."""
+
+    def __init__(self, backend: "SimulatedBackend", pin: int, frequency: float) -> None:
+        self._backend = backend
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle: Optional[float] = None
+        self.running = False
+        self.history: Deque[Tuple[float, float]] = deque(maxlen=1024)
+
+    def start(self, duty_cycle: float) -> None:
+        self.running = True
+        self.change_duty_cycle(duty_cycle)
+
+    def change_duty_cycle(self, duty_cycle: float) -> None:
+        self.duty_cycle = float(duty_cycle)
+        self.history.append((self._backend.monotonic(), self.duty_cycle))
+        self._backend._count("pwm_changes")
+
+    def stop(self) -> None:
+        self.running = False
+
+    @property
+    def pulse_width_ms(self) -> Optional[float]:
+        if self.duty_cycle is None:
+            return None
+        return self.duty_cycle / 100.0 * 1000.0 / self.frequency
+
+
+class SimulatedCharLCD:
+    """LCD ký tự mô phỏng qua I2C, API tương thích tập con của ``RPLCD.i2c.CharLCD``."""
+
+    def __init__(self, backend: "SimulatedBackend", address: int, cols: int, rows: int) -> None:
+        self._backend = backend
+        self.address = address
+        self.cols = cols
+        self.rows = rows
+        self._buffer: List[List[str]] = [[" "] * cols for _ in range(rows)]
+        self.cursor_pos = (0, 0)
+
+    @property
+    def lines(self) -> List[str]:
+        return ["".join(row) for row in self._buffer]
+
+    def clear(self) -> None:
+        self._buffer = [[" "] * self.cols for _ in range(self.rows)]
+        self.cursor_pos = (0, 0)
+        self._backend._i2c_lcd_bytes(1, HD44780_CLEAR_EXEC)
+
+    def crlf(self) -> None:
+        row = (self.cursor_pos[0] + 1) % self.rows
+        self.cursor_pos = (row, 0)
+        self._backend._i2c_lcd_bytes(1, HD44780_CMD_EXEC)
+
+    def write_string(self, value: str) -> None:
+        row, col = self.cursor_pos
+        for char in value:
+            if col < self.cols:
+                self._buffer[row][col] = char
+            col += 1
+        self.cursor_pos = (row, min(col, self.cols))
+        self._backend._i2c_lcd_bytes(len(value), HD44780_CMD_EXEC)
+        self._backend._count("lcd_chars", len(value))
+
+
+class SimulatedBackend(HardwareBackend):
+    """Backend mô phỏng độ trễ echo, PWM và chi phí ghi I2C.
+
+    ``virtual_clock=True`` dùng đồng hồ ảo (mỗi lần đọc GPIO tốn ``poll_cost``),
+    cho kết quả xác định cho unit test. Mặc định dùng đồng hồ thật và ngủ thật
+    theo chi phí bus, để đo CPU vòng đọc cảm biến và độ trễ LCD như trên Pi.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        virtual_clock: bool = False,
+        echo_latency: float = HardwareConfig.SIM_ECHO_LATENCY,
+        poll_cost: float = HardwareConfig.SIM_POLL_COST,
+        i2c_frequency: int = HardwareConfig.SIM_I2C_FREQUENCY,
+    ) -> None:
+        self._clock = _VirtualClock() if virtual_clock else None
+        self.echo_latency = echo_latency
+        self.poll_cost = poll_cost
+        self.i2c_frequency = i2c_frequency
+
+        self._lock = threading.Lock()
+        self._modes: Dict[int, str] = {}
+        self._levels: Dict[int, int] = {}
+        self._echo_by_trig: Dict[int, _EchoChannel] = {}
+        self._echo_by_echo: Dict[int, _EchoChannel] = {}
+        self.pwm_channels: Dict[int, SimulatedPWM] = {}
+        self.lcds: List[SimulatedCharLCD] = []
+        self._stats: Dict[str, float] = {
+            "gpio_writes": 0,
+            "gpio_reads": 0,
+            "echo_pulses": 0,
+            "pwm_changes": 0,
+            "i2c_transactions": 0,
+            "i2c_busy_seconds": 0.0,
+            "lcd_chars": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Cấu hình kịch bản mô phỏng
+    # ------------------------------------------------------------------
+    def attach_ultrasonic(
+        self,
+        trig_pin: int,
+        echo_pin: int,
+        distance: Distance = HardwareConfig.SIM_DEFAULT_DISTANCE,
+    ) -> None:
+        """Nối một cảm biến HC-SR04 ảo vào cặp chân TRIG/ECHO."""
+        channel = _EchoChannel(trig_pin=trig_pin, echo_pin=echo_pin, distance=distance)
+        with self._lock:
+            self._echo_by_trig[trig_pin] = channel
+            self._echo_by_echo[echo_pin] = channel
+
+    def set_distance(self, echo_pin: int, distance: Distance) -> None:
+        """Đổi khoảng cách (cm) cảm biến nhìn thấy; ``None`` = không có echo."""
+        with self._lock:
+            self._echo_by_echo[echo_pin].distance = distance
+
+    def level(self, pin: int) -> int:
+        """Mức logic hiện tại của chân output (để kiểm tra buzzer, LED...)."""
+        return self._levels.get(pin, 0)
+
+    # ------------------------------------------------------------------
+    # HardwareBackend
+    # ------------------------------------------------------------------
+    def setup_output(self, pin: int) -> None:
+        self._modes[pin] = "out"
+        self._levels.setdefault(pin, 0)
+
+    def setup_input(self, pin: int) -> None:
+        self._modes[pin] = "in"
+
+    def write(self, pin: int, value: bool) -> None:
+        self._count("gpio_writes")
+        previous = self._levels.get(pin, 0)
+        self._levels[pin] = 1 if value else 0
+        channel = self._echo_by_trig.get(pin)
+        if channel is not None and previous == 1 and not value:
+            self._fire_echo(channel)
+
+    def read(self, pin: int) -> int:
+        self._count("gpio_reads")
+        if self._clock is not None:
+            self._clock.advance(self.poll_cost)
+        channel = self._echo_by_echo.get(pin)
+        if channel is None:
+            return self._levels.get(pin, 0)
+        if channel.rise_at is None or channel.fall_at is None:
+            return 0
+        now = self.monotonic()
+        return 1 if channel.rise_at <= now < channel.fall_at else 0
+
+    def pwm(self, pin: int, frequency: float) -> PWMChannel:
+        channel = SimulatedPWM(self, pin, frequency)
+        self.pwm_channels[pin] = channel
+        return channel
+
+    def char_lcd(self, address: int, cols: int, rows: int) -> SimulatedCharLCD:
+        lcd = SimulatedCharLCD(self, address, cols, rows)
+        self.lcds.append(lcd)
+        return lcd
+
+    def cleanup(self, pin: Optional[int] = None) -> None:
+        if pin is None:
+            self._modes.clear()
+            self._levels.clear()
+        else:
+            self._modes.pop(pin, None)
+            self._levels.pop(pin, None)
+
+    def monotonic(self) -> float:
+        if self._clock is not None:
+            return self._clock.now()
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        if self._clock is not None:
+            self._clock.advance(seconds)
+        else:
+            time.sleep(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._stats)
+        data["backend"] = self.name
+        data["virtual_clock"] = self._clock is not None
+        data["i2c_busy_seconds"] = round(data["i2c_busy_seconds"], 6)
+        return data
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    # ------------------------------------------------------------------
+    def _fire_echo(self, channel: _EchoChannel) -> None:
+        now = self.monotonic()
+        distance = channel.distance(now) if callable(channel.distance) else channel.distance
+        if distance is None or distance <= 0:
+            channel.rise_at = channel.fall_at = None
+            return
+        channel.rise_at = now + self.echo_latency
+        channel.fall_at = channel.rise_at + distance / SPEED_OF_SOUND_HALF
+        self._count("echo_pulses")
+
+    def _i2c_lcd_bytes(self, count: int, exec_time: float) -> None:
+        transactions = count * I2C_TRANSACTIONS_PER_LCD_BYTE
+        busy = transactions * I2C_BITS_PER_TRANSACTION / self.i2c_frequency + count * exec_time
+        with self._lock:
+            self._stats["i2c_transactions"] += transactions
+            self._stats["i2c_busy_seconds"] += busy
+        self.sleep(busy)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
@@ -3,14 +3,10 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 from config import LCDConfig
-
-try:
-    from RPLCD.i2c import CharLCD  # type: ignore
-except ImportError:  # pragma: no cover
-    CharLCD = None
+from hardware.backends import HardwareBackend, get_backend
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +19,14 @@ class LCDDisplay:
         i2c_address: int = LCDConfig.I2C_ADDRESS,
         cols: int = LCDConfig.COLS,
         rows: int = LCDConfig.ROWS,
+        backend: Optional[HardwareBackend] = None,
     ) -> None:
-        self._lcd: Optional[CharLCD] = None
-        if CharLCD is None:
+        self._lcd: Optional[Any] = None
+        backend = backend or get_backend()
+        if backend is None or not backend.supports_lcd:
             logger.warning("Thư viện RPLCD chưa sẵn có, LCD sẽ bị bỏ qua.")
             return
-        self._lcd = CharLCD(
-            i2c_expander="PCF8574",
-            address=i2c_address,
-            cols=cols,
-            rows=rows,
-        )
+        self._lcd = backend.char_lcd(i2c_address, cols, rows)
         logger.info("Khởi tạo LCD ở địa chỉ 0x%X", i2c_address)
 
     def show(self, line1: str, line2: str = "") -> None:
@@ -45,4 +38,3 @@ class LCDDisplay:
         if LCDConfig.ROWS > 1:
             self._lcd.crlf()
             self._lcd.write_string(line2[: LCDConfig.COLS].ljust(LCDConfig.COLS))
-
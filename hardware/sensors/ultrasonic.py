@@ -3,30 +3,31 @@
 from __future__ import annotations
 
 import logging
-import time
 from typing import Optional
 
 from config import SensorThresholds
-
-try:
-    import RPi.GPIO as GPIO  # type: ignore
-except ImportError:  # pragma: no cover - dùng mô phỏng trên PC
-    GPIO = None
+from hardware.backends import HardwareBackend, get_backend
 
 logger = logging.getLogger(__name__)
 
 
 class UltrasonicSensor:
-    def __init__(self, trig_pin: int, echo_pin: int, timeout: float = SensorThresholds.SENSOR_TIMEOUT) -> None:
+    def __init__(
+        self,
+        trig_pin: int,
+        echo_pin: int,
+        timeout: float = SensorThresholds.SENSOR_TIMEOUT,
+        backend: Optional[HardwareBackend] = None,
+    ) -> None:
         self.trig_pin = trig_pin
         self.echo_pin = echo_pin
         self.timeout = timeout
-        self._enabled = GPIO is not None
+        self._backend = backend or get_backend()
+        self._enabled = self._backend is not None and self._backend.supports_gpio
 
         if self._enabled:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(self.trig_pin, GPIO.OUT)
-            GPIO.setup(self.echo_pin, GPIO.IN)
+            self._backend.setup_output(self.trig_pin)
+            self._backend.setup_input(self.echo_pin)
             logger.info("Cảm biến HC-SR04 TRIG=%s ECHO=%s sẵn sàng", trig_pin, echo_pin)
         else:
             logger.warning("RPi.GPIO chưa sẵn sàng, UltrasonicSensor chỉ dùng mô phỏng.")
@@ -35,21 +36,22 @@ class UltrasonicSensor:
         if not self._enabled:
             return None
 
-        GPIO.output(self.trig_pin, True)
-        time.sleep(0.00001)
-        GPIO.output(self.trig_pin, False)
+        gpio = self._backend
+        gpio.write(self.trig_pin, True)
+        gpio.sleep(0.00001)
+        gpio.write(self.trig_pin, False)
 
-        pulse_start = time.time()
+        pulse_start = gpio.monotonic()
         start_time = pulse_start
-        while GPIO.input(self.echo_pin) == 0:
-            pulse_start = time.time()
+        while gpio.read(self.echo_pin) == 0:
+            pulse_start = gpio.monotonic()
             if pulse_start - start_time > self.timeout:
                 logger.warning("Timeout chờ echo HIGH")
                 return None
 
-        pulse_end = time.time()
-        while GPIO.input(self.echo_pin) == 1:
-            pulse_end = time.time()
+        pulse_end = gpio.monotonic()
+        while gpio.read(self.echo_pin) == 1:
+            pulse_end = gpio.monotonic()
             if pulse_end - pulse_start > self.timeout:
                 logger.warning("Timeout chờ echo LOW")
                 return None
@@ -66,4 +68,3 @@ class UltrasonicSensor:
         if distance_cm >= SensorThresholds.SLOT_FREE_MIN:
             return False
         return None
-
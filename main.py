@@ -2,15 +2,21 @@
 
 from __future__ import annotations
 
+import argparse
 import logging
 import os
 import signal
 import sys
-from typing import Optional
+from typing import Callable, Optional
 
-from config import WebConfig
+from config import ServerConfig, WebConfig
 from core.controller import ParkingController
+from core.rollups import rollup_job
+from core.shared_state import SharedStatePublisher, SharedStateSegment
 from core.state_manager import StateManager
+from database.db import db
+from database.event_store import event_store
+from database.storage import storage_maintenance
 from hardware.display.lcd import LCDDisplay
 from utils.logger import configure_logging
 from utils.serial_client import SerialJSONClient
@@ -51,18 +57,98 @@ def bootstrap_controller() -> ParkingController:
     return controller
 
 
-def main() -> int:
+def _start_shared_state(app, controller: ParkingController) -> Optional[SharedStatePublisher]:
+    """Ghi state vào shared memory để worker web (web/wsgi.py) đọc được."""
+    if not _to_bool(os.getenv("SHARED_STATE"), default=True):
+        return None
+    sync = app.extensions["parking_live_sync"]
+
+    def _sync() -> None:
+        with app.app_context():
+            sync()
+
+    try:
+        segment = SharedStateSegment.create(os.getenv("SHARED_STATE_NAME") or ServerConfig.SHARED_STATE_NAME)
+    except OSError as exc:  # pragma: no cover - ví dụ /dev/shm không ghi được
+        logging.warning("Không tạo được shared memory cho state: %s", exc)
+        return None
+    publisher = SharedStatePublisher(controller.state_manager, segment, sync=_sync)
+    publisher.start()
+    return publisher
+
+
+def _serve_production(app, shutdown: Callable[[], None], shared: bool) -> int:
+    """waitress + worker pre-fork; SIGTERM/SIGINT => drain request rồi mới dừng controller."""
+    from web import server as web_server
+
+    if not web_server.available():
+        logging.error("Chế độ production cần waitress: pip install waitress")
+        shutdown()
+        return 1
+
+    workers = int(os.getenv("WEB_WORKERS") or ServerConfig.WORKERS)
+    threads = int(os.getenv("WEB_THREADS") or ServerConfig.THREADS)
+    if workers > 1 and not shared:
+        logging.warning("WEB_WORKERS=%s cần SHARED_STATE, chỉ chạy 1 process web", workers)
+        workers = 1
+
+    sock = web_server.create_listener(WebConfig.HOST, WebConfig.PORT)
+    server = web_server.GracefulServer(app, sock, threads=threads)
+    server.start()
+    children = web_server.spawn_workers(sock, workers - 1)
+    logging.info(
+        "Web production tại %s:%s - %s process x %s thread", WebConfig.HOST, WebConfig.PORT, workers, threads,
+    )
+
+    signum = web_server.wait_for_signal()
+    logging.info("Nhận %s: ngừng nhận kết nối, chờ request đang chạy...", signal.Signals(signum).name)
+    for child in children:
+        child.send_signal(signal.SIGTERM)
+    server.drain()
+    web_server.stop_workers(children)
+    sock.close()
+    shutdown()
+    logging.info("Đã dừng")
+    return 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Smart E-Parking backend")
+    parser.add_argument(
+        "--production", action="store_true",
+        help="Chạy bằng waitress (nhiều thread/process, drain khi SIGTERM) thay cho Flask dev server",
+    )
+    args = parser.parse_args(argv)
+
     if load_dotenv:
         load_dotenv()
     configure_logging(level=os.getenv("LOG_LEVEL"))
     controller = bootstrap_controller()
     controller.start()
+    if _to_bool(os.getenv("SHARED_STATE"), default=True):
+        controller.serve_rpc(os.getenv("CONTROLLER_SOCKET") or ServerConfig.RPC_SOCKET)
 
     app = create_app(controller.state_manager, controller=controller)
+    rollup_job.start(app)
+    with app.app_context():
+        storage_maintenance.start(db.engine)
+    publisher = _start_shared_state(app, controller)
+
+    def _shutdown() -> None:
+        """Dừng job nền, ghi hết hàng đợi sự kiện, nhả cổng serial."""
+        if publisher is not None:
+            publisher.stop()
+        rollup_job.stop()
+        storage_maintenance.stop()
+        event_store.close()
+        controller.stop()
+
+    if args.production or os.getenv("WEB_SERVER", "").lower() == "production":
+        return _serve_production(app, _shutdown, shared=publisher is not None)
 
     # Cho phép Ctrl+C dừng cả Flask + controller
     def _handle_sigint(*_: object) -> None:
-        controller.stop()
+        _shutdown()
         sys.exit(0)
 
     signal.signal(signal.SIGINT, _handle_sigint)
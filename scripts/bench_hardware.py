@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Benchmark driver phần cứng trên backend mô phỏng (chạy được trên PC/CI).
+
+Đo:
+- CPU và thời gian thực của vòng đọc cảm biến HC-SR04
+- Độ trễ mở/đóng barrier (servo)
+- Thời gian bus I2C cho mỗi lần cập nhật LCD
+
+Ví dụ:
+    python scripts/bench_hardware.py --reads 200 --distance 35
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import GPIOPins  # noqa: E402
+from hardware.actuators.servo import ServoBarrier  # noqa: E402
+from hardware.backends import SimulatedBackend  # noqa: E402
+from hardware.display.lcd import LCDDisplay  # noqa: E402
+from hardware.sensors.ultrasonic import UltrasonicSensor  # noqa: E402
+
+
+def bench_sensor(backend: SimulatedBackend, reads: int, distance: float) -> None:
+    backend.attach_ultrasonic(GPIOPins.SLOT1_TRIG, GPIOPins.SLOT1_ECHO, distance)
+    sensor = UltrasonicSensor(GPIOPins.SLOT1_TRIG, GPIOPins.SLOT1_ECHO, backend=backend)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    results = [sensor.measure_distance() for _ in range(reads)]
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    valid = [r for r in results if r is not None]
+    mean = sum(valid) / len(valid) if valid else float("nan")
+    print(f"Sensor: {reads} lần đọc, trung bình {mean:.2f} cm (thực tế {distance} cm)")
+    print(f"  wall {wall / reads * 1000:.3f} ms/lần, CPU {cpu / reads * 1000:.3f} ms/lần "
+          f"({cpu / wall * 100 if wall else 0:.0f}% một core)")
+
+
+def bench_servo(backend: SimulatedBackend, cycles: int) -> None:
+    servo = ServoBarrier(backend=backend)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        servo.open()
+        servo.close()
+    elapsed = time.perf_counter() - start
+    print(f"Servo: {cycles} chu kỳ mở/đóng, {elapsed / cycles * 1000:.1f} ms/chu kỳ")
+
+
+def bench_lcd(backend: SimulatedBackend, updates: int) -> None:
+    lcd = LCDDisplay(backend=backend)
+    before = backend.stats()["i2c_busy_seconds"]
+    start = time.perf_counter()
+    for i in range(updates):
+        lcd.show("Tong slot: 3", f"Con trong: {i % 4}")
+    elapsed = time.perf_counter() - start
+    bus = backend.stats()["i2c_busy_seconds"] - before
+    print(f"LCD: {updates} lần cập nhật, bus I2C {bus / updates * 1000:.2f} ms/lần, "
+          f"wall {elapsed / updates * 1000:.2f} ms/lần")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=100, help="Số lần đọc cảm biến")
+    parser.add_argument("--distance", type=float, default=35.0, help="Khoảng cách mô phỏng (cm)")
+    parser.add_argument("--servo-cycles", type=int, default=3, help="Số chu kỳ mở/đóng barrier")
+    parser.add_argument("--lcd-updates", type=int, default=20, help="Số lần cập nhật LCD")
+    args = parser.parse_args()
+
+    backend = SimulatedBackend()
+    bench_sensor(backend, args.reads, args.distance)
+    bench_servo(backend, args.servo_cycles)
+    bench_lcd(backend, args.lcd_updates)
+    print(f"Thống kê backend: {backend.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
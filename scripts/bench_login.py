@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark đăng nhập đồng thời và ảnh hưởng tới ``/api/status``.
+
+Tạo app trên database tạm, ``--users`` tài khoản, rồi cho ``--concurrency``
+thread đăng nhập liên tục trong khi một thread khác poll ``/api/status``
+(như dashboard). In ra số lượt đăng nhập/giây, số lượt bị từ chối (503) và
+độ trễ p50/p95/max của ``/api/status`` khi có và không có tải đăng nhập.
+
+Ví dụ:
+    python scripts/bench_login.py --logins 40 --concurrency 8
+    PASSWORD_HASH_METHOD=pbkdf2:sha256:200000 python scripts/bench_login.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _poll_status(client, stop: threading.Event, latencies: List[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get("/api/status")
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+
+
+def _report(label: str, latencies: List[float]) -> None:
+    print(f"  /api/status {label}: n={len(latencies)} p50 {_percentile(latencies, 0.5):.1f} ms, "
+          f"p95 {_percentile(latencies, 0.95):.1f} ms, max {max(latencies, default=float('nan')):.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="Số tài khoản thử")
+    parser.add_argument("--logins", type=int, default=32, help="Tổng số lượt đăng nhập")
+    parser.add_argument("--concurrency", type=int, default=8, help="Số thread đăng nhập cùng lúc")
+    parser.add_argument("--baseline", type=float, default=2.0, help="Số giây đo /api/status khi không tải")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from auth.hashing import hash_method, password_hasher
+    from core.state_manager import StateManager
+    from database.db import db
+    from database.models import User
+    from web.app import create_app
+
+    app = create_app(StateManager())
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        for index in range(args.users):
+            user = User(username=f"bench{index}", email=f"bench{index}@example.com", role="client")
+            user.set_password("bench-password")
+            db.session.add(user)
+        db.session.commit()
+
+    poller = app.test_client()
+    poller.post("/auth/login", data={"username": "bench0", "password": "bench-password"})
+
+    print(f"Phương thức băm: {hash_method()}, {password_hasher.workers} worker, "
+          f"tối đa {password_hasher.max_pending} yêu cầu chờ")
+
+    stop = threading.Event()
+    baseline: List[float] = []
+    thread = threading.Thread(target=_poll_status, args=(poller, stop, baseline))
+    thread.start()
+    time.sleep(args.baseline)
+    stop.set()
+    thread.join()
+
+    remaining = iter(range(args.logins))
+    counter_lock = threading.Lock()
+    results = {"ok": 0, "busy": 0, "failed": 0}
+    login_times: List[float] = []
+
+    def worker() -> None:
+        client = app.test_client()
+        while True:
+            with counter_lock:
+                index = next(remaining, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            response = client.post("/auth/login", data={
+                "username": f"bench{index % args.users}", "password": "bench-password",
+            })
+            elapsed = (time.perf_counter() - start) * 1000
+            key = "ok" if response.status_code == 302 else "busy" if response.status_code == 503 else "failed"
+            with counter_lock:
+                results[key] += 1
+                login_times.append(elapsed)
+            client.get("/auth/logout")
+
+    stop.clear()
+    loaded: List[float] = []
+    thread = threading.Thread(target=_poll_status, args=(poller, stop, loaded))
+    thread.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    thread.join()
+
+    print(f"Đăng nhập: {results['ok']} thành công, {results['busy']} bị từ chối (503), "
+          f"{results['failed']} lỗi trong {elapsed:.2f}s => {results['ok'] / elapsed:.1f} lượt/giây")
+    if login_times:
+        print(f"  thời gian một lượt: trung vị {statistics.median(login_times):.0f} ms, "
+              f"p95 {_percentile(login_times, 0.95):.0f} ms")
+    _report("không tải", baseline)
+    _report("khi đăng nhập", loaded)
+    print(f"Thống kê hasher: {password_hasher.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""So sánh Flask dev server (Werkzeug) với server production (waitress).
+
+Tạo app trên database tạm, chạy lần lượt từng server trên một cổng ngẫu
+nhiên, rồi cho ``--clients`` thread gửi request keep-alive tới ``/status`` và
+``/api/health`` trong ``--duration`` giây. In ra số request/giây và độ trễ
+p50/p95/max cho mỗi server.
+
+Ví dụ:
+    python scripts/bench_server.py --clients 16 --duration 5
+    WEB_THREADS=8 python scripts/bench_server.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+PATHS = ("/status", "/api/health")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _load(port: int, clients: int, duration: float) -> tuple:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local: List[float] = []
+        index = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", PATHS[index % len(PATHS)])
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+            index += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def _report(label: str, latencies: List[float], errors: int, elapsed: float) -> None:
+    print(f"{label:<10} {len(latencies) / elapsed:8.0f} req/s  p50 {_percentile(latencies, 0.5):6.1f} ms  "
+          f"p95 {_percentile(latencies, 0.95):6.1f} ms  max {max(latencies, default=float('nan')):7.1f} ms  "
+          f"lỗi {errors}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="Số client keep-alive đồng thời")
+    parser.add_argument("--duration", type=float, default=5.0, help="Số giây đo mỗi server")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from werkzeug.serving import make_server
+
+    from config import ServerConfig
+    from core.state_manager import StateManager
+    from web import server as web_server
+    from web.app import create_app
+
+    app = create_app(StateManager())
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # bỏ access log mỗi request
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)  # client > thread là chủ ý
+    threads = int(os.getenv("WEB_THREADS") or ServerConfig.THREADS)
+    print(f"{args.clients} client, {args.duration:.0f}s mỗi server, endpoint {', '.join(PATHS)}")
+
+    dev = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=dev.serve_forever, daemon=True)
+    thread.start()
+    _report("werkzeug", *_load(dev.server_port, args.clients, args.duration))
+    dev.shutdown()
+
+    if not web_server.available():
+        print("waitress chưa được cài: pip install waitress")
+        return 1
+    sock = web_server.create_listener("127.0.0.1", 0)
+    server = web_server.GracefulServer(app, sock, threads=threads)
+    server.start()
+    _report(f"waitress/{threads}", *_load(sock.getsockname()[1], args.clients, args.duration))
+    server.drain()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Tính lại phí cho mọi session chưa thanh toán theo pricing rules hiện hành.
+
+Ví dụ:
+    python scripts/reprice_sessions.py --chunk-size 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.repricing import DEFAULT_CHUNK_SIZE, RepricingReport, reprice_pending_sessions  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from web.app import create_app  # noqa: E402
+
+
+def _print_progress(report: RepricingReport) -> None:
+    print(
+        f"\r  {report.scanned:,} dòng, {report.updated:,} thay đổi, "
+        f"{report.rows_per_second:,.0f} dòng/s",
+        end="",
+        flush=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Số dòng mỗi khối")
+    args = parser.parse_args()
+
+    app = create_app(StateManager())
+    with app.app_context():
+        report = reprice_pending_sessions(chunk_size=args.chunk_size, progress=_print_progress)
+    print()
+    print(
+        f"✅ Đã quét {report.scanned:,} session, cập nhật {report.updated:,} "
+        f"trong {report.elapsed:.2f}s ({report.rows_per_second:,.0f} dòng/s, "
+        f"{'NumPy' if report.vectorized else 'Python'})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
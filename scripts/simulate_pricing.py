@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""So sánh các bộ pricing rules trên session lịch sử (không đổi phí thật).
+
+Mỗi file JSON là một candidate ``{"name": ..., "rules": [...]}`` hoặc danh sách
+candidate; rule cùng format với ``/api/pricing-rules``.
+
+Ví dụ:
+    python scripts/simulate_pricing.py night_discount.json weekend_flat.json --days 365
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.pricing_simulator import DEFAULT_HISTOGRAM_BINS, run_simulation  # noqa: E402
+from core.state_manager import StateManager  # noqa: E402
+from utils.timestamps import parse_timestamp  # noqa: E402
+from web.app import create_app  # noqa: E402
+
+
+def _load_candidates(paths) -> list:
+    candidates = []
+    for path in paths:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if isinstance(data, list):
+            candidates.extend(data)
+        else:
+            data.setdefault("name", Path(path).stem)
+            candidates.append(data)
+    return candidates
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="File JSON chứa candidate")
+    parser.add_argument("--start", help="Từ thời điểm (ISO 8601)")
+    parser.add_argument("--end", help="Đến thời điểm (ISO 8601, mặc định: bây giờ)")
+    parser.add_argument("--days", type=int, help="Số ngày tính ngược từ --end (mặc định 365)")
+    parser.add_argument("--workers", type=int, help="Số process (mặc định: số core)")
+    parser.add_argument("--bins", type=int, default=DEFAULT_HISTOGRAM_BINS, help="Số cột histogram")
+    parser.add_argument("--no-current", action="store_true", help="Không so với bảng giá hiện hành")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    end = parse_timestamp(args.end)
+    start = parse_timestamp(args.start)
+    if start is None and args.days:
+        end = end or datetime.now(UTC).replace(tzinfo=None)
+        start = end - timedelta(days=args.days)
+
+    app = create_app(StateManager())
+    with app.app_context():
+        report = run_simulation(
+            _load_candidates(args.files),
+            start=start,
+            end=end,
+            include_current=not args.no_current,
+            workers=args.workers,
+            bins=args.bins,
+        )
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(
+        f"{report['sessions']:,} session ({report['window']['start']} → {report['window']['end']}), "
+        f"nạp {report['load_seconds']}s, tính {report['simulate_seconds']}s"
+    )
+    print(f"Doanh thu đã ghi nhận: {report['recorded_revenue']:,} VNĐ")
+    print(f"{'Candidate':<24}{'Doanh thu':>16}{'Chênh lệch':>16}{'TB/lượt':>12}{'p50':>10}{'p90':>10}")
+    for result in report["results"]:
+        print(
+            f"{result['name'][:23]:<24}{result['revenue']:>16,}{result['revenue_delta']:>+16,}"
+            f"{result['average_fee']:>12,.0f}{result['percentiles'].get('p50', 0):>10,}"
+            f"{result['percentiles'].get('p90', 0):>10,}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,3 +5,80 @@ ROOT = pathlib.Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+
+import pytest
+
+
+@pytest.fixture
+def db_app():
+    """Flask app tối giản với SQLite in-memory (không đăng ký route)."""
+    from flask import Flask
+
+    from core.statistics import statistics
+    from database.db import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        statistics.invalidate()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+class FakeSerial:
+    """Serial client giả cho route: chỉ các hàm web đọc."""
+
+    def __init__(self):
+        self.connected = True
+        self.last_received = None
+
+    def is_connected(self):
+        return self.connected
+
+    def get_last_received_time(self):
+        return self.last_received
+
+
+@pytest.fixture(scope="session")
+def web_app():
+    """App đầy đủ (create_app) trên SQLite in-memory, controller giả.
+
+    Blueprint chính chỉ đăng ký được một lần mỗi process nên app dùng chung
+    cho cả phiên test; test tự đặt lại state nó thay đổi.
+    """
+    import os
+    from types import SimpleNamespace
+
+    from core.state_manager import StateManager
+    from web.app import create_app
+
+    previous = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = "sqlite://"
+    try:
+        state_manager = StateManager()
+        controller = SimpleNamespace(serial_client=FakeSerial())
+        app = create_app(state_manager, controller=controller)
+    finally:
+        if previous is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = previous
+    app.config["TESTING"] = True
+    return SimpleNamespace(app=app, state_manager=state_manager, controller=controller)
+
+
+@pytest.fixture
+def admin_client(web_app):
+    """Test client đã đăng nhập bằng admin mặc định."""
+    from database.models import User
+
+    with web_app.app.app_context():
+        admin = User.query.filter_by(role="admin").first()
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(admin.id)
+        session["_fresh"] = True
+    return client
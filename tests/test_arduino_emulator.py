@@ -0,0 +1,63 @@
+import json
+import time
+
+import pytest
+
+from utils.arduino_emulator import ArduinoEmulator, VirtualArduino
+from utils.serial_client import SerialJSONClient, serial
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_virtual_arduino_command_protocol():
+    arduino = VirtualArduino()
+    assert arduino.feed(b"mode:manual\n", now=0.0) == ["OK:MODE=MANUAL"]
+    assert arduino.feed(b"SLOT:2:1\nSLOT:9:1\n", now=0.0) == ["OK:SLOT2=1"]
+    assert arduino.feed(b"BARRIER:OPEN\r\n", now=1.0) == ["INFO:Barrier opened", "OK:BARRIER=OPEN"]
+    assert arduino.feed(b"LCD:UPDATE:Tong slot: 3|Con trong: 2\n", now=1.0) == ["OK:LCD=UPDATED"]
+    assert arduino.lcd_lines == ["TONG SLOT: 3", "CON TRONG: 2"]
+    assert arduino.feed(b"PING\n", now=1.0) == ["OK:PONG"]
+    assert arduino.tick(now=8.5) == ["INFO:Barrier closed", "INFO:Barrier auto-closed after delay"]
+
+    frame = json.loads(arduino.frame())
+    assert frame == {
+        "slots": [0, 1, 0],
+        "free_slots": 2,
+        "total_slots": 3,
+        "barrier": "closed",
+        "button_pressed": False,
+        "led_status": "green",
+        "mode": "manual",
+    }
+
+
+@pytest.mark.skipif(serial is None, reason="pyserial chưa được cài đặt")
+def test_serial_client_reads_emulated_device(tmp_path):
+    emulator = ArduinoEmulator()
+    device = emulator.add_device(frame_interval=0.05, link=str(tmp_path / "ttyV0"))
+    emulator.start()
+    client = SerialJSONClient(port=device.link, simulate=False, timeout=0.1, reconnect_interval=0.1)
+    frames = []
+    client.add_listener(frames.append)
+    client.start()
+    try:
+        assert _wait_for(lambda: len(frames) >= 2)
+        assert client.send_command("SLOT:3:1")
+        assert _wait_for(lambda: frames[-1]["slots"] == [0, 0, 1])
+
+        emulator.unplug(device)
+        assert _wait_for(lambda: not client.is_connected())
+        emulator.replug(device)
+        count = len(frames)
+        assert _wait_for(lambda: len(frames) > count + 1)
+        assert device.stats.replies_sent >= 1
+    finally:
+        client.stop()
+        emulator.stop()
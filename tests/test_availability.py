@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from flask import Flask
+
+from core.state_manager import StateManager
+from web.availability import AvailabilityFeed
+
+
+def _app():
+    state = StateManager()
+    feed = AvailabilityFeed(state, lot_name="Bãi thử", zones={"A": [0, 1], "B": [2]})
+    app = Flask(__name__)
+    app.add_url_rule("/availability", view_func=feed.response)
+    return app.test_client(), state, feed
+
+
+def test_full_and_compact_bodies():
+    client, state, _ = _app()
+    state.update({"slots": [1, 0, 0], "free_slots": 2})
+
+    full = client.get("/availability")
+    assert full.status_code == 200
+    assert full.headers["Access-Control-Allow-Origin"] == "*"
+    data = full.json
+    assert (data["lot"], data["free"], data["total"]) == ("Bãi thử", 2, 3)
+    assert data["zones"] == [{"id": "A", "free": 1, "total": 2}, {"id": "B", "free": 1, "total": 1}]
+
+    compact = client.get("/availability?compact=1")
+    assert json.loads(compact.data) == {"f": 2, "t": 3, "z": {"A": [1, 2], "B": [1, 1]}}
+    assert compact.headers["ETag"] != full.headers["ETag"]
+
+
+def test_gzip_variant_is_precompressed():
+    client, state, feed = _app()
+    plain = client.get("/availability")
+    zipped = client.get("/availability", headers={"Accept-Encoding": "gzip, deflate"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+    assert feed.regenerations == 1
+
+
+def test_regenerates_only_when_availability_changes():
+    client, state, feed = _app()
+    first = client.get("/availability")
+    etag = first.headers["ETag"]
+
+    # Gate/LED đổi => version đổi nhưng số chỗ trống giữ nguyên
+    state.update({"gate": "open", "led_status": "yellow"})
+    again = client.get("/availability", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert feed.regenerations == 1
+
+    state.update({"slots": [1, 1, 0], "free_slots": 1})
+    changed = client.get("/availability", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json["free"] == 1
+    assert feed.regenerations == 2
@@ -0,0 +1,71 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import dwell_sketches, rollups
+from core.parking_service import ParkingService
+from database.db import db
+from database.models import DwellSketch, ParkingSession
+from utils.quantile_sketch import QuantileSketch
+
+MONDAY = datetime(2026, 10, 12)
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_sketch_quantiles_within_relative_accuracy_and_mergeable():
+    rng = random.Random(3)
+    values = [rng.lognormvariate(4, 1.2) for _ in range(20000)] + [0] * 500
+    whole = QuantileSketch()
+    whole.extend(values)
+    parts = [QuantileSketch() for _ in range(4)]
+    for index, value in enumerate(values):
+        parts[index % 4].add(value)
+    merged = QuantileSketch.from_bytes(parts[0].to_bytes())
+    for part in parts[1:]:
+        merged.merge(QuantileSketch.from_bytes(part.to_bytes()))
+
+    for q in (0.01, 0.5, 0.9, 0.99):
+        exact = _exact(values, q)
+        assert merged.quantile(q) == whole.quantile(q)
+        assert merged.quantile(q) == pytest.approx(exact, rel=0.011, abs=1e-9)
+    assert merged.count == len(values) and len(merged.to_bytes()) < 8192
+
+
+def _completed(slot_id, entry, minutes):
+    db.session.add(ParkingSession(slot_id=slot_id, entry_time=entry, exit_time=entry + timedelta(minutes=minutes),
+                                  duration_minutes=minutes, status="completed"))
+
+
+def test_end_session_updates_sketches_and_backfill_matches(db_app):
+    ParkingService.start_session(slot_id=1)
+    ended = ParkingService.end_session(slot_id=1)
+    rows = {row.scope: row.count for row in DwellSketch.query.filter_by(slot_id=1)}
+    assert rows == {"hour": 1, "how": 1}
+    db.session.delete(ended)
+    db.session.commit()
+
+    durations = [15, 45, 60, 90, 120, 240, 600, 30]
+    for day in range(4):
+        for index, minutes in enumerate(durations):
+            _completed(index % 2, MONDAY + timedelta(days=day, hours=8 + index), minutes)
+    db.session.commit()
+    rollups.request_backfill()
+    rollups.run_once(now=MONDAY + timedelta(days=5))
+
+    window = dwell_sketches.window_sketch(MONDAY, MONDAY + timedelta(days=5))
+    assert window.count == 32
+    assert window.quantile(0.5) == pytest.approx(_exact(durations * 4, 0.5), rel=0.011)
+    assert DwellSketch.query.filter_by(scope="day").count() == 9  # lượt cuối ra sang ngày thứ 5
+
+    # Cửa sổ lẻ giờ: ghép ngày trọn + giờ lẻ hai đầu
+    partial = dwell_sketches.window_sketch(MONDAY + timedelta(hours=12), MONDAY + timedelta(days=1, hours=12))
+    assert partial.count == 8
+    assert dwell_sketches.window_sketch(MONDAY, MONDAY + timedelta(days=5), slot_id=0).count == 16
+
+    weekly = dwell_sketches.hour_of_week_summaries()
+    assert weekly[8]["count"] == 1 and weekly[8]["p50"] == pytest.approx(15, rel=0.011)
@@ -0,0 +1,87 @@
+import gzip
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from config import EventLogConfig
+from core.parking_service import ParkingService
+from database.db import db
+from database.event_store import EventStore, event_store
+from database.models import SystemLog
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(batch_size=50, flush_interval=0.05)
+    store.open(str(tmp_path / "events.db"))
+    yield store
+    store.close()
+
+
+def test_batched_append_and_cursor_pages(store):
+    for index in range(250):
+        store.append("slot_change" if index % 2 else "gate_open", f"event {index}", meta={"index": index})
+    assert store.flush()
+    assert store.stats["written"] == 250
+    assert store.stats["batches"] < 250
+
+    seen, before = [], None
+    while True:
+        page, before = store.query(before=before, limit=100)
+        seen.extend(event.meta_data["index"] for event in page)
+        if before is None:
+            break
+    assert seen == list(range(249, -1, -1))
+
+    gates, _ = store.query(limit=10, event_type="gate_open")
+    assert {event.event_type for event in gates} == {"gate_open"}
+    assert store.event_types() == ["gate_open", "slot_change"]
+
+
+def test_retention_archives_old_events_to_gzip_segments(store):
+    now = datetime(2026, 6, 1, tzinfo=UTC)
+    old = now - timedelta(days=EventLogConfig.RETENTION_DAYS + 3)
+    for index in range(5):
+        store.append("gate_open", f"old {index}", created_at=old + timedelta(hours=index * 12))
+    store.append("gate_open", "recent", created_at=now - timedelta(days=1))
+    store.flush()
+
+    assert store.enforce_retention(now=now) == 5
+    remaining, _ = store.query()
+    assert [event.message for event in remaining] == ["recent"]
+
+    archived = []
+    for name in store.archives():
+        with gzip.open(f"{store.archive_dir}/{name}", "rt", encoding="utf-8") as fh:
+            archived.extend(json.loads(line)["message"] for line in fh)
+    assert len(store.archives()) == 3
+    assert sorted(archived) == [f"old {index}" for index in range(5)]
+
+    # Segment quá hạn lưu trữ bị xóa
+    store.enforce_retention(now=now + timedelta(days=EventLogConfig.ARCHIVE_RETENTION_DAYS + 10))
+    assert store.archives() == []
+
+
+def test_services_log_outside_session_transaction(db_app, tmp_path):
+    db.session.add(SystemLog(event_type="gate_open", message="legacy",
+                             created_at=datetime(2026, 1, 1)))
+    db.session.commit()
+
+    event_store.open(str(tmp_path / "events.db"))
+    try:
+        assert event_store.import_legacy_logs() == 1
+        assert SystemLog.query.count() == 0
+
+        session = ParkingService.start_session(slot_id=1, user_id=3)
+        ParkingService.end_session(slot_id=1)
+        ParkingService.mark_paid(session.id)
+        event_store.flush()
+
+        events, _ = event_store.query()
+        assert [event.event_type for event in events[:3]] == ["payment_completed", "session_end", "session_start"]
+        assert events[-1].message == "legacy"
+        assert events[2].user_id == 3 and events[2].meta_data["slot_id"] == 1
+        assert SystemLog.query.count() == 0
+    finally:
+        event_store.close()
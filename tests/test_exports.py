@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from core import exports
+from database.db import db
+from database.event_store import EventStore
+from database.models import ParkingSession, User
+
+
+def _seed(count):
+    user = User(username="an", email="an@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    start = datetime(2026, 2, 1)
+    db.session.execute(ParkingSession.__table__.insert(), [
+        {
+            "slot_id": index % 3, "user_id": user.id if index % 2 else None,
+            "entry_time": start + timedelta(minutes=index), "status": "completed",
+            "duration_minutes": 30, "fee_amount": 5000, "payment_status": "paid",
+        }
+        for index in range(count)
+    ])
+    db.session.commit()
+
+
+def test_session_csv_streams_in_chunks(db_app, monkeypatch):
+    monkeypatch.setattr(exports, "FLUSH_BYTES", 4096)
+    _seed(2500)
+    records = exports.session_records(db.engine, slot_id=1, chunk_rows=100)
+    chunks = list(exports.encode("csv", exports.SESSION_COLUMNS, records))
+    assert len(chunks) > 1  # không dồn cả file vào một khối
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == 833
+    assert {row["slot_id"] for row in rows} == {"1"}
+    assert rows[0]["username"] == "an" and rows[1]["username"] == ""
+    assert [int(row["id"]) for row in rows] == sorted(int(row["id"]) for row in rows)
+
+
+def test_gzip_ndjson_round_trip(db_app, tmp_path):
+    store = EventStore()
+    store.open(str(tmp_path / "events.db"), start_thread=False)
+    try:
+        for index in range(30):
+            store.append("gate_open" if index % 3 else "mode_change", f"e{index}", meta={"i": index})
+        store.flush()
+        data = b"".join(exports.encode(
+            "ndjson", exports.LOG_COLUMNS,
+            exports.log_records(store, event_type="mode_change", chunk_rows=4),
+            compress=True,
+        ))
+    finally:
+        store.close()
+
+    lines = gzip.decompress(data).decode("utf-8").splitlines()
+    events = [json.loads(line) for line in lines]
+    assert [event["meta_data"]["i"] for event in events] == list(range(0, 30, 3))
+    assert events[0]["event_type"] == "mode_change"
@@ -0,0 +1,57 @@
+from config import LCDConfig, ServoConfig
+from hardware.actuators.buzzer import Buzzer
+from hardware.actuators.servo import ServoBarrier
+from hardware.backends import SimulatedBackend
+from hardware.display.lcd import LCDDisplay
+from hardware.sensors.ultrasonic import UltrasonicSensor
+
+
+def test_ultrasonic_measures_simulated_distance():
+    backend = SimulatedBackend(virtual_clock=True)
+    backend.attach_ultrasonic(8, 7, distance=35.0)
+    sensor = UltrasonicSensor(8, 7, backend=backend)
+
+    distance = sensor.measure_distance()
+    assert abs(distance - 35.0) < 0.5
+    assert sensor.is_occupied(distance) is True
+
+    backend.set_distance(7, 150.0)
+    assert sensor.is_occupied(sensor.measure_distance()) is False
+
+    backend.set_distance(7, None)
+    assert sensor.measure_distance() is None
+    assert backend.stats()["echo_pulses"] == 2
+
+
+def test_servo_records_duty_cycle_and_latency():
+    backend = SimulatedBackend(virtual_clock=True)
+    servo = ServoBarrier(pin=18, backend=backend)
+    start = backend.monotonic()
+    servo.open()
+    servo.close()
+
+    pwm = backend.pwm_channels[18]
+    duties = [duty for _, duty in pwm.history]
+    assert duties == [2.5, 7.5, 2.5]
+    elapsed = backend.monotonic() - start
+    assert abs(elapsed - (ServoConfig.OPEN_DELAY + ServoConfig.CLOSE_DELAY)) < 1e-9
+
+
+def test_lcd_accounts_i2c_bus_time():
+    backend = SimulatedBackend(virtual_clock=True)
+    lcd = LCDDisplay(backend=backend)
+    lcd.show("Tong slot: 3", "Con trong: 2")
+
+    sim = backend.lcds[0]
+    assert sim.lines == ["Tong slot: 3".ljust(LCDConfig.COLS), "Con trong: 2".ljust(LCDConfig.COLS)]
+    stats = backend.stats()
+    assert stats["lcd_chars"] == 2 * LCDConfig.COLS
+    assert stats["i2c_busy_seconds"] > 0.03  # ~34 byte x 1.2ms ở 100kHz
+
+
+def test_buzzer_drives_output_pin():
+    backend = SimulatedBackend(virtual_clock=True)
+    buzzer = Buzzer(pin=23, backend=backend)
+    buzzer.beep(0.2)
+    assert backend.level(23) == 0
+    assert backend.stats()["gpio_writes"] == 2
@@ -0,0 +1,50 @@
+from flask import Flask
+
+from web import http_cache
+
+
+def _app():
+    app = Flask(__name__)
+    calls = []
+    version = {"value": 1}
+
+    @app.get("/thing")
+    def thing():
+        def build():
+            calls.append(version["value"])
+            return {"version": version["value"]}
+
+        return http_cache.conditional_json("thing", (version["value"],), build, "public, max-age=1")
+
+    http_cache.clear()
+    return app, calls, version
+
+
+def test_if_none_match_returns_304_without_building():
+    app, calls, version = _app()
+    client = app.test_client()
+
+    first = client.get("/thing")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.json == {"version": 1}
+    assert first.headers["Cache-Control"] == "public, max-age=1"
+
+    again = client.get("/thing", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == etag
+    # Proxy nén có thể gửi lại dạng weak
+    assert client.get("/thing", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert calls == [1]
+
+    version["value"] = 2
+    changed = client.get("/thing", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json == {"version": 2}
+    assert changed.headers["ETag"] != etag
+
+
+def test_same_etag_reuses_serialized_body():
+    app, calls, _ = _app()
+    client = app.test_client()
+    bodies = {client.get("/thing").data for _ in range(3)}
+    assert len(bodies) == 1
+    assert calls == [1]
@@ -0,0 +1,51 @@
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from config import WebConfig
+
+
+def _first_snapshot(client):
+    response = client.get("/api/stream", buffered=False)
+    try:
+        for chunk in response.response:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if text.startswith("id:"):
+                event, data = text.split("\n")[1:3]
+                assert event == "event: snapshot"
+                return json.loads(data[len("data: "):])
+    finally:
+        response.close()
+
+
+def test_stream_carries_arduino_receive_time(web_app, admin_client):
+    serial = web_app.controller.serial_client
+    serial.last_received = time.time() - 30
+
+    data = _first_snapshot(admin_client)
+
+    assert data["arduino_connected"] is True
+    # Trình duyệt tự tính tuổi từ hai mốc này (Arduino im lặng => không có delta)
+    received = datetime.fromisoformat(data["arduino_last_update"]).timestamp()
+    assert received == pytest.approx(serial.last_received)
+    assert data["server_time"] - received == pytest.approx(30, abs=2)
+
+
+def test_arduino_receive_time_is_republished_sparingly(web_app):
+    serial = web_app.controller.serial_client
+    sync = web_app.app.extensions["parking_live_sync"]
+    state_manager = web_app.state_manager
+    serial.last_received = time.time()
+    with web_app.app.app_context():
+        sync()
+        version = state_manager.version
+        serial.last_received += 0.5  # Arduino gửi gói tiếp theo
+        sync()
+        assert state_manager.version == version
+        serial.last_received += WebConfig.STREAM_TOUCH_INTERVAL
+        sync()
+    assert state_manager.version == version + 1
+    _, data = state_manager.live_snapshot()
+    assert datetime.fromisoformat(data["arduino_last_update"]).timestamp() == pytest.approx(serial.last_received)
@@ -0,0 +1,151 @@
+from config import OperationMode
+from core.controller import ParkingController
+from core.state_manager import StateManager
+from utils.serial_client import SerialJSONClient
+
+
+class RecordingSerial:
+    def __init__(self):
+        self.writes = []
+
+    def add_listener(self, callback):
+        pass
+
+    def send_command(self, command):
+        return self.send_commands([command])
+
+    def send_commands(self, commands):
+        self.writes.append(list(commands))
+        return True
+
+
+def _controller(mode=OperationMode.MANUAL):
+    serial = RecordingSerial()
+    state = StateManager()
+    controller = ParkingController(serial, state)
+    controller.change_mode(mode, user_id=1, username="admin")
+    serial.writes.clear()
+    return controller, state, serial
+
+
+def test_batch_is_one_state_update_and_one_serial_write():
+    controller, state, serial = _controller()
+    version = state.version
+
+    outcome = controller.manual_apply_batch([(1, True), (2, True)], gate="open")
+
+    assert outcome["ok"] is True
+    assert [item["ok"] for item in outcome["results"]] == [True, True, True]
+    assert state.version == version + 1
+    snapshot = state.snapshot()
+    assert (snapshot["slots"], snapshot["free"], snapshot["gate"]) == ([0, 1, 1], 1, "open")
+    assert serial.writes == [["SLOT:2:1", "SLOT:3:1", "BARRIER:OPEN"]]
+
+
+def test_invalid_items_do_not_block_valid_ones():
+    controller, state, serial = _controller()
+
+    outcome = controller.manual_apply_batch([(-1, True), (2, True), (7, True)], gate="sideways")
+
+    assert outcome["ok"] is False
+    assert [item["ok"] for item in outcome["results"]] == [False, True, False, False]
+    assert state.snapshot()["slots"] == [0, 0, 1]
+    assert serial.writes == [["SLOT:3:1"]]
+
+
+def test_slot_one_updates_state_without_serial_command():
+    controller, state, serial = _controller()
+
+    outcome = controller.manual_apply_batch([(0, True), (1, True)])
+
+    assert outcome["ok"] is True
+    assert state.snapshot()["slots"] == [1, 1, 0]
+    # Như manual_set_slot: Slot 1 từ sensor, không gửi SLOT:1
+    assert serial.writes == [["SLOT:2:1"]]
+
+    assert controller.manual_apply_batch([(0, False)])["ok"] is True
+    assert state.snapshot()["slots"] == [0, 1, 0]
+    assert serial.writes == [["SLOT:2:1"]]
+
+
+def test_auto_mode_rejects_everything():
+    controller, state, serial = _controller(OperationMode.AUTO)
+    version = state.version
+
+    outcome = controller.manual_apply_batch([(1, True)], gate="open")
+
+    assert outcome["ok"] is False
+    assert all(not item["ok"] for item in outcome["results"])
+    assert state.version == version and serial.writes == []
+
+
+def test_send_commands_writes_once():
+    class Port:
+        is_open = True
+
+        def __init__(self):
+            self.chunks, self.flushes = [], 0
+
+        def write(self, data):
+            self.chunks.append(data)
+
+        def flush(self):
+            self.flushes += 1
+
+    client = SerialJSONClient(port="/dev/null", simulate=False)
+    client._serial = Port()
+    assert client.send_commands(["SLOT:2:1", "BARRIER:OPEN"])
+    assert client._serial.chunks == [b"SLOT:2:1\nBARRIER:OPEN\n"]
+    assert client._serial.flushes == 1
+
+
+def test_non_boolean_occupied_is_rejected_per_item():
+    controller, state, serial = _controller()
+
+    outcome = controller.manual_apply_batch([(0, "false"), (1, 0), (2, None)], gate="open")
+
+    assert [item["ok"] for item in outcome["results"]] == [False, False, False, True]
+    assert all("occupied" in item["error"] for item in outcome["results"][:3])
+    assert state.snapshot()["slots"] == [0, 0, 0]
+    assert serial.writes == [["BARRIER:OPEN"]]
+
+
+
+def test_route_does_not_turn_true_into_slot_one(web_app, admin_client, monkeypatch):
+    controller, state, serial = _controller()
+    monkeypatch.setattr(web_app.controller, "manual_apply_batch", controller.manual_apply_batch, raising=False)
+
+    response = admin_client.post("/api/control/batch", json={"slots": [
+        {"slot_id": True, "occupied": True},
+        {"slot_id": 2, "occupied": True},
+    ]})
+
+    results = response.get_json()["results"]
+    assert [item["ok"] for item in results] == [False, True]
+    assert results[0]["error"] == "slot_id phải là số"
+    assert state.snapshot()["slots"] == [0, 1, 0]
+
+
+def test_duplicate_slot_is_rejected_after_first():
+    controller, state, serial = _controller()
+
+    outcome = controller.manual_apply_batch([(1, True), (1, False), (2, True)])
+
+    assert [item["ok"] for item in outcome["results"]] == [True, False, True]
+    assert "lặp" in outcome["results"][1]["error"]
+    assert state.snapshot()["slots"] == [0, 1, 1]
+    assert serial.writes == [["SLOT:2:1", "SLOT:3:1"]]
+
+
+def test_slot_one_policy_is_the_same_on_both_routes(web_app, admin_client, monkeypatch):
+    controller, state, serial = _controller()
+    monkeypatch.setattr(web_app.controller, "manual_set_slot", controller.manual_set_slot, raising=False)
+    monkeypatch.setattr(web_app.controller, "manual_apply_batch", controller.manual_apply_batch, raising=False)
+
+    assert admin_client.post("/api/slot/1", json={"occupied": True}).status_code == 200
+    assert state.snapshot()["slots"] == [1, 0, 0]
+    batch = admin_client.post("/api/control/batch", json={"slots": [{"slot_id": 1, "occupied": False}]})
+    assert batch.status_code == 200
+    assert state.snapshot()["slots"] == [0, 0, 0]
+    assert serial.writes == []  # không bao giờ gửi SLOT:1
+    assert admin_client.post("/api/slot/4", json={"occupied": True}).status_code == 400
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from database.db import db
+from database.models import ParkingSession
+from database.repositories import SessionRepository
+from utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+START = datetime(2026, 3, 1)
+
+
+def _seed(count=120):
+    for index in range(count):
+        # Mỗi giờ vào có 2 session => phải phân biệt bằng id khi trùng entry_time
+        entry = START + timedelta(hours=index // 2)
+        db.session.add(ParkingSession(
+            slot_id=index % 3, user_id=index % 4 or None, entry_time=entry,
+            exit_time=entry + timedelta(minutes=30), duration_minutes=30,
+            status="completed", fee_amount=5000,
+            payment_status="paid" if index % 5 == 0 else "pending",
+        ))
+    db.session.commit()
+
+
+def _walk(limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page, cursor = SessionRepository.page(cursor=cursor, limit=limit, **filters)
+        assert len(page) <= limit
+        ids.extend(s.id for s in page)
+        if cursor is None:
+            return ids
+
+
+def _expected(**filters):
+    query = ParkingSession.query
+    for name, value in filters.items():
+        query = query.filter(getattr(ParkingSession, name) == value)
+    return [s.id for s in query.order_by(ParkingSession.entry_time.desc(), ParkingSession.id.desc())]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    token = encode_cursor(START, 42)
+    assert decode_cursor(token, 2) == (START, 42)
+    for bad in ("!!!", encode_cursor(1), "bm90IGpzb24"):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad, 2)
+
+
+def test_pages_cover_history_once_in_order(db_app):
+    _seed()
+    assert _walk(7) == _expected()
+    assert _walk(10, slot_id=1) == _expected(slot_id=1)
+    assert _walk(4, user_id=2, payment_status="pending") == _expected(user_id=2, payment_status="pending")
+
+    window = SessionRepository.page(
+        limit=500, start=START + timedelta(hours=10), end=START + timedelta(hours=20),
+    )[0]
+    assert len(window) == 20
+    assert all(START + timedelta(hours=10) <= s.entry_time < START + timedelta(hours=20) for s in window)
+
+
+def test_deep_pages_use_index_without_sorting(db_app):
+    _seed()
+    _, cursor = SessionRepository.page(limit=100)
+    for filters in ({}, {"slot_id": 2}, {"user_id": 1}):
+        statements = []
+
+        def record(conn, cur, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            SessionRepository.page(cursor=cursor, limit=10, **filters)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        statement, parameters = statements[-1]
+        with db.engine.connect() as conn:
+            plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+        assert all("USING" in step for step in plan if "parking_sessions" in step), plan
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from auth.hashing import HasherBusy, PasswordHasher, hash_method, needs_rehash
+from database.models import User
+
+
+def test_set_password_uses_configured_method(monkeypatch):
+    monkeypatch.setenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    user = User(username="a", email="a@example.com")
+    user.set_password("secret")
+    assert hash_method() == "pbkdf2:sha256:1000"
+    assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+    assert user.check_password("secret")
+    assert not needs_rehash(user.password_hash)
+    assert needs_rehash(generate_password_hash("secret", method="pbkdf2:sha256:2000"))
+
+
+def test_verify_and_hash_in_pool(monkeypatch):
+    monkeypatch.setenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    hasher = PasswordHasher(workers=2, max_pending=4)
+    try:
+        hashed = hasher.hash("mật khẩu")
+        assert hashed.startswith("pbkdf2:sha256:1000$")
+        assert hasher.verify(hashed, "mật khẩu")
+        assert not hasher.verify(hashed, "sai")
+        assert hasher.stats == {"verified": 2, "hashed": 1, "rejected": 0, "timed_out": 0}
+    finally:
+        hasher.shutdown()
+
+
+def test_admission_control_rejects_when_saturated():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    started = threading.Event()
+
+    def slow(seconds):
+        started.set()
+        time.sleep(seconds)
+        return True
+
+    thread = threading.Thread(target=hasher._run, args=(slow, 0.3))
+    thread.start()
+    try:
+        assert started.wait(2)
+        with pytest.raises(HasherBusy):
+            hasher._run(slow, 0)
+        assert hasher.stats["rejected"] == 1
+    finally:
+        thread.join()
+        hasher.shutdown()
+    assert hasher._run(slow, 0) is True  # nhận lại khi đã rảnh
+
+
+def test_timeout_is_busy_and_keeps_slot_until_hash_finishes():
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(HasherBusy):
+            hasher._run(release.wait, 5)
+        assert hasher.stats["timed_out"] == 1
+        # Phép băm vẫn đang chạy => chưa trả chỗ
+        with pytest.raises(HasherBusy):
+            hasher._run(time.sleep, 0)
+        assert hasher.stats["rejected"] == 1
+        release.set()
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            try:
+                hasher._run(time.sleep, 0)
+                break
+            except HasherBusy:
+                time.sleep(0.01)
+        else:
+            pytest.fail("chỗ không được trả sau khi phép băm xong")
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -0,0 +1,180 @@
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from core.parking_service import ParkingService
+from core.pricing_engine import CompiledTariff, PricingEngine, RuleSpec, pricing_engine
+from core.statistics import statistics
+from database.db import db
+from database.models import ParkingSession, PricingRule
+
+MONDAY = datetime(2026, 10, 12)
+
+
+def test_compiled_tariff_picks_highest_priority_rule_per_hour():
+    rules = [
+        RuleSpec(id=1, name="base", rule_type="per_hour", priority=0, first_hour_fee=10000),
+        RuleSpec(id=2, name="night", rule_type="time_based", priority=5, start_hour=22, end_hour=6),
+        RuleSpec(id=3, name="weekend", rule_type="time_based", priority=9, start_hour=8, end_hour=18,
+                 days=frozenset({5, 6})),
+        RuleSpec(id=4, name="vip", rule_type="flat_rate", priority=1, user_id=42),
+    ]
+    tariff = CompiledTariff(rules)
+
+    assert tariff.rule_for(MONDAY.replace(hour=12)).id == 1
+    assert tariff.rule_for(MONDAY.replace(hour=23)).id == 2
+    assert tariff.rule_for(MONDAY.replace(hour=3)).id == 2
+    assert tariff.rule_for(datetime(2026, 10, 17, 9)).id == 3  # Thứ Bảy
+    assert tariff.rule_for(MONDAY.replace(hour=12), user_id=42).id == 4
+    assert tariff.rule_for(MONDAY.replace(hour=23), user_id=42).id == 2
+    assert tariff.rule_for(MONDAY.replace(hour=12), user_id=7).id == 1
+
+
+def test_calculate_fee_uses_cached_tariff_until_invalidated(db_app):
+    db.session.add(PricingRule(name="per hour", rule_type="per_hour", first_hour_fee=8000,
+                               subsequent_hour_fee=4000))
+    db.session.commit()
+    pricing_engine.invalidate()
+
+    session = ParkingSession(slot_id=0, entry_time=MONDAY.replace(hour=9), duration_minutes=150)
+    assert ParkingService.calculate_fee(session) == 8000 + 2 * 4000
+
+    PricingRule.query.delete()
+    db.session.commit()
+    assert ParkingService.calculate_fee(session) == 16000  # chưa invalidate => vẫn dùng bảng cũ
+
+    pricing_engine.invalidate()
+    assert ParkingService.calculate_fee(session) == 10000 + 2 * 5000
+
+
+def test_engine_in_other_process_sees_staged_change(db_app):
+    # Engine thứ hai = process khác (worker web/controller) dùng chung DB
+    other = PricingEngine(refresh_interval=0)
+    version = other.version
+    assert other.tariff().rules == ()
+
+    db.session.add(PricingRule(name="per hour", rule_type="per_hour", first_hour_fee=7000))
+    pricing_engine.stage()
+    db.session.commit()
+
+    assert other.version == version + 1
+    assert [rule.name for rule in other.tariff().rules] == ["per hour"]
+    statistics.reconcile()  # dựng lại bộ đếm thống kê không đụng tới version bảng giá
+    assert other.version == version + 1
+
+    lazy = PricingEngine(refresh_interval=60)
+    lazy.tariff()
+    PricingRule.query.delete()
+    pricing_engine.stage()
+    db.session.commit()
+    assert len(lazy.tariff().rules) == 1  # chưa tới hạn kiểm tra lại
+    lazy._checked_at -= 61
+    assert lazy.tariff().rules == ()
+
+
+def _brute_force_price(tariff, entry_time, duration_minutes):
+    from datetime import timedelta
+
+    hours = (duration_minutes + 59) // 60
+    rule = tariff.rule_for(entry_time)
+    total = rule.first_hour_fee if rule else 10000
+    rates = tariff.timeline().rates
+    for k in range(1, hours):
+        moment = entry_time + timedelta(hours=k)
+        total += rates[moment.weekday() * 24 + moment.hour]
+    return total
+
+
+def test_interval_price_splits_across_time_windows():
+    rules = [
+        RuleSpec(id=1, name="day", rule_type="time_based", start_hour=6, end_hour=22,
+                 first_hour_fee=10000, subsequent_hour_fee=6000),
+        RuleSpec(id=2, name="night", rule_type="time_based", start_hour=22, end_hour=6,
+                 first_hour_fee=8000, subsequent_hour_fee=2000),
+    ]
+    tariff = CompiledTariff(rules)
+    entry = MONDAY.replace(hour=21, minute=30)
+    # 21:30-07:30: giờ đầu theo rule ngày, 9 giờ sau bắt đầu lúc 22:30..06:30 => 8 giờ đêm + 1 giờ ngày
+    assert tariff.price(entry, 10 * 60) == 10000 + 8 * 2000 + 1 * 6000
+    assert tariff.price(entry, 10 * 60) == _brute_force_price(tariff, entry, 10 * 60)
+    for minutes in (1, 59, 61, 24 * 60, 7 * 24 * 60 + 5, 23 * 24 * 60 + 17):
+        assert tariff.price(entry, minutes) == _brute_force_price(tariff, entry, minutes)
+
+
+def test_session_level_rules_apply_to_whole_stay():
+    tariff = CompiledTariff([
+        RuleSpec(id=1, name="flat", rule_type="flat_rate", priority=1, flat_rate_fee=30000),
+        RuleSpec(id=2, name="overnight", rule_type="overnight", priority=2, start_hour=None,
+                 overnight_fee=50000, first_hour_fee=5000, subsequent_hour_fee=1000),
+    ])
+    entry = MONDAY.replace(hour=20)
+    assert tariff.price(entry, 3 * 60) == 5000 + 2 * 1000
+    assert tariff.price(entry, 14 * 60) == 2 * 50000  # qua 1 đêm
+
+    flat_only = CompiledTariff([RuleSpec(id=1, name="flat", rule_type="flat_rate", flat_rate_fee=30000)])
+    assert flat_only.price(entry, 40 * 60) == 30000
+
+
+def test_end_session_completes_and_prices_db_session(db_app):
+    pricing_engine.invalidate()
+    ParkingService.start_session(slot_id=2)
+    session = ParkingService.end_session(slot_id=2)
+    assert session.status == "completed"
+    assert session.duration_minutes == 0
+    assert session.fee_amount == 0
+
+
+# Process khác (controller hoặc worker web) dùng chung file DB
+_OTHER_PROCESS = """
+import sys
+from flask import Flask
+from core.pricing_engine import pricing_engine
+from database.db import db
+
+app = Flask(__name__)
+app.config["SQLALCHEMY_DATABASE_URI"] = sys.argv[1]
+db.init_app(app)
+pricing_engine.refresh_interval = 0
+with app.app_context():
+    for _ in range(2):
+        print(pricing_engine.version, [r.first_hour_fee for r in pricing_engine.tariff().rules], flush=True)
+        sys.stdin.readline()
+"""
+
+
+def test_rule_change_in_one_process_reaches_another(tmp_path):
+    from flask import Flask
+
+    uri = f"sqlite:///{tmp_path / 'shared.db'}"
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(PricingRule(name="old", rule_type="per_hour", first_hour_fee=8000))
+        pricing_engine.stage()
+        db.session.commit()
+
+        other = subprocess.Popen(
+            [sys.executable, "-c", _OTHER_PROCESS, uri],
+            cwd=Path(__file__).resolve().parents[1], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            assert other.stdout.readline().split(" ", 1) == ["1", "[8000]\n"]
+
+            # Như API PUT /api/pricing-rules trong một worker web
+            PricingRule.query.one().first_hour_fee = 12000
+            pricing_engine.stage()
+            db.session.commit()
+            pricing_engine.invalidate()
+
+            other.stdin.write("\n")
+            other.stdin.flush()
+            assert other.stdout.readline().split(" ", 1) == ["2", "[12000]\n"]
+            other.stdin.write("\n")
+            other.stdin.flush()
+            assert other.wait(timeout=10) == 0
+        finally:
+            other.kill()
+        db.session.remove()
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from core import pricing_simulator
+from core.pricing_engine import CompiledTariff
+from core.pricing_simulator import Candidate, SessionHistory, candidate_fees, run_simulation, simulate
+from database.db import db
+from database.models import ParkingSession
+
+NIGHT_DISCOUNT = {
+    "name": "night",
+    "rules": [
+        {"name": "day", "rule_type": "per_hour", "first_hour_fee": 10000, "subsequent_hour_fee": 5000},
+        {"name": "night", "rule_type": "time_based", "priority": 5, "start_hour": 22, "end_hour": 6,
+         "first_hour_fee": 4000, "subsequent_hour_fee": 1000},
+    ],
+}
+FLAT = {"name": "flat", "rules": [{"name": "flat", "rule_type": "flat_rate", "flat_rate_fee": 20000}]}
+
+
+def _add_sessions(entries):
+    for entry, minutes, fee in entries:
+        db.session.add(ParkingSession(slot_id=0, entry_time=entry, exit_time=entry + timedelta(minutes=minutes),
+                                      duration_minutes=minutes, status="completed", fee_amount=fee))
+    db.session.commit()
+
+
+def test_scalar_and_vector_fees_agree():
+    candidate = Candidate.from_dict(NIGHT_DISCOUNT)
+    tariff = CompiledTariff(candidate.rules)
+    history = SessionHistory(start_slot=[10, 23, 100, 167], minutes=[30, 600, 0, 3000], nights=[0, 1, 0, 3])
+    scalar = candidate_fees(tariff, history)
+
+    if pricing_simulator.np is not None:
+        arrays = SessionHistory(*(pricing_simulator.np.array(c) for c in
+                                  (history.start_slot, history.minutes, history.nights)))
+        assert candidate_fees(tariff, arrays).tolist() == scalar
+    assert scalar[0] == 10000 and scalar[2] == 0
+
+
+def test_run_simulation_compares_candidates(db_app):
+    monday = datetime(2026, 10, 12)
+    _add_sessions([
+        (monday + timedelta(hours=9), 120, 15000),
+        (monday + timedelta(hours=23), 60, 10000),
+        (monday - timedelta(days=30), 60, 10000),  # ngoài cửa sổ
+    ])
+
+    report = run_simulation([NIGHT_DISCOUNT, FLAT], start=monday, end=monday + timedelta(days=1), workers=1)
+
+    assert report["sessions"] == 2 and report["recorded_revenue"] == 25000
+    results = {r["name"]: r for r in report["results"]}
+    assert results["current"]["revenue"] == 25000
+    assert results["night"]["revenue"] == 19000 and results["night"]["revenue_delta"] == -6000
+    assert results["flat"]["average_fee"] == 20000
+    assert sum(b["count"] for b in results["night"]["histogram"]) == 2
+
+
+def test_simulate_in_process_pool_matches_inline():
+    history = SessionHistory(start_slot=list(range(0, 168, 7)), minutes=[m * 37 for m in range(24)],
+                             nights=[m // 10 for m in range(24)])
+    candidates = [Candidate.from_dict(NIGHT_DISCOUNT), Candidate.from_dict(FLAT)]
+
+    pooled = simulate(candidates, history, workers=2)
+    inline = simulate(candidates, history, workers=1)
+
+    assert [(r.name, r.revenue, r.percentiles) for r in pooled] == [(r.name, r.revenue, r.percentiles) for r in inline]
@@ -0,0 +1,80 @@
+from sqlalchemy import event
+
+from auth.principal import PrincipalCache, UserPrincipal, principal_cache
+from database.db import db
+from database.models import User
+
+
+def _add_user(username="lan", role="client"):
+    user = User(username=username, email=f"{username}@example.com", role=role, password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _queries(fn):
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return result, len(statements)
+
+
+def test_cached_principal_skips_database(db_app):
+    user_id = _add_user().id
+    principal_cache.invalidate()
+    first, first_queries = _queries(lambda: principal_cache.get(user_id))
+    second, second_queries = _queries(lambda: principal_cache.get(user_id))
+
+    assert isinstance(first, UserPrincipal) and first == second
+    assert first.get_id() == str(user_id) and first.is_authenticated and not first.is_admin()
+    assert first_queries == 1 and second_queries == 0
+    assert principal_cache.get(9999) is None
+
+
+def test_role_and_password_changes_invalidate_after_commit(db_app):
+    user = _add_user()
+    principal_cache.invalidate()
+    assert principal_cache.get(user.id).role == "client"
+
+    user.role = "admin"
+    db.session.commit()
+    assert principal_cache.get(user.id).is_admin()
+
+    user.is_active = False
+    db.session.commit()
+    assert principal_cache.get(user.id).is_active is False
+
+    cached = principal_cache.get(user.id)
+    user.set_password("mật khẩu mới")
+    db.session.commit()
+    assert principal_cache.get(user.id) is not cached  # tải lại
+
+    # last_login không làm mất cache
+    cached = principal_cache.get(user.id)
+    user.last_login = db.func.now()
+    db.session.commit()
+    assert principal_cache.get(user.id) is cached
+
+
+def test_lru_and_ttl(db_app, monkeypatch):
+    users = [_add_user(f"u{i}") for i in range(3)]
+    cache = PrincipalCache(maxsize=2, ttl=30)
+    for user in users:
+        cache.get(user.id)
+    assert cache.stats()["size"] == 2
+
+    clock = [1000.0]
+    monkeypatch.setattr("auth.principal.time.monotonic", lambda: clock[0])
+    user_id = users[0].id
+    cache.invalidate()
+    cache.get(user_id)
+    clock[0] += 31
+    _, queries = _queries(lambda: cache.get(user_id))
+    assert queries == 1
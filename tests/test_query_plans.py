@@ -0,0 +1,121 @@
+"""EXPLAIN QUERY PLAN cho truy vấn ParkingService và rollup: không được quét toàn bảng nóng."""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+
+from core import rollups
+from core.parking_service import ParkingService
+from database.db import db
+from database.migrations import LATEST_VERSION, run_migrations
+from database.models import ParkingSession, SystemLog
+
+HOT_TABLES = ("parking_sessions", "system_logs")
+SCAN = re.compile(r"^SCAN (%s)(?: USING (?:COVERING )?INDEX (\w+))?" % "|".join(HOT_TABLES))
+# Index một phần (chỉ session active) => quét nó không tăng theo lịch sử
+PARTIAL_INDEXES = {"ix_parking_sessions_active_entry"}
+# Range chỉ có cận trên: đọc index từ đầu lịch sử tới cận đó
+OPEN_RANGE = re.compile(r"^SEARCH (%s) USING (?:COVERING )?INDEX (\w+) \((\w+)<\?\)" % "|".join(HOT_TABLES))
+
+
+@contextmanager
+def _capture_selects():
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield captured
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _is_full_scan(step, statement):
+    """Quét cả bảng, hoặc quét index mà không phải top-N thuần (ORDER BY ... LIMIT, không WHERE)."""
+    statement = " ".join(statement.split())
+    open_range = OPEN_RANGE.match(step)
+    if open_range:
+        return open_range.group(2) not in PARTIAL_INDEXES
+    match = SCAN.match(step)
+    if not match:
+        return "TEMP B-TREE FOR ORDER BY" in step
+    index = match.group(2)
+    if index is None:
+        return True
+    top_n = " LIMIT " in statement and " WHERE " not in statement
+    return index not in PARTIAL_INDEXES and not top_n
+
+
+def _plan(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def _seed():
+    start = datetime(2026, 1, 1)
+    for index in range(200):
+        entry = start + timedelta(hours=index)
+        db.session.add(ParkingSession(
+            slot_id=index % 3, user_id=index % 5 or None, entry_time=entry,
+            exit_time=entry + timedelta(minutes=40), duration_minutes=40, status="completed",
+            fee_amount=10000, payment_status="paid" if index % 2 else "pending",
+            payment_time=entry + timedelta(minutes=41) if index % 2 else None,
+        ))
+        db.session.add(SystemLog(event_type="session_end", message="x", created_at=entry))
+    db.session.commit()
+
+
+def test_parking_service_queries_use_indexes(db_app):
+    _seed()
+    with _capture_selects() as statements:
+        session = ParkingService.start_session(slot_id=1, user_id=2)
+        ParkingService.get_active_sessions()
+        ParkingService.end_session(slot_id=1)
+        ParkingService.mark_paid(session.id)
+        ParkingService.get_user_sessions(2, limit=10)
+        ParkingService.get_session_history(limit=50)
+        ParkingService.get_statistics()
+
+    assert statements
+    offenders = []
+    for statement, parameters in statements:
+        plan = _plan(statement, parameters)
+        if any(_is_full_scan(step, statement) for step in plan):
+            offenders.append((" ".join(statement.split()), plan))
+    assert offenders == []
+
+
+def test_rollup_queries_read_only_the_window(db_app):
+    _seed()
+    ParkingService.start_session(slot_id=0, user_id=1)
+    with _capture_selects() as statements:
+        rollups.run_once()
+        rollups.rebuild(datetime(2026, 1, 5), datetime(2026, 1, 6))
+
+    offenders = []
+    for statement, parameters in statements:
+        if "parking_sessions" not in statement:
+            continue
+        plan = _plan(statement, parameters)
+        if any(_is_full_scan(step, statement) for step in plan):
+            offenders.append((" ".join(statement.split()), plan))
+    assert offenders == []
+
+
+def test_migration_adds_indexes_to_existing_tables(db_app):
+    with db.engine.begin() as conn:
+        for index in ParkingSession.__table__.indexes | SystemLog.__table__.indexes:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        conn.exec_driver_sql("PRAGMA user_version = 0")
+
+    assert run_migrations(db.engine) == LATEST_VERSION
+    assert run_migrations(db.engine) == LATEST_VERSION  # chạy lại không lỗi
+
+    names = {ix["name"] for ix in inspect(db.engine).get_indexes("parking_sessions")}
+    assert {ix.name for ix in ParkingSession.__table__.indexes} <= names
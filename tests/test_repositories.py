@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from database.db import db
+from database.models import ParkingSession, PricingRule, User
+from database.repositories import PricingRuleRepository, SessionRepository, SessionRow, UserRepository
+
+
+def _count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _seed():
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(5)]
+    db.session.add_all(users)
+    db.session.flush()
+    start = datetime(2026, 4, 1)
+    for index in range(60):
+        db.session.add(ParkingSession(
+            slot_id=index % 3, user_id=users[index % 5].id, entry_time=start + timedelta(minutes=index),
+            status="completed", duration_minutes=10, fee_amount=3000,
+        ))
+    db.session.add(PricingRule(name="Ngày", rule_type="per_hour", priority=1, first_hour_fee=7000))
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_history_page_is_one_query_with_usernames(db_app):
+    _seed()
+    statements, stop = _count_queries()
+    try:
+        rows, cursor = SessionRepository.page(limit=50)
+        names = [row.username for row in rows]
+    finally:
+        stop()
+    assert len(statements) == 1
+    assert len(rows) == 50 and cursor is not None
+    assert isinstance(rows[0], SessionRow)
+    assert set(names) == {f"u{i}" for i in range(5)}
+    assert not db.session.identity_map  # không tạo ORM entity
+
+
+def test_projections_match_models(db_app):
+    _seed()
+    user = User.query.filter_by(username="u2").one()
+    mine = SessionRepository.for_user(user.id, limit=5)
+    assert [row.id for row in mine] == [
+        s.id for s in ParkingSession.query.filter_by(user_id=user.id)
+        .order_by(ParkingSession.entry_time.desc()).limit(5)
+    ]
+    assert SessionRepository.get(mine[0].id).username == "u2"
+    assert SessionRepository.get(10_000) is None
+
+    users, _ = UserRepository.page(limit=10)
+    assert "password_hash" not in users[0].to_dict()
+    rule = PricingRuleRepository.list_all()[0].to_dict()
+    assert rule["name"] == "Ngày" and rule["first_hour_fee"] == 7000 and isinstance(rule["created_at"], str)
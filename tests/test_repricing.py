@@ -0,0 +1,48 @@
+import random
+from datetime import datetime, timedelta
+
+from core.pricing_engine import RuleSpec, CompiledTariff, pricing_engine
+from core.repricing import VectorTariff, price_rows, reprice_pending_sessions
+from database.db import db
+from database.models import ParkingSession, PricingRule
+
+
+def test_vectorized_prices_match_scalar_tariff():
+    tariff = CompiledTariff([
+        RuleSpec(id=1, name="day", rule_type="time_based", start_hour=6, end_hour=22,
+                 first_hour_fee=10000, subsequent_hour_fee=6000),
+        RuleSpec(id=2, name="night", rule_type="time_based", start_hour=22, end_hour=6,
+                 first_hour_fee=8000, subsequent_hour_fee=2000),
+        RuleSpec(id=3, name="weekend", rule_type="flat_rate", priority=5, start_hour=None,
+                 flat_rate_fee=25000),
+        RuleSpec(id=4, name="sunday night", rule_type="time_based", priority=9, start_hour=20,
+                 end_hour=23, days=frozenset({6}), first_hour_fee=1000, subsequent_hour_fee=500),
+    ])
+    rng = random.Random(7)
+    rows = []
+    for index in range(2000):
+        entry = datetime(2026, 1, 1) + timedelta(minutes=rng.randrange(60 * 24 * 60))
+        duration = rng.choice([0, 1, 59, 60, 61, rng.randrange(60 * 24 * 20)])
+        rows.append((index, entry, entry + timedelta(minutes=duration), duration, 0))
+
+    expected = price_rows(tariff, rows)
+    assert price_rows(tariff, rows, VectorTariff(tariff.timeline())) == expected
+
+
+def test_reprice_updates_only_unpaid_completed_sessions(db_app):
+    entry = datetime(2026, 10, 12, 9, 0)
+    for status, payment in (("completed", "pending"), ("completed", "paid"), ("active", "pending")):
+        db.session.add(ParkingSession(slot_id=0, entry_time=entry, exit_time=entry + timedelta(hours=3),
+                                      duration_minutes=180, status=status, payment_status=payment,
+                                      fee_amount=1))
+    db.session.add(PricingRule(name="ph", rule_type="per_hour", first_hour_fee=9000, subsequent_hour_fee=1000))
+    db.session.commit()
+    pricing_engine.invalidate()
+
+    progress = []
+    report = reprice_pending_sessions(chunk_size=1, progress=progress.append)
+
+    assert report.finished and report.scanned == 1 and report.updated == 1
+    fees = [s.fee_amount for s in ParkingSession.query.order_by(ParkingSession.id)]
+    assert fees == [11000, 1, 1]
+    assert len(progress) == 1
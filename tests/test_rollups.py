@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from core import rollups
+from database.db import db
+from database.models import ParkingSession, SessionRollup
+
+MONDAY = datetime(2026, 10, 12)
+
+
+def _session(slot_id, entry, minutes=None, fee=0, paid_at=None):
+    session = ParkingSession(slot_id=slot_id, entry_time=entry, status="active")
+    if minutes is not None:
+        session.exit_time = entry + timedelta(minutes=minutes)
+        session.duration_minutes = minutes
+        session.status = "completed"
+        session.fee_amount = fee
+    if paid_at is not None:
+        session.payment_status = "paid"
+        session.payment_time = paid_at
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def _rollup_snapshot():
+    return sorted(
+        (r.granularity, r.bucket_start, r.slot_id, r.sessions_started, r.sessions_ended,
+         round(r.occupancy_minutes, 3), r.revenue, r.dwell_minutes)
+        for r in SessionRollup.query.all()
+    )
+
+
+def test_hourly_buckets_split_occupancy_and_revenue(db_app):
+    _session(0, MONDAY + timedelta(hours=9, minutes=30), minutes=80, fee=15000,
+             paid_at=MONDAY + timedelta(hours=11, minutes=5))
+    _session(1, MONDAY + timedelta(hours=10, minutes=15))  # còn active
+    now = MONDAY + timedelta(hours=11, minutes=45)
+
+    rollups.run_once(now=now)
+
+    hourly = {(row["bucket_start"], row["slot_id"]): row for row in
+              rollups.query_usage("hour", MONDAY, MONDAY + timedelta(days=1), by_slot=True)}
+    nine = hourly[((MONDAY + timedelta(hours=9)).isoformat(), 0)]
+    ten = hourly[((MONDAY + timedelta(hours=10)).isoformat(), 0)]
+    assert nine["sessions_started"] == 1 and nine["occupancy_minutes"] == 30
+    assert ten["sessions_ended"] == 1 and ten["occupancy_minutes"] == 50
+    assert ten["average_dwell_minutes"] == 80
+    assert hourly[((MONDAY + timedelta(hours=11)).isoformat(), 0)]["revenue"] == 15000
+    assert hourly[((MONDAY + timedelta(hours=11)).isoformat(), 1)]["occupancy_minutes"] == 45
+
+    (day,) = rollups.query_usage("day", MONDAY, MONDAY + timedelta(days=1))
+    assert day["sessions_started"] == 2 and day["revenue"] == 15000
+    assert day["occupancy_minutes"] == 80 + 90
+    # Session active cũ nhất giữ watermark lại
+    assert rollups.get_watermark() == MONDAY + timedelta(hours=10, minutes=15)
+
+
+def test_incremental_runs_match_full_backfill(db_app):
+    _session(0, MONDAY - timedelta(days=3), minutes=60 * 30, fee=50000, paid_at=MONDAY)
+    active = _session(2, MONDAY + timedelta(hours=20))
+    rollups.run_once(now=MONDAY + timedelta(hours=22))
+
+    active.exit_time = MONDAY + timedelta(days=1, hours=2)
+    active.duration_minutes = 360
+    active.status = "completed"
+    db.session.commit()
+    _session(1, MONDAY + timedelta(days=1, hours=1), minutes=20)
+    later = MONDAY + timedelta(days=1, hours=3)
+    rollups.run_once(now=later)
+    incremental = _rollup_snapshot()
+
+    rollups.request_backfill(MONDAY - timedelta(days=10))
+    rollups.run_once(now=later)
+    assert _rollup_snapshot() == incremental
+    assert rollups.get_watermark() == later
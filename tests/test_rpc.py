@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+from core.rpc import ControllerClient, RpcError, RpcServer, RpcUnavailable
+
+
+class FakeController:
+    def __init__(self):
+        self.calls = []
+
+    def manual_set_gate(self, state):
+        self.calls.append(("gate", state))
+        return state in ("open", "closed")
+
+    def manual_set_slot(self, slot_index, occupied):
+        if slot_index < 0:
+            raise ValueError("slot âm")
+        self.calls.append(("slot", slot_index, occupied))
+        return True
+
+    def stop(self):
+        self.calls.append("stop")
+
+
+@pytest.fixture
+def socket_path():
+    path = os.path.join(tempfile.mkdtemp(), "ctl.sock")
+    yield path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def _serve(target, path):
+    server = RpcServer(target, path)
+    server.start()
+    return server
+
+
+def test_proxy_keeps_controller_signatures(socket_path):
+    target = FakeController()
+    server = _serve(target, socket_path)
+    client = ControllerClient(socket_path)
+    try:
+        assert client.manual_set_gate("open") is True
+        assert client.manual_set_slot(1, occupied=True) is True
+        assert target.calls == [("gate", "open"), ("slot", 1, True)]
+
+        with pytest.raises(RpcError, match="slot âm"):
+            client.manual_set_slot(-1, False)
+        with pytest.raises(AttributeError):
+            client.stop  # không nằm trong whitelist => không có trên proxy
+        # Gửi thẳng method ngoài whitelist: server từ chối
+        with pytest.raises(RpcError, match="không được phép"):
+            client.call("stop")
+        assert "stop" not in target.calls
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_pipeline_preserves_order(socket_path):
+    target = FakeController()
+    server = _serve(target, socket_path)
+    client = ControllerClient(socket_path)
+    try:
+        results = client.pipeline([
+            ("manual_set_slot", (1, True)),
+            ("manual_set_gate", ("sideways",)),
+            ("manual_set_slot", (-1, False)),
+            ("manual_set_gate", ("closed",)),
+        ])
+        assert results[:2] == [True, False] and results[3] is True
+        assert isinstance(results[2], RpcError)
+        assert target.calls == [("slot", 1, True), ("gate", "sideways"), ("gate", "closed")]
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_client_reconnects_after_controller_restart(socket_path):
+    client = ControllerClient(socket_path, timeout=1)
+    with pytest.raises(RpcUnavailable):
+        client.manual_set_gate("open")
+
+    server = _serve(FakeController(), socket_path)
+    assert client.manual_set_gate("open") is True
+    server.stop()
+    time.sleep(0.05)
+
+    restarted = FakeController()
+    server = _serve(restarted, socket_path)
+    try:
+        assert client.manual_set_gate("closed") is True
+        assert restarted.calls == [("gate", "closed")]
+    finally:
+        client.close()
+        server.stop()
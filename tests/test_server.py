@@ -0,0 +1,60 @@
+import http.client
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("waitress")
+
+from web.server import GracefulServer, create_listener
+
+
+def slow_app(environ, start_response):
+    if environ["PATH_INFO"] == "/slow":
+        time.sleep(0.5)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+@pytest.fixture
+def server():
+    sock = create_listener("127.0.0.1", 0)
+    srv = GracefulServer(slow_app, sock, threads=2)
+    srv.start()
+    yield srv, sock.getsockname()[1]
+    srv.drain(timeout=1)
+    sock.close()
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def test_serves_requests(server):
+    _, port = server
+    assert _get(port, "/") == (200, b"ok")
+
+
+def test_drain_waits_for_inflight_request(server):
+    srv, port = server
+    results = []
+    thread = threading.Thread(target=lambda: results.append(_get(port, "/slow")))
+    thread.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    assert srv.drain(timeout=5) is True
+    assert time.monotonic() - started >= 0.3
+    thread.join(timeout=5)
+    assert results == [(200, b"ok")]
+
+
+def test_drain_gives_up_after_timeout(server):
+    srv, port = server
+    thread = threading.Thread(target=lambda: _get(port, "/slow"), daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    assert srv.drain(timeout=0.1) is False
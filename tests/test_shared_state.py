@@ -0,0 +1,76 @@
+import struct
+import uuid
+
+import pytest
+
+from core.shared_state import SharedControllerView, SharedStatePublisher, SharedStateSegment, SharedStateView
+from core.state_manager import StateManager
+
+
+@pytest.fixture
+def segment():
+    segment = SharedStateSegment.create(f"eparking_test_{uuid.uuid4().hex[:8]}", size=4096)
+    yield segment
+    segment.close()
+
+
+def test_view_follows_published_versions(segment):
+    manager = StateManager(touch_interval=3600)
+    publisher = SharedStatePublisher(manager, segment)
+    publisher.publish_once()
+    view = SharedStateView(segment.name)
+
+    assert view.version == manager.version
+    assert view.snapshot() == manager.snapshot()
+
+    manager.update({"slots": [1, 1, 0], "gate": "open"})
+    manager.publish({"active_sessions": 2, "arduino_connected": True})
+    old_version = view.version
+    assert publisher.publish_once() is True
+    assert publisher.publish_once() is False  # không đổi => không ghi lại
+
+    current, delta = view.changes_since(old_version)
+    assert current == manager.version
+    assert delta["gate"] == "open" and delta["active_sessions"] == 2
+    assert view.changes_since(old_version - 5)[1] is None
+    assert view.live_snapshot() == manager.live_snapshot()
+
+    controller = SharedControllerView(view)
+    assert controller.mode_manager.get_mode_info()["mode"] == "auto"
+    assert controller.serial_client.is_connected() is True
+    with pytest.raises(RuntimeError):
+        view.update({"gate": "closed"})
+    view.close()
+
+
+def test_workers_share_the_controller_etag(segment):
+    from web.http_cache import make_etag, state_parts
+
+    manager = StateManager(touch_interval=3600)
+    SharedStatePublisher(manager, segment).publish_once()
+    # Hai worker gắn vào cùng segment => cùng ETag với process controller
+    first, second = SharedStateView(segment.name), SharedStateView(segment.name)
+    assert first.boot_id == second.boot_id == manager.boot_id
+    assert make_etag("status", state_parts(first)) == make_etag("status", state_parts(second))
+    assert make_etag("status", state_parts(first)) == make_etag("status", state_parts(manager))
+    # Controller khởi động lại: version từ 0 nhưng boot_id mới => ETag khác
+    assert state_parts(StateManager())[0] != manager.boot_id
+    first.close()
+    second.close()
+
+
+def test_reader_rejects_torn_write(segment):
+    segment.write(1, {"state": {"gate": "open"}, "extra": {}})
+    assert segment.read()[1:] == (1, {"state": {"gate": "open"}, "extra": {}})
+
+    # Người ghi đang ghi dở (seq lẻ) => người đọc không trả về dữ liệu nửa vời
+    seq = segment.sequence()
+    struct.pack_into("<Q", segment._buf, 0, seq + 1)
+    with pytest.raises(RuntimeError):
+        segment.read()
+
+    # seq chẵn nhưng payload bị ghi đè một phần => CRC sai
+    struct.pack_into("<Q", segment._buf, 0, seq)
+    segment._buf[32] = ord("X")
+    with pytest.raises(RuntimeError):
+        segment.read()
@@ -1,3 +1,4 @@
+import threading
 import time
 
 from core.state_manager import StateManager
@@ -20,3 +21,48 @@ def test_state_manager_updates_snapshot():
     assert snapshot2["gate"] == "closed"
     assert snapshot2["last_update"] >= before
 
+
+
+def test_changes_since_returns_only_changed_fields():
+    manager = StateManager(touch_interval=3600)
+    manager.update({"slots": [1, 0, 0]})
+    version = manager.version
+
+    manager.update({"slots": [1, 0, 0]})  # không đổi gì => không có version mới
+    assert manager.version == version
+
+    manager.update({"gate": "open"})
+    manager.update({"slots": [1, 1, 0]})
+    current, delta = manager.changes_since(version)
+    assert current == version + 2
+    assert delta["gate"] == "open"
+    assert delta["slots"] == [1, 1, 0] and delta["free"] == 1
+    assert "led_status" not in delta
+    assert manager.changes_since(current) == (current, {})
+
+
+def test_changes_since_requests_snapshot_when_buffer_overflows():
+    manager = StateManager(buffer_size=2, touch_interval=3600)
+    for index in range(4):
+        manager.update({"errors": [f"lỗi {index}"]})
+    assert manager.changes_since(1)[1] is None
+    assert manager.changes_since(2)[1] == {"errors": ["lỗi 3"], "last_update": manager.snapshot()["last_update"]}
+    assert manager.changes_since(99)[1] is None  # version từ process trước
+
+
+def test_publish_and_wait_wake_up_viewers():
+    manager = StateManager()
+    version, data = manager.live_snapshot()
+    woke = []
+    waiter = threading.Thread(target=lambda: woke.append(manager.wait(version, timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    manager.publish({"active_sessions": 2})
+    waiter.join(timeout=5)
+    assert woke == [True]
+
+    manager.publish({"active_sessions": 2})  # giá trị cũ => không phát lại
+    current, delta = manager.changes_since(version)
+    assert (current, delta) == (version + 1, {"active_sessions": 2})
+    assert manager.live_snapshot()[1]["active_sessions"] == 2
+    assert manager.wait(current, timeout=0.01) is False
@@ -0,0 +1,80 @@
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import event
+
+from core.parking_service import ParkingService
+from core.statistics import TOTAL_REVENUE, statistics
+from database.db import db
+from database.models import ParkingSession, StatsCounter
+
+
+def _count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_counters_follow_session_lifecycle(db_app):
+    first = ParkingService.start_session(slot_id=0)
+    ParkingService.start_session(slot_id=1)
+    ParkingService.end_session(slot_id=0)
+    first.fee_amount = 12000
+    db.session.commit()
+    ParkingService.mark_paid(first.id)
+    ParkingService.mark_paid(first.id)  # trả lại lần hai không cộng doanh thu
+
+    stats = ParkingService.get_statistics()
+    assert stats == {
+        "total_sessions": 2,
+        "active_sessions": 1,
+        "completed_sessions": 1,
+        "today_sessions": 2,
+        "total_revenue": 12000,
+        "today_revenue": 12000,
+    }
+    assert statistics.reconcile() == {}
+
+
+def test_polls_hit_cache_until_commit(db_app):
+    ParkingService.start_session(slot_id=0)
+    ParkingService.get_statistics()
+
+    statements, stop = _count_queries()
+    try:
+        for _ in range(5):
+            ParkingService.get_statistics()
+        assert statements == []
+
+        ParkingService.start_session(slot_id=1)
+        statements.clear()
+        assert ParkingService.get_statistics()["active_sessions"] == 2
+        assert len(statements) == 1
+    finally:
+        stop()
+
+
+def test_rollback_does_not_leak_and_reconcile_repairs_drift(db_app):
+    ParkingService.start_session(slot_id=0)
+    statistics.stage({TOTAL_REVENUE: 999})
+    db.session.rollback()
+    assert ParkingService.get_statistics()["total_revenue"] == 0
+
+    # Dữ liệu ghi thẳng vào bảng (không qua ParkingService) => lệch tới khi đối soát
+    yesterday = datetime.now(UTC) - timedelta(days=1)
+    db.session.add(ParkingSession(slot_id=2, entry_time=yesterday, status="completed",
+                                  fee_amount=5000, payment_status="paid", payment_time=yesterday))
+    db.session.commit()
+    assert statistics.reconcile() == {
+        "total_sessions": 1,
+        "completed_sessions": 1,
+        TOTAL_REVENUE: 5000,
+        f"sessions:{yesterday.date().isoformat()}": 1,
+        f"revenue:{yesterday.date().isoformat()}": 5000,
+    }
+    stats = ParkingService.get_statistics()
+    assert stats["total_revenue"] == 5000 and stats["today_revenue"] == 0
+    assert db.session.get(StatsCounter, "total_sessions").value == 2
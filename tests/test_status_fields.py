@@ -0,0 +1,84 @@
+import pytest
+
+from web.main_routes import STATUS_PROFILES, STATUS_SECTIONS, _status_sections
+
+
+def test_default_is_full_profile():
+    assert _status_sections({}) == STATUS_SECTIONS
+    assert _status_sections({"profile": "live"}) == STATUS_PROFILES["live"]
+
+
+def test_fields_keep_canonical_order():
+    assert _status_sections({"fields": "arduino, state"}) == ("state", "arduino")
+    # fields thắng profile
+    assert _status_sections({"fields": "stats", "profile": "slots"}) == ("stats",)
+
+
+@pytest.mark.parametrize("args", [{"fields": "state,bogus"}, {"profile": "everything"}])
+def test_unknown_names_are_rejected(args):
+    with pytest.raises(ValueError):
+        _status_sections(args)
+
+
+class FakeSerial:
+    def __init__(self, last_received):
+        self.last_received = last_received
+
+    def get_last_received_time(self):
+        return self.last_received
+
+    def is_connected(self):
+        return True
+
+
+def test_arduino_age_advances_with_etag():
+    from config import WebConfig
+    from web.main_routes import _arduino_parts, _arduino_status
+
+    serial = FakeSerial(last_received=1000.0)
+    now = 1000.0 + 1
+    later = now + WebConfig.STREAM_TOUCH_INTERVAL
+
+    assert _arduino_status(serial, now)["arduino_update_age"] == 1.0
+    assert _arduino_status(serial, later)["arduino_update_age"] > 1.0
+    # Arduino im lặng: body đổi theo giờ nên ETag cũng phải đổi
+    assert _arduino_parts(serial, later) != _arduino_parts(serial, now)
+    # Trong cùng một khoảng thì giữ nguyên (poll liên tục vẫn nhận 304)
+    assert _arduino_parts(serial, now) == _arduino_parts(serial, now + 0.001)
+
+
+@pytest.mark.parametrize("query", ["profile=live", "profile=slots", "fields=state", "fields=state,arduino"])
+def test_profiles_without_stats_skip_the_query(web_app, admin_client, monkeypatch, query):
+    from unittest import mock
+
+    from core.parking_service import ParkingService
+    from web import http_cache
+
+    with web_app.app.app_context():
+        stats_keys = set(ParkingService.get_statistics())
+    assert stats_keys
+    get_statistics = mock.Mock(side_effect=AssertionError("không được truy vấn thống kê"))
+    monkeypatch.setattr(ParkingService, "get_statistics", get_statistics)
+    http_cache.clear()
+
+    response = admin_client.get(f"/api/status?{query}")
+
+    assert response.status_code == 200
+    assert get_statistics.call_count == 0
+    assert stats_keys.isdisjoint(response.get_json())
+
+
+def test_full_profile_includes_stats(web_app, admin_client, monkeypatch):
+    from unittest import mock
+
+    from core.parking_service import ParkingService
+    from web import http_cache
+
+    get_statistics = mock.Mock(return_value={"active_sessions": 7})
+    monkeypatch.setattr(ParkingService, "get_statistics", get_statistics)
+    http_cache.clear()
+
+    data = admin_client.get("/api/status").get_json()
+
+    assert get_statistics.call_count == 1
+    assert data["active_sessions"] == 7
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from core.parking_service import ParkingService
+from database.db import db, init_db
+from database.models import ParkingSession
+from database.storage import RoutingSession, reader_for, storage_maintenance
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'parking.db'}"
+    init_db(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def test_pragmas_and_read_only_pool(file_app):
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2  # INCREMENTAL
+    reader = reader_for(db.engine)
+    assert reader is not None
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+
+
+def test_selects_go_to_reader_until_session_writes(file_app):
+    routed = RoutingSession.reads_routed
+    ParkingService.get_active_sessions()
+    assert RoutingSession.reads_routed == routed + 1
+
+    db.session.add(ParkingSession(slot_id=0, status="active"))
+    db.session.flush()
+    # Dữ liệu chưa commit chỉ thấy được trên kết nối ghi
+    assert len(ParkingService.get_active_sessions()) == 1
+    db.session.commit()
+    routed = RoutingSession.reads_routed
+    assert len(ParkingService.get_active_sessions()) == 1
+    assert RoutingSession.reads_routed == routed + 1
+
+
+def test_dashboard_reads_do_not_block_on_open_write(file_app):
+    ParkingService.start_session(slot_id=0)
+    db.session.remove()
+
+    writer_holding = threading.Event()
+    release = threading.Event()
+
+    def long_write():
+        with file_app.app_context():
+            session = ParkingSession.query.filter_by(slot_id=0).first()
+            session.vehicle_plate = "51A-12345"
+            db.session.flush()  # giữ khóa ghi
+            writer_holding.set()
+            release.wait(5)
+            db.session.commit()
+            db.session.remove()
+
+    thread = threading.Thread(target=long_write)
+    thread.start()
+    try:
+        assert writer_holding.wait(5)
+        stats = ParkingService.get_statistics()
+        assert stats["active_sessions"] == 1
+        assert ParkingService.get_session_history()[0].vehicle_plate is None
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_maintenance_checkpoints_wal(file_app):
+    for slot in range(3):
+        ParkingService.start_session(slot_id=slot)
+    stats = storage_maintenance.run_once(db.engine)
+    assert stats["checkpoints"] >= 1
+    assert stats["last_checkpoint"]["busy"] == 0
+    info = storage_maintenance.describe(db.engine)
+    assert info["journal_mode"] == "wal" and "reader_pool" in info
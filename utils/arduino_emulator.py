@@ -0,0 +1,457 @@
+"""Giả lập Arduino (smart_parking.ino) qua pseudo-terminal để test serial không cần phần cứng.
+
+Mỗi thiết bị ảo mở một cặp pty; phía slave (``/dev/pts/N``) dùng được như cổng
+serial thật, nên ``SerialJSONClient`` chạy nguyên vẹn với ``port=device.port``.
+Giao thức giữ đúng firmware: frame JSON định kỳ (mặc định 500ms), lệnh
+``MODE:``, ``BARRIER:``, ``SLOT:``, ``LCD:UPDATE:``, ``PING`` và phản hồi ``OK:``.
+
+Chạy độc lập:
+    python -m utils.arduino_emulator --devices 4 --interval 0.1 --noise 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import json
+import logging
+import os
+import random
+import selectors
+import threading
+import time
+import tty
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOTAL_SLOTS = 3
+FRAME_INTERVAL = 0.5              # sendJSON() mỗi 500ms
+BARRIER_AUTO_CLOSE_DELAY = 7.0    # BARRIER_AUTO_CLOSE_DELAY 7000ms
+SERIAL_BUFFER_LIMIT = 100         # serialBuffer.length() > 100 => bỏ
+NOISE_ALPHABET = b"!#$%&()*+-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[]^_{|}~"
+BANNER = (
+    "Arduino Smart Parking System Ready v2.0",
+    "Features: Button control, 3 LED status, Multi-slot support",
+)
+
+
+@dataclass
+class DeviceStats:
+    frames_sent: int = 0
+    bytes_sent: int = 0
+    bytes_dropped: int = 0
+    commands_received: int = 0
+    replies_sent: int = 0
+    noisy_frames: int = 0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class VirtualArduino:
+    """Trạng thái và logic xử lý lệnh giống hệt firmware ``smart_parking.ino``."""
+
+    def __init__(self, total_slots: int = TOTAL_SLOTS) -> None:
+        self.total_slots = total_slots
+        self.slots = [0] * total_slots
+        self.barrier_open = False
+        self.barrier_open_time = 0.0
+        self.button_hold_mode = False
+        self.button_pressed = False
+        self.auto_control = True
+        self.system_error = False
+        self.lcd_lines = ["", ""]
+        self._buffer = ""
+
+    @property
+    def free_slots(self) -> int:
+        return self.total_slots - sum(self.slots)
+
+    # ------------------------------------------------------------------
+    def feed(self, data: bytes, now: float) -> List[str]:
+        """Nhận byte từ Pi, trả về các dòng Arduino in ra (readSerialCommands)."""
+        output: List[str] = []
+        for char in data.decode("latin-1"):
+            if char in "\r\n":
+                if self._buffer:
+                    output.extend(self.process_command(self._buffer, now))
+                    self._buffer = ""
+            else:
+                self._buffer += char
+                if len(self._buffer) > SERIAL_BUFFER_LIMIT:
+                    self._buffer = ""
+        return output
+
+    def process_command(self, cmd: str, now: float) -> List[str]:
+        """processCommand(): trim + toUpperCase rồi xử lý."""
+        cmd = cmd.strip().upper()
+        output: List[str] = []
+
+        if cmd.startswith("MODE:"):
+            mode = cmd[5:].strip()
+            if mode == "AUTO":
+                self.auto_control = True
+                output.append("OK:MODE=AUTO")
+            elif mode == "MANUAL":
+                self.auto_control = False
+                output.append("OK:MODE=MANUAL")
+        elif cmd.startswith("BARRIER:"):
+            state = cmd[8:].strip()
+            if state == "OPEN":
+                output.extend(self.open_barrier(now))
+                output.append("OK:BARRIER=OPEN")
+            elif state == "CLOSE":
+                output.extend(self.close_barrier())
+                output.append("OK:BARRIER=CLOSE")
+        elif cmd.startswith("SLOT:"):
+            colon = cmd.find(":", 5)
+            if colon > 0:
+                slot_index = _to_int(cmd[5:colon]) - 1
+                status = _to_int(cmd[colon + 1:])
+                if 0 <= slot_index < self.total_slots and status in (0, 1):
+                    self.slots[slot_index] = status
+                    output.append(f"OK:SLOT{slot_index + 1}={status}")
+        elif cmd.startswith("LCD:UPDATE:"):
+            content = cmd[11:]
+            pipe = content.find("|")
+            if pipe > 0:
+                self.lcd_lines = [content[:pipe], content[pipe + 1:]]
+                output.append("OK:LCD=UPDATED")
+        elif cmd == "PING":
+            output.append("OK:PONG")
+        return output
+
+    def open_barrier(self, now: float) -> List[str]:
+        if self.barrier_open:
+            return []
+        self.barrier_open = True
+        self.barrier_open_time = now
+        return ["INFO:Barrier opened"]
+
+    def close_barrier(self) -> List[str]:
+        if not self.barrier_open:
+            return []
+        self.barrier_open = False
+        self.button_hold_mode = False
+        self.barrier_open_time = 0.0
+        return ["INFO:Barrier closed"]
+
+    def press_button(self, now: float) -> List[str]:
+        """handleButtonPress() với một lần nhấn."""
+        if self.free_slots > 0:
+            output = self.open_barrier(now)
+            self.button_hold_mode = False
+            self.barrier_open_time = now
+            output.append("INFO:Button pressed - Opening barrier")
+            return output
+        return ["WARN:Button pressed but parking is FULL"]
+
+    def set_slot1(self, occupied: bool) -> List[str]:
+        """Giả lập cảm biến Slot 1 đổi trạng thái (sau bộ lọc ổn định)."""
+        value = 1 if occupied else 0
+        if self.slots[0] == value:
+            return []
+        self.slots[0] = value
+        return [f"INFO:Slot 1 status changed: {'OCCUPIED' if value else 'FREE'}"]
+
+    def tick(self, now: float) -> List[str]:
+        """handleBarrierAutoClose()."""
+        if (
+            self.barrier_open
+            and not self.button_hold_mode
+            and self.barrier_open_time > 0
+            and now - self.barrier_open_time >= BARRIER_AUTO_CLOSE_DELAY
+        ):
+            return self.close_barrier() + ["INFO:Barrier auto-closed after delay"]
+        return []
+
+    def led_status(self) -> str:
+        if self.system_error:
+            return "error"
+        if self.free_slots == 0:
+            return "red"
+        if self.barrier_open:
+            return "yellow_blink"
+        if self.free_slots == 1:
+            return "yellow"
+        return "green"
+
+    def frame(self) -> str:
+        """sendJSON(): cùng thứ tự field, không có khoảng trắng."""
+        return json.dumps(
+            {
+                "slots": self.slots,
+                "free_slots": self.free_slots,
+                "total_slots": self.total_slots,
+                "barrier": "open" if self.barrier_open else "closed",
+                "button_pressed": self.button_pressed,
+                "led_status": self.led_status(),
+                "mode": "auto" if self.auto_control else "manual",
+            },
+            separators=(",", ":"),
+        )
+
+
+def _to_int(text: str) -> int:
+    """Giống ``String.toInt()``: đọc số nguyên ở đầu chuỗi, lỗi => 0."""
+    text = text.strip()
+    digits = ""
+    for index, char in enumerate(text):
+        if char.isdigit() or (index == 0 and char in "+-"):
+            digits += char
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+class EmulatedDevice:
+    """Một Arduino ảo gắn với một cặp pty."""
+
+    def __init__(
+        self,
+        frame_interval: float = FRAME_INTERVAL,
+        noise: float = 0.0,
+        link: Optional[str] = None,
+        banner: bool = True,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.arduino = VirtualArduino()
+        self.frame_interval = frame_interval
+        self.noise = noise
+        self.link = link
+        self.banner = banner
+        self.stats = DeviceStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self.port: Optional[str] = None
+        self.next_frame = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._master is not None
+
+    def plug(self) -> None:
+        """Mở cặp pty mới (giống cắm cáp USB)."""
+        master, slave = os.openpty()
+        tty.setraw(slave)  # tắt echo/canonical trước khi client mở cổng
+        os.set_blocking(master, False)
+        self._master, self._slave = master, slave
+        self.port = os.ttyname(slave)
+        if self.link:
+            tmp = f"{self.link}.tmp"
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            os.symlink(self.port, tmp)
+            os.replace(tmp, self.link)
+        self.next_frame = time.monotonic() + self.frame_interval
+        if self.banner:
+            self._write_lines(list(BANNER))
+        logger.info("Arduino ảo sẵn sàng tại %s", self.link or self.port)
+
+    def unplug(self) -> None:
+        """Đóng pty (giống rút cáp): client sẽ gặp lỗi I/O và phải reconnect."""
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def fileno(self) -> int:
+        assert self._master is not None
+        return self._master
+
+    # ------------------------------------------------------------------
+    def set_slot1(self, occupied: bool) -> None:
+        with self._lock:
+            self._write_lines(self.arduino.set_slot1(occupied))
+
+    def press_button(self) -> None:
+        with self._lock:
+            self._write_lines(self.arduino.press_button(time.monotonic()))
+
+    def on_readable(self) -> None:
+        try:
+            data = os.read(self.fileno(), 4096)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            if exc.errno == errno.EIO:  # chưa có ai mở phía slave
+                return
+            raise
+        if not data:
+            return
+        with self._lock:
+            replies = self.arduino.feed(data, time.monotonic())
+            self.stats.commands_received += data.count(b"\n")
+            self.stats.replies_sent += sum(1 for line in replies if line.startswith("OK:"))
+            self._write_lines(replies)
+
+    def on_tick(self, now: float) -> None:
+        with self._lock:
+            self._write_lines(self.arduino.tick(now))
+            if now >= self.next_frame:
+                self._write_frame(self.arduino.frame())
+                self.next_frame += self.frame_interval
+                if self.next_frame < now:  # bị trễ nhiều => không dồn frame
+                    self.next_frame = now + self.frame_interval
+
+    # ------------------------------------------------------------------
+    def _write_frame(self, frame: str) -> None:
+        data = (frame + "\r\n").encode("ascii")
+        if self.noise and self._rng.random() < self.noise:
+            data = self._corrupt(data)
+            self.stats.noisy_frames += 1
+        if self._write(data):
+            self.stats.frames_sent += 1
+
+    def _write_lines(self, lines: List[str]) -> None:
+        if lines:
+            self._write("".join(line + "\r\n" for line in lines).encode("ascii", "replace"))
+
+    def _write(self, data: bytes) -> bool:
+        if self._master is None:
+            return False
+        try:
+            written = os.write(self._master, data)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EIO):
+                # Host không đọc kịp => mất dữ liệu như USB CDC thật
+                self.stats.bytes_dropped += len(data)
+                return False
+            raise
+        self.stats.bytes_sent += written
+        self.stats.bytes_dropped += len(data) - written
+        return written == len(data)
+
+    def _corrupt(self, data: bytes) -> bytes:
+        """Nhiễu đường truyền: lật byte, cắt dòng hoặc chèn rác ASCII."""
+        kind = self._rng.choice(("flip", "truncate", "garbage"))
+        body = bytearray(data[:-2])
+        if kind == "flip" and body:
+            index = self._rng.randrange(len(body))
+            body[index] = self._rng.choice(NOISE_ALPHABET)
+        elif kind == "truncate" and body:
+            del body[self._rng.randrange(len(body)):]
+        else:
+            garbage = bytes(self._rng.choice(NOISE_ALPHABET) for _ in range(self._rng.randint(1, 8)))
+            index = self._rng.randrange(len(body) + 1)
+            body[index:index] = garbage
+        return bytes(body) + b"\r\n"
+
+
+class ArduinoEmulator:
+    """Chạy nhiều Arduino ảo trên một thread với ``selectors``."""
+
+    def __init__(self) -> None:
+        self.devices: List[EmulatedDevice] = []
+        self._selector = selectors.DefaultSelector()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def add_device(self, **kwargs) -> EmulatedDevice:
+        device = EmulatedDevice(**kwargs)
+        device.plug()
+        with self._lock:
+            self.devices.append(device)
+            self._selector.register(device.fileno(), selectors.EVENT_READ, device)
+        return device
+
+    def unplug(self, device: EmulatedDevice) -> None:
+        with self._lock:
+            if device.connected:
+                self._selector.unregister(device.fileno())
+            device.unplug()
+
+    def replug(self, device: EmulatedDevice) -> None:
+        with self._lock:
+            device.plug()
+            self._selector.register(device.fileno(), selectors.EVENT_READ, device)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        with self._lock:
+            for device in self.devices:
+                if device.connected:
+                    self._selector.unregister(device.fileno())
+                device.unplug()
+                if device.link and os.path.islink(device.link):
+                    os.unlink(device.link)
+            self.devices.clear()
+
+    def stats(self) -> Dict[str, dict]:
+        return {device.link or device.port: device.stats.to_dict() for device in self.devices}
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            with self._lock:
+                devices = [d for d in self.devices if d.connected]
+            now = time.monotonic()
+            deadline = min((d.next_frame for d in devices), default=now + 0.1)
+            timeout = max(0.0, min(deadline - now, 0.1))
+            for key, _ in self._selector.select(timeout):
+                device: EmulatedDevice = key.data
+                if device.connected:
+                    device.on_readable()
+            now = time.monotonic()
+            for device in devices:
+                if device.connected:
+                    device.on_tick(now)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Giả lập Arduino Smart Parking qua pty")
+    parser.add_argument("--devices", type=int, default=1, help="Số Arduino ảo")
+    parser.add_argument("--interval", type=float, default=FRAME_INTERVAL, help="Chu kỳ gửi frame (giây)")
+    parser.add_argument("--noise", type=float, default=0.0, help="Xác suất một frame bị nhiễu (0-1)")
+    parser.add_argument("--link", help="Tạo symlink cố định, ví dụ /tmp/ttyVARDUINO (thêm số thứ tự nếu nhiều thiết bị)")
+    parser.add_argument("--toggle-slot1", type=float, default=0.0,
+                        help="Đảo trạng thái Slot 1 mỗi N giây để sinh session (0 = tắt)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    emulator = ArduinoEmulator()
+    for index in range(args.devices):
+        link = None
+        if args.link:
+            link = args.link if args.devices == 1 else f"{args.link}{index}"
+        device = emulator.add_device(frame_interval=args.interval, noise=args.noise, link=link)
+        print(f"Thiết bị {index}: {device.port}" + (f" -> {link}" if link else ""), flush=True)
+    emulator.start()
+
+    try:
+        last_toggle = time.monotonic()
+        while True:
+            time.sleep(1.0)
+            if args.toggle_slot1 and time.monotonic() - last_toggle >= args.toggle_slot1:
+                last_toggle = time.monotonic()
+                for device in emulator.devices:
+                    device.set_slot1(not device.arduino.slots[0])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(emulator.stats(), indent=2))
+        emulator.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
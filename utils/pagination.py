@@ -0,0 +1,91 @@
+"""Phân trang keyset (con trỏ) cho các API danh sách.
+
+Trang sau được lọc bằng ``(sort_key, id) < (giá trị của dòng cuối trang trước)``
+thay vì OFFSET, nên chi phí mỗi trang chỉ phụ thuộc kích thước trang (khi có
+index phù hợp), không phụ thuộc trang sâu tới đâu. Con trỏ gửi cho client là
+chuỗi base64 mờ (opaque), client chỉ việc gửi lại nguyên văn.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Con trỏ không giải mã được hoặc không khớp kiểu sắp xếp."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> Tuple[Any, ...]:
+    """Giải mã con trỏ gồm ``size`` giá trị; lỗi => ``InvalidCursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor("cursor không hợp lệ") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("cursor không hợp lệ")
+    try:
+        return tuple(_decode_value(v) for v in values)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor("cursor không hợp lệ") from exc
+
+
+def page_size(value: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Kích thước trang hợp lệ trong [1, MAX_PAGE_SIZE]."""
+    if value is None:
+        return default
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def keyset_page(stmt: Select, columns: Sequence, cursor: Optional[str], limit: int) -> Select:
+    """Thêm điều kiện con trỏ + ORDER BY ... DESC + LIMIT cho ``stmt`` (mới nhất trước).
+
+    ``columns`` là khóa sắp xếp, cột cuối phải duy nhất (thường là id).
+    Trả về câu lệnh đã giới hạn ``limit + 1`` dòng để biết còn trang sau hay không.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        # (a, b) < (x, y) viết dạng a <= x AND (a < x OR b < y) để index trên a dùng được
+        first, *rest = columns
+        tie = [first == values[0]]
+        branches = [first < values[0]]
+        for column, value in zip(rest, values[1:]):
+            branches.append(and_(*tie, column < value))
+            tie.append(column == value)
+        stmt = stmt.where(first <= values[0], or_(*branches))
+    return stmt.order_by(*(column.desc() for column in columns)).limit(limit + 1)
+
+
+def split_page(rows: List[Any], limit: int, key) -> Tuple[List[Any], Optional[str]]:
+    """Cắt ``rows`` (đã lấy ``limit + 1``) thành trang và con trỏ trang sau (None nếu hết)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
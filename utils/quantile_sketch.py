@@ -0,0 +1,162 @@
+"""Quantile sketch gộp được (kiểu DDSketch) cho số liệu dương như thời gian đỗ.
+
+Giá trị được đếm vào các bucket logarit ``ceil(log_gamma(x))`` nên mọi
+percentile trả về có sai số tương đối <= ``relative_accuracy``. Hai sketch
+cùng độ chính xác gộp bằng cách cộng số đếm theo bucket (gộp giờ -> ngày,
+slot -> toàn bãi), kết quả giống hệt sketch dựng từ toàn bộ dữ liệu. Số bucket
+bị chặn bởi ``max_bins`` (gộp các bucket nhỏ nhất) nên bộ nhớ là hằng số.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+MIN_POSITIVE = 1e-9
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BdHQQddd")  # version, accuracy, bins, zero_count, count, min, max, sum
+_BIN = struct.Struct("<iI")
+
+
+class QuantileSketch:
+    """Sketch percentile với sai số tương đối cố định."""
+
+    __slots__ = ("relative_accuracy", "max_bins", "_gamma", "_log_gamma", "bins", "zero_count", "count", "min", "max", "sum")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_bins: int = DEFAULT_MAX_BINS) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy phải trong khoảng (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    # ------------------------------------------------------------------
+    # Cập nhật
+    # ------------------------------------------------------------------
+    def add(self, value: float, weight: int = 1) -> None:
+        if weight <= 0:
+            return
+        if value < MIN_POSITIVE:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Cộng ``other`` vào sketch này (cùng ``relative_accuracy``)."""
+        if other.count == 0:
+            return
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Không thể gộp sketch khác độ chính xác")
+        for key, weight in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + weight
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self) -> None:
+        # Dồn các bucket nhỏ nhất vào một bucket: chỉ mất chính xác ở đuôi thấp
+        keys = sorted(self.bins)
+        excess = keys[: len(keys) - self.max_bins + 1]
+        target = excess[-1]
+        self.bins[target] = sum(self.bins.pop(k) for k in excess[:-1]) + self.bins[target]
+
+    # ------------------------------------------------------------------
+    # Truy vấn
+    # ------------------------------------------------------------------
+    def quantile(self, q: float) -> Optional[float]:
+        """Giá trị tại percentile ``q`` (0..1); None nếu sketch rỗng."""
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("q phải trong khoảng [0, 1]")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def summary(self, percentiles=(50, 90, 99), digits: int = 1) -> dict:
+        """Dict gọn cho API: count, min, max, mean và các percentile."""
+        result = {
+            "count": self.count,
+            "min": round(self.min, digits) if self.count else None,
+            "max": round(self.max, digits) if self.count else None,
+            "mean": round(self.mean, digits) if self.count else None,
+        }
+        for p in percentiles:
+            value = self.quantile(p / 100)
+            result[f"p{p}"] = round(value, digits) if value is not None else None
+        return result
+
+    # ------------------------------------------------------------------
+    # Lưu trữ
+    # ------------------------------------------------------------------
+    def to_bytes(self) -> bytes:
+        """Dạng nhị phân gọn (vài trăm byte) để lưu vào DB."""
+        header = _HEADER.pack(
+            _FORMAT_VERSION,
+            self.relative_accuracy,
+            len(self.bins),
+            self.zero_count,
+            self.count,
+            self.min if self.count else 0.0,
+            self.max if self.count else 0.0,
+            self.sum,
+        )
+        return header + b"".join(_BIN.pack(k, v) for k, v in sorted(self.bins.items()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_bins: int = DEFAULT_MAX_BINS) -> "QuantileSketch":
+        version, accuracy, bins, zero_count, count, low, high, total = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Không hỗ trợ sketch version {version}")
+        sketch = cls(accuracy, max_bins)
+        offset = _HEADER.size
+        for _ in range(bins):
+            key, weight = _BIN.unpack_from(data, offset)
+            sketch.bins[key] = weight
+            offset += _BIN.size
+        sketch.zero_count = zero_count
+        sketch.count = count
+        sketch.sum = total
+        if count:
+            sketch.min, sketch.max = low, high
+        return sketch
+
+    def __repr__(self) -> str:
+        return f"<QuantileSketch n={self.count} bins={len(self.bins)}>"
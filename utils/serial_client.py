@@ -65,6 +65,10 @@ class SerialJSONClient:
         if self._thread:
             self._thread.join(timeout=2.0)
         if self._serial:
+            try:
+                self._serial.flush()  # Gửi hết command còn trong buffer trước khi nhả cổng
+            except Exception:
+                pass
             self._serial.close()
 
     def send_command(self, command: str, retry: int = 2) -> bool:
@@ -78,28 +82,35 @@ class SerialJSONClient:
         Returns:
             True nếu gửi thành công, False nếu lỗi
         """
+        return self.send_commands([command], retry=retry)
+
+    def send_commands(self, commands: List[str], retry: int = 2) -> bool:
+        """Gửi nhiều command trong một lần write + flush (mỗi command một dòng)."""
+        if not commands:
+            return True
+        label = " | ".join(commands)
         if self.simulate:
-            logger.debug("Simulation mode: Command '%s' ignored", command)
+            logger.debug("Simulation mode: Command '%s' ignored", label)
             return True
 
         if not self._serial or not self._serial.is_open:
-            logger.warning("Serial chưa kết nối, không thể gửi command: %s", command)
+            logger.warning("Serial chưa kết nối, không thể gửi command: %s", label)
             return False
 
+        cmd_bytes = "".join(command + "\n" for command in commands).encode("utf-8")
         for attempt in range(retry + 1):
             try:
-                cmd_bytes = (command + "\n").encode("utf-8")
                 self._serial.write(cmd_bytes)
                 self._serial.flush()  # Đảm bảo data được gửi ngay
-                logger.debug("Đã gửi command xuống Arduino: %s (attempt %d)", command, attempt + 1)
+                logger.debug("Đã gửi command xuống Arduino: %s (attempt %d)", label, attempt + 1)
                 return True
             except Exception as exc:
                 if attempt < retry:
                     logger.warning("Lỗi khi gửi command '%s' (attempt %d/%d): %s. Retrying...", 
-                                 command, attempt + 1, retry + 1, exc)
+                                 label, attempt + 1, retry + 1, exc)
                     time.sleep(0.1)
                 else:
-                    logger.error("Lỗi khi gửi command '%s' sau %d lần thử: %s", command, retry + 1, exc)
+                    logger.error("Lỗi khi gửi command '%s' sau %d lần thử: %s", label, retry + 1, exc)
                     return False
         
         return False
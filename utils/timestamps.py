@@ -0,0 +1,16 @@
+"""Đọc tham số thời gian (query string, body JSON, CLI) theo ISO 8601."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Optional
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Đọc chuỗi ISO 8601 thành datetime UTC không kèm tzinfo (như cột ``entry_time``)."""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(UTC).replace(tzinfo=None)
+    return moment
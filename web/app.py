@@ -7,10 +7,11 @@ import os
 from flask import Flask, jsonify, request
 from flask_login import LoginManager
 
+from auth.principal import UserPrincipal, principal_cache
 from config import ParkingConfig, WebConfig
+from core.rpc import RpcError, RpcUnavailable
 from core.state_manager import StateManager
 from database.db import db, init_db
-from database.models import User
 
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
@@ -19,9 +20,12 @@ login_manager.login_message_category = "info"
 
 
 @login_manager.user_loader
-def load_user(user_id: str) -> User | None:
-    """Load user for Flask-Login."""
-    return User.query.get(int(user_id))
+def load_user(user_id: str) -> UserPrincipal | None:
+    """Load user for Flask-Login (principal gọn, cache TTL + LRU - xem auth/principal.py)."""
+    try:
+        return principal_cache.get(int(user_id))
+    except ValueError:
+        return None
 
 
 def create_app(state_manager: StateManager, controller=None) -> Flask:
@@ -39,6 +43,22 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
     init_db(app)
     login_manager.init_app(app)
 
+    # Worker web gửi lệnh tới process controller qua RPC (core/rpc.py)
+    @app.errorhandler(RpcUnavailable)
+    def _controller_unavailable(exc: RpcUnavailable):
+        return jsonify({"error": "Controller not available", "detail": str(exc)}), 503
+
+    @app.errorhandler(RpcError)
+    def _controller_error(exc: RpcError):
+        return jsonify({"error": str(exc)}), 500
+
+    from core.statistics import statistics
+    from database.event_store import init_event_store
+
+    with app.app_context():
+        statistics.ensure_initialized()
+    init_event_store(app)
+
     # Register blueprints
     from auth import auth_bp
     from web.main_routes import init_main_routes
@@ -50,10 +70,21 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
     # LEGACY API ENDPOINTS (for backward compatibility)
     # ============================================
 
+    from web.http_cache import conditional_json, state_parts
+
     @app.get("/status")
     def status():
         """Legacy status endpoint (public for now, can be protected later)."""
-        return jsonify(state_manager.snapshot())
+        return conditional_json("status", state_parts(state_manager), state_manager.snapshot, "public, max-age=1")
+
+    from web.availability import AvailabilityFeed
+
+    availability = AvailabilityFeed(state_manager)
+
+    @app.get("/api/public/availability")
+    def public_availability():
+        """Số chỗ trống theo bãi/khu cho kiosk, bảng hiển thị (không cần đăng nhập)."""
+        return availability.response()
 
     @app.post("/api/gate")
     def manual_gate():
@@ -106,6 +137,9 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
     @app.get("/api/health")
     def health_check():
         """Health check endpoint."""
+        return conditional_json("health", state_parts(state_manager), _health, "no-cache")
+
+    def _health() -> dict:
         snapshot = state_manager.snapshot()
         last_update = state_manager.last_update()
 
@@ -116,7 +150,7 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
 
         is_healthy = time_since_update < 10
 
-        return jsonify({
+        return {
             "status": "healthy" if is_healthy else "degraded",
             "last_update": last_update.isoformat(),
             "seconds_since_update": round(time_since_update, 2),
@@ -126,17 +160,20 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
                 "occupied": ParkingConfig.TOTAL_SLOTS - snapshot.get("free", 0),
             },
             "gate": snapshot.get("gate", "unknown"),
-        })
+        }
 
     @app.get("/api/stats")
     def get_stats():
         """Thống kê hệ thống."""
+        return conditional_json("stats", state_parts(state_manager), _stats, "public, max-age=1")
+
+    def _stats() -> dict:
         snapshot = state_manager.snapshot()
         total = ParkingConfig.TOTAL_SLOTS
         free = snapshot.get("free", 0)
         occupied = total - free
 
-        return jsonify({
+        return {
             "total_slots": total,
             "free_slots": free,
             "occupied_slots": occupied,
@@ -144,6 +181,6 @@ def create_app(state_manager: StateManager, controller=None) -> Flask:
             "gate_status": snapshot.get("gate", "unknown"),
             "last_update": snapshot.get("last_update"),
             "has_errors": len(snapshot.get("errors", [])) > 0,
-        })
+        }
 
     return app
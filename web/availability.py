@@ -0,0 +1,107 @@
+"""Feed chỗ trống công khai cho bảng hiển thị, app di động, kiosk.
+
+Các client này chỉ cần "còn bao nhiêu chỗ / tổng bao nhiêu" theo bãi và khu,
+nhưng số lượng lớn và không đăng nhập. ``/status`` dựng lại snapshot + JSON
+cho từng request; ở đây body được dựng sẵn:
+
+- bốn biến thể (đầy đủ / gọn, thường / gzip) được serialize và nén một lần
+  khi số chỗ trống đổi, không phải mỗi khi state đổi (gate, LED, heartbeat
+  Arduino không làm dựng lại)
+- mỗi request chỉ so ``state_manager.version`` với lần trước rồi trả bytes có
+  sẵn; version đổi mà số chỗ không đổi => chỉ tốn một snapshot
+- ETag và body chỉ phụ thuộc số chỗ trống (không có thời điểm dựng), nên
+  mọi worker trả cùng bytes + ETag; ``If-None-Match`` khớp => 304
+
+Biến thể gọn (``?compact=1``): ``{"f":2,"t":3,"z":{"A":[2,3]}}``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import Response, current_app, request
+
+from config import ParkingConfig
+from web.http_cache import make_etag, not_modified
+
+CACHE_CONTROL = "public, max-age=1"
+
+# (compact, gzip) -> (etag, body)
+Variants = Dict[Tuple[bool, bool], Tuple[str, bytes]]
+
+
+class AvailabilityFeed:
+    """Giữ body dựng sẵn của feed chỗ trống, dựng lại khi số chỗ trống đổi."""
+
+    def __init__(self, state_manager, lot_name: str = ParkingConfig.LOT_NAME, zones: Optional[Dict] = None) -> None:
+        self.state_manager = state_manager
+        self.lot_name = lot_name
+        self.zones = ParkingConfig.ZONES if zones is None else zones
+        self.regenerations = 0
+        self._lock = threading.Lock()
+        self._seen_version: Optional[int] = None
+        self._key: Optional[tuple] = None
+        self._variants: Variants = {}
+
+    def _key_for(self, state: Dict) -> tuple:
+        slots = state.get("slots") or []
+        zones = []
+        for zone_id, indexes in self.zones.items():
+            members = [slots[i] for i in indexes if 0 <= i < len(slots)]
+            zones.append((zone_id, len(members) - sum(members), len(members)))
+        return state.get("free", 0), state.get("total_slots", len(slots)), tuple(zones)
+
+    def _build(self, key: tuple) -> Variants:
+        free, total, zones = key
+        full = {
+            "lot": self.lot_name,
+            "free": free,
+            "total": total,
+            "zones": [{"id": zone_id, "free": zfree, "total": ztotal} for zone_id, zfree, ztotal in zones],
+        }
+        compact = {"f": free, "t": total, "z": {zone_id: [zfree, ztotal] for zone_id, zfree, ztotal in zones}}
+        variants: Variants = {}
+        for is_compact, payload in ((False, full), (True, compact)):
+            body = json.dumps(payload, separators=(",", ":")).encode()
+            # mtime=0: cùng nội dung => cùng bytes gzip (ETag strong)
+            variants[(is_compact, False)] = (make_etag("availability", (*key, is_compact)), body)
+            variants[(is_compact, True)] = (
+                make_etag("availability", (*key, is_compact, "gzip")),
+                gzip.compress(body, compresslevel=9, mtime=0),
+            )
+        self.regenerations += 1
+        return variants
+
+    def current(self) -> Variants:
+        """Các biến thể ứng với state hiện tại (dựng lại nếu số chỗ trống đổi)."""
+        # Đọc version trước snapshot: body không bao giờ cũ hơn version đã ghi nhận
+        version = self.state_manager.version
+        if version != self._seen_version:
+            with self._lock:
+                if version != self._seen_version:
+                    key = self._key_for(self.state_manager.snapshot())
+                    if key != self._key:
+                        self._variants = self._build(key)
+                        self._key = key
+                    self._seen_version = version
+        return self._variants
+
+    def response(self) -> Response:
+        compact = request.args.get("compact", "").lower() in ("1", "true", "yes")
+        use_gzip = request.accept_encodings["gzip"] > 0
+        etag, body = self.current()[(compact, use_gzip)]
+        if request.if_none_match.contains_weak(etag):
+            response = not_modified(etag, CACHE_CONTROL)
+        else:
+            response = current_app.response_class(body, mimetype="application/json")
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            if use_gzip:
+                response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        # Trang kiosk/bảng hiển thị có thể nằm ở origin khác
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        return response
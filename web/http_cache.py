@@ -0,0 +1,94 @@
+"""ETag/conditional GET cho các endpoint được poll liên tục.
+
+Mỗi endpoint khai báo một tuple "version" rẻ (version state, version thống kê,
+version bảng giá...). ETag là hash của tuple đó, tính *trước* khi dựng body:
+
+- ``If-None-Match`` khớp => 304 ngay, không snapshot/query/serialize gì
+- không khớp => body được dựng một lần cho mỗi ETag và giữ lại (một mục mỗi
+  endpoint), nên cùng ETag luôn là cùng bytes (ETag strong hợp lệ) và các
+  client không gửi ``If-None-Match`` cũng dùng lại body đã serialize
+
+Version lấy trước khi dựng body, nên body không bao giờ cũ hơn ETag; tệ nhất
+client nhận lại body mới thêm một lần.
+
+ETag chỉ phụ thuộc dữ liệu dùng chung giữa các process (``boot_id`` và version
+của process controller, bộ đếm trong DB), nên các worker pre-fork cùng socket
+trả cùng ETag cho cùng dữ liệu và ``If-None-Match`` khớp dù request rơi vào
+worker nào.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from datetime import UTC, datetime
+from typing import Callable, Dict, Iterable, Tuple
+
+from flask import Response, current_app, request
+
+from config import WebConfig
+from core.statistics import statistics
+
+_bodies: Dict[str, Tuple[str, bytes]] = {}
+_lock = threading.Lock()
+
+
+def state_parts(state_manager) -> tuple:
+    """Lần chạy + version của state + số khoảng ``STREAM_TOUCH_INTERVAL`` từ lần cập nhật cuối.
+
+    ``boot_id`` tránh ETag cũ khớp nhầm sau khi controller khởi động lại
+    (version bắt đầu lại từ 0). Phần cuối làm ETag đổi dần khi Arduino im
+    lặng, để các field như ``seconds_since_update`` không bị giữ nguyên mãi.
+    """
+    age = (datetime.now(UTC) - state_manager.last_update()).total_seconds()
+    return state_manager.boot_id, state_manager.version, int(age // WebConfig.STREAM_TOUCH_INTERVAL)
+
+
+def statistics_parts() -> tuple:
+    """Giá trị các bộ đếm (từ cache, nạp lại từ DB định kỳ): giống nhau ở mọi process."""
+    return tuple(statistics.get_statistics().values())
+
+
+def make_etag(name: str, parts: Iterable) -> str:
+    """ETag (không có dấu ngoặc kép) cho endpoint ``name`` ở các version ``parts``."""
+    raw = "|".join([name, *map(str, parts)])
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def conditional_json(name: str, parts: Iterable, build: Callable[[], object], cache_control: str = "no-cache") -> Response:
+    """Trả JSON của ``build()`` với ETag theo ``parts``; 304 nếu client đã có.
+
+    ``build`` chỉ được gọi khi ETag đổi so với lần dựng trước. Kiểm tra quyền
+    phải làm trước khi gọi hàm này.
+    """
+    etag = make_etag(name, parts)
+    # So sánh weak theo RFC 9110 cho If-None-Match (proxy nén có thể thêm W/)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag, cache_control)
+
+    with _lock:
+        cached = _bodies.get(name)
+    if cached is not None and cached[0] == etag:
+        body = cached[1]
+    else:
+        body = current_app.json.dumps(build()).encode() + b"\n"
+        with _lock:
+            _bodies[name] = (etag, body)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def clear() -> None:
+    """Bỏ mọi body đã lưu (test)."""
+    with _lock:
+        _bodies.clear()
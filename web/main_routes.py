@@ -2,24 +2,174 @@
 
 from __future__ import annotations
 
-from datetime import UTC, datetime
+import json
+import threading
+import time
+from datetime import UTC, datetime, timedelta
 
-from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask import (
+    Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, stream_with_context, url_for,
+)
 from flask_login import current_user, login_required
 
-from config import OperationMode, ParkingConfig
+from config import OperationMode, ParkingConfig, WebConfig
+from core import dwell_sketches, exports, rollups
 from core.mode_manager import ModeManager
 from core.parking_service import ParkingService
+from core.pricing_engine import pricing_engine
+from core.pricing_simulator import DEFAULT_HISTOGRAM_BINS, run_simulation
+from core.repricing import repricing_runner
 from core.state_manager import StateManager
+from core.statistics import statistics
 from database.db import db
-from database.models import SystemLog
+from database.event_store import event_store
+from database.storage import reader_for, storage_maintenance
+from database.models import as_utc
+from database.repositories import (
+    LogRepository,
+    PricingRuleRepository,
+    SessionRepository,
+    SessionRow,
+    UserRepository,
+)
+from utils.pagination import page_size
+from utils.timestamps import parse_timestamp
+from web.http_cache import conditional_json, state_parts, statistics_parts
 
 main_bp = Blueprint("main", __name__)
 
 
+def _session_json(row: SessionRow, now: datetime, with_user: bool = False) -> dict:
+    data = {
+        "id": row.id,
+        "slot_id": row.slot_id,
+        "vehicle_plate": row.vehicle_plate,
+        "entry_time": row.entry_time.isoformat() if row.entry_time else None,
+        "exit_time": row.exit_time.isoformat() if row.exit_time else None,
+        "duration_minutes": row.duration_minutes,
+        "status": row.status,
+        "fee_amount": ParkingService.estimate_fee(row, now),
+    }
+    if with_user:
+        data["user"] = row.username
+    return data
+
+
+# Các phần của /api/status theo thứ tự ghép; chỉ phần được chọn mới được tính
+STATUS_SECTIONS = ("state", "stats", "mode", "arduino")
+STATUS_PROFILES = {
+    "full": STATUS_SECTIONS,
+    "live": ("state", "mode", "arduino"),  # không truy vấn DB
+    "slots": ("state",),
+}
+
+
+def _status_sections(args) -> tuple:
+    """Đọc ``fields=state,mode`` hoặc ``profile=live`` (mặc định ``full``).
+
+    ValueError nếu có tên không hợp lệ.
+    """
+    fields = args.get("fields")
+    if fields:
+        wanted = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = wanted.difference(STATUS_SECTIONS)
+        if unknown:
+            raise ValueError(f"fields không hợp lệ: {', '.join(sorted(unknown))} (chọn trong {', '.join(STATUS_SECTIONS)})")
+        return tuple(name for name in STATUS_SECTIONS if name in wanted)
+    profile = args.get("profile", "full")
+    if profile not in STATUS_PROFILES:
+        raise ValueError(f"profile không hợp lệ: {profile} (chọn trong {', '.join(STATUS_PROFILES)})")
+    return STATUS_PROFILES[profile]
+
+
+def _slot_index(slot_id):
+    """slot_id 1-based từ JSON => index 0-based; giá trị khác giữ nguyên để báo lỗi.
+
+    ``bool`` là lớp con của ``int``: ``true`` không được thành Slot 1.
+    """
+    if isinstance(slot_id, int) and not isinstance(slot_id, bool):
+        return slot_id - 1
+    return slot_id
+
+
+def _arduino_status(serial_client, now: float) -> dict:
+    last_received = serial_client.get_last_received_time()
+    if not last_received:
+        return {'arduino_connected': False, 'arduino_last_update': None, 'arduino_update_age': None}
+    return {
+        'arduino_connected': serial_client.is_connected(),
+        'arduino_last_update': datetime.fromtimestamp(last_received, UTC).isoformat(),
+        'arduino_update_age': round(now - last_received, 1),  # seconds
+    }
+
+
+def _arduino_parts(serial_client, now: float) -> tuple:
+    """Phần ETag của ``arduino``: ``arduino_update_age`` tăng theo giờ hiện tại
+    nên ETag đổi mỗi ``STREAM_TOUCH_INTERVAL`` giây dù Arduino im lặng."""
+    return (
+        serial_client.is_connected(),
+        serial_client.get_last_received_time(),
+        int(now // WebConfig.STREAM_TOUCH_INTERVAL),
+    )
+
+
+# Server đang drain (web/server.py): kết thúc các stream SSE để request không
+# treo tới hết hạn; trình duyệt tự nối lại (sang process khác hoặc sau restart)
+_streams_closing = threading.Event()
+_stream_sources: list = []
+
+
+def close_streams() -> None:
+    _streams_closing.set()
+    for source in _stream_sources:
+        source.notify()
+
+
+def _sse(event: str, version: int, data: dict) -> str:
+    """Một sự kiện SSE; ``id`` là version để client nối lại bằng ``Last-Event-ID``."""
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
 def init_main_routes(app, state_manager: StateManager, controller=None):
     """Initialize main routes with app, state_manager, and controller."""
 
+    # Thống kê/chế độ/kết nối Arduino không nằm trong ParkingState: đồng bộ vào
+    # luồng của state_manager khi có người xem thức dậy. Thống kê chỉ đọc lại
+    # khi ``statistics.version`` đổi (một lần cho mọi viewer).
+    live_lock = threading.Lock()
+    live_synced = {"statistics": None, "arduino": None}
+    statistics.add_listener(state_manager.notify)
+    _stream_sources.append(state_manager)
+
+    def _sync_live_fields() -> None:
+        if state_manager.read_only:
+            return  # worker web: process controller đã ghi sẵn vào shared memory
+        with live_lock:
+            fields = {}
+            stats_version = statistics.version
+            if stats_version != live_synced["statistics"]:
+                fields.update(ParkingService.get_statistics())
+                live_synced["statistics"] = stats_version
+            if controller and hasattr(controller, "mode_manager"):
+                fields.update(controller.mode_manager.get_mode_info())
+            if controller and hasattr(controller, "serial_client"):
+                serial_client = controller.serial_client
+                fields["arduino_connected"] = serial_client.is_connected()
+                # Tuổi dữ liệu do trình duyệt tự tính từ lần nhận cuối. Arduino gửi
+                # liên tục => chỉ phát lại khi đã tiến nửa STREAM_TOUCH_INTERVAL,
+                # không tạo delta (và đánh thức mọi viewer) cho từng gói
+                last_received = serial_client.get_last_received_time()
+                published = live_synced["arduino"]
+                if last_received and (
+                    published is None or last_received - published >= WebConfig.STREAM_TOUCH_INTERVAL / 2
+                ):
+                    fields["arduino_last_update"] = datetime.fromtimestamp(last_received, UTC).isoformat()
+                    live_synced["arduino"] = last_received
+            state_manager.publish(fields)
+
+    # main.py dùng lại để ghi field phụ vào shared memory cho worker web
+    app.extensions["parking_live_sync"] = _sync_live_fields
+
     @main_bp.route("/")
     def index():
         """Redirect to dashboard or login."""
@@ -35,80 +185,141 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             return render_template("admin/dashboard.html", total_slots=ParkingConfig.TOTAL_SLOTS)
         return render_template("client/dashboard.html", total_slots=ParkingConfig.TOTAL_SLOTS)
 
+    def _status_mode() -> dict:
+        if controller and hasattr(controller, 'mode_manager'):
+            return controller.mode_manager.get_mode_info()
+        return {}
+
+    def _status_arduino() -> dict:
+        if not (controller and hasattr(controller, 'serial_client')):
+            return {}
+        return _arduino_status(controller.serial_client, time.time())
+
+    status_builders = {
+        "state": state_manager.snapshot,
+        "stats": lambda: ParkingService.get_statistics(),  # tra theo tên lúc gọi (test patch được)
+        "mode": _status_mode,
+        "arduino": _status_arduino,
+    }
+
+    def _status(sections: tuple = STATUS_SECTIONS) -> dict:
+        data: dict = {}
+        for name in sections:
+            data.update(status_builders[name]())
+        return data
+
     @main_bp.route("/api/status")
     @login_required
     def api_status():
-        """Get parking status (protected)."""
-        snapshot = state_manager.snapshot()
-        stats = ParkingService.get_statistics()
-        snapshot.update(stats)
-        
-        # Thêm thông tin chế độ
-        if controller and hasattr(controller, 'mode_manager'):
-            mode_info = controller.mode_manager.get_mode_info()
-            snapshot.update(mode_info)
-        
-        # Thêm thông tin kết nối Arduino
-        if controller and hasattr(controller, 'serial_client'):
-            serial_client = controller.serial_client
-            snapshot['arduino_connected'] = serial_client.is_connected()
-            last_received = serial_client.get_last_received_time()
-            if last_received:
-                from datetime import UTC, datetime
-                import time
-                time_since = time.time() - last_received
-                snapshot['arduino_last_update'] = datetime.now(UTC).isoformat()
-                snapshot['arduino_update_age'] = round(time_since, 1)  # seconds
-            else:
-                snapshot['arduino_connected'] = False
-                snapshot['arduino_last_update'] = None
-                snapshot['arduino_update_age'] = None
-        
-        return jsonify(snapshot)
+        """Get parking status (protected).
+
+        ``?fields=state,arduino`` hoặc ``?profile=live|slots|full`` chỉ tính
+        các phần cần (``stats`` là phần duy nhất truy vấn DB). ETag theo
+        version của các phần được chọn: poll khi không có gì đổi nhận 304 mà
+        không dựng lại snapshot.
+        """
+        try:
+            sections = _status_sections(request.args)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        parts: tuple = ()
+        if "state" in sections or "mode" in sections:
+            parts += state_parts(state_manager)
+        if "stats" in sections:
+            parts += statistics_parts()
+        if "arduino" in sections and controller and hasattr(controller, 'serial_client'):
+            parts += _arduino_parts(controller.serial_client, time.time())
+        return conditional_json(
+            "api-status:" + ",".join(sections), parts, lambda: _status(sections), "private, no-cache",
+        )
+
+    @main_bp.route("/api/stream")
+    @login_required
+    def api_stream():
+        """Server-Sent Events: snapshot lúc đầu, sau đó chỉ delta khi có thay đổi.
+
+        ``id`` mỗi sự kiện là version của state; khi nối lại trình duyệt gửi
+        ``Last-Event-ID`` và chỉ nhận phần còn thiếu (snapshot mới nếu đã quá
+        xa). Không có gì đổi thì gửi comment heartbeat mỗi
+        ``WebConfig.STREAM_HEARTBEAT`` giây để giữ kết nối qua proxy.
+        """
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        try:
+            since = int(last_event_id) if last_event_id else None
+        except ValueError:
+            since = None
+
+        def next_event(version):
+            """(version mới, chuỗi SSE hoặc None nếu chưa có gì mới)."""
+            if version is not None:
+                current, delta = state_manager.changes_since(version)
+                if delta is not None:
+                    return current, _sse("delta", current, delta) if delta else None
+            current, data = state_manager.live_snapshot()
+            # Để trình duyệt bù lệch đồng hồ khi tính tuổi arduino_last_update
+            data["server_time"] = round(time.time(), 3)
+            return current, _sse("snapshot", current, data)
+
+        @stream_with_context
+        def events():
+            yield f"retry: {WebConfig.STREAM_RETRY_MS}\n\n"
+            _sync_live_fields()
+            version, chunk = next_event(since)
+            if chunk:
+                yield chunk
+            started = last_sent = time.monotonic()
+            while not _streams_closing.is_set() and time.monotonic() - started < WebConfig.STREAM_MAX_AGE:
+                remaining = WebConfig.STREAM_HEARTBEAT - (time.monotonic() - last_sent)
+                if remaining > 0:
+                    state_manager.wait(version, timeout=remaining)
+                    _sync_live_fields()
+                    version, chunk = next_event(version)
+                else:
+                    chunk = ": heartbeat\n\n"
+                if chunk:
+                    yield chunk
+                    last_sent = time.monotonic()
+
+        return Response(events(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
 
     @main_bp.route("/api/my-sessions")
     @login_required
     def api_my_sessions():
         """Get current user's parking sessions."""
-        sessions = ParkingService.get_user_sessions(current_user.id, limit=20)
-        return jsonify({
-            "sessions": [
-                {
-                    "id": s.id,
-                    "slot_id": s.slot_id,
-                    "vehicle_plate": s.vehicle_plate,
-                    "entry_time": s.entry_time.isoformat() if s.entry_time else None,
-                    "exit_time": s.exit_time.isoformat() if s.exit_time else None,
-                    "duration_minutes": s.duration_minutes,
-                    "status": s.status,
-                }
-                for s in sessions
-            ]
-        })
+        sessions = SessionRepository.for_user(current_user.id, limit=20)
+        now = datetime.now(UTC)
+        return jsonify({"sessions": [_session_json(s, now) for s in sessions]})
 
     @main_bp.route("/api/history")
     @login_required
     def api_history():
-        """Get parking history (admin only or own sessions)."""
-        if current_user.is_admin():
-            sessions = ParkingService.get_session_history(limit=100)
-        else:
-            sessions = ParkingService.get_user_sessions(current_user.id, limit=50)
+        """Get parking history (admin: toàn bãi, client: của mình), phân trang keyset.
 
+        Query: cursor, limit, slot_id, user_id (admin), status, payment_status,
+        from, to (ISO, theo giờ vào). Trang sau: gửi lại ``next_cursor``.
+        """
+        is_admin = current_user.is_admin()
+        try:
+            sessions, next_cursor = SessionRepository.page(
+                cursor=request.args.get("cursor"),
+                limit=page_size(request.args.get("limit", type=int), default=100 if is_admin else 50),
+                slot_id=request.args.get("slot_id", type=int),
+                user_id=request.args.get("user_id", type=int) if is_admin else current_user.id,
+                status=request.args.get("status"),
+                payment_status=request.args.get("payment_status"),
+                start=parse_timestamp(request.args.get("from")),
+                end=parse_timestamp(request.args.get("to")),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        now = datetime.now(UTC)
         return jsonify({
-            "sessions": [
-                {
-                    "id": s.id,
-                    "slot_id": s.slot_id,
-                    "vehicle_plate": s.vehicle_plate,
-                    "user": s.user.username if s.user else None,
-                    "entry_time": s.entry_time.isoformat() if s.entry_time else None,
-                    "exit_time": s.exit_time.isoformat() if s.exit_time else None,
-                    "duration_minutes": s.duration_minutes,
-                    "status": s.status,
-                }
-                for s in sessions
-            ]
+            "next_cursor": next_cursor,
+            "sessions": [_session_json(s, now, with_user=True) for s in sessions],
         })
 
     @main_bp.route("/api/start-session", methods=["POST"])
@@ -170,6 +381,8 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
         if session.fee_amount == 0 and session.status == "completed":
             fee = ParkingService.calculate_fee(session)
             session.fee_amount = fee
+            if session.payment_status == "paid":
+                statistics.revenue_changed(session, fee)
             db.session.commit()
         
         return jsonify({
@@ -199,14 +412,13 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
     @login_required
     def api_get_duration(session_id: int):
         """Get real-time duration for active session."""
-        from database.models import ParkingSession
-        session = ParkingSession.query.get(session_id)
+        session = SessionRepository.get(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
         
         if session.status == "active":
             # Tính duration real-time
-            delta = datetime.now(UTC) - session.entry_time
+            delta = datetime.now(UTC) - as_utc(session.entry_time)
             duration_minutes = int(delta.total_seconds() / 60)
             duration_hours = delta.total_seconds() / 3600
         else:
@@ -228,8 +440,100 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             flash("Bạn không có quyền truy cập.", "error")
             return redirect(url_for("main.dashboard"))
 
-        logs = SystemLog.query.order_by(SystemLog.created_at.desc()).limit(100).all()
-        return render_template("admin/logs.html", logs=logs)
+        event_type = request.args.get("event_type") or None
+        try:
+            logs, next_cursor = LogRepository.page(request.args.get("cursor"), 100, event_type=event_type)
+        except ValueError:
+            logs, next_cursor = LogRepository.page(None, 100, event_type=event_type)
+        return render_template(
+            "admin/logs.html",
+            logs=logs,
+            next_cursor=next_cursor,
+            event_type=event_type,
+            event_types=event_store.event_types(),
+        )
+
+    @main_bp.route("/api/logs")
+    @login_required
+    def api_logs():
+        """Nhật ký sự kiện, mới nhất trước, phân trang keyset (admin only).
+
+        Query: cursor, limit, event_type, from, to (ISO).
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem"}), 403
+
+        try:
+            logs, next_cursor = LogRepository.page(
+                request.args.get("cursor"),
+                page_size(request.args.get("limit", type=int), default=100),
+                event_type=request.args.get("event_type") or None,
+                since=parse_timestamp(request.args.get("from")),
+                until=parse_timestamp(request.args.get("to")),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({"logs": [log.to_dict() for log in logs], "next_cursor": next_cursor})
+
+    @main_bp.route("/api/export/sessions")
+    @login_required
+    def api_export_sessions():
+        """Xuất session dạng CSV/NDJSON theo luồng (admin only).
+
+        Query: format=csv|ndjson, gzip=1, from, to (ISO, theo giờ vào), slot_id,
+        user_id, status, payment_status. Đọc qua pool chỉ-đọc, không giữ khóa ghi.
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xuất dữ liệu"}), 403
+
+        fmt = request.args.get("format", "csv").lower()
+        compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+        try:
+            if fmt not in exports.FORMATS:
+                raise ValueError("format phải là 'csv' hoặc 'ndjson'")
+            records = exports.session_records(
+                reader_for(db.engine) or db.engine,
+                start=parse_timestamp(request.args.get("from")),
+                end=parse_timestamp(request.args.get("to")),
+                slot_id=request.args.get("slot_id", type=int),
+                user_id=request.args.get("user_id", type=int),
+                status=request.args.get("status"),
+                payment_status=request.args.get("payment_status"),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return Response(
+            exports.encode(fmt, exports.SESSION_COLUMNS, records, compress=compress),
+            headers=exports.response_headers("sessions", fmt, compress),
+        )
+
+    @main_bp.route("/api/export/logs")
+    @login_required
+    def api_export_logs():
+        """Xuất nhật ký sự kiện dạng CSV/NDJSON theo luồng (admin only).
+
+        Query: format=csv|ndjson, gzip=1, from, to (ISO), event_type.
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xuất dữ liệu"}), 403
+
+        fmt = request.args.get("format", "csv").lower()
+        compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+        try:
+            if fmt not in exports.FORMATS:
+                raise ValueError("format phải là 'csv' hoặc 'ndjson'")
+            records = exports.log_records(
+                event_store,
+                since=parse_timestamp(request.args.get("from")),
+                until=parse_timestamp(request.args.get("to")),
+                event_type=request.args.get("event_type") or None,
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return Response(
+            exports.encode(fmt, exports.LOG_COLUMNS, records, compress=compress),
+            headers=exports.response_headers("logs", fmt, compress),
+        )
 
     @main_bp.route("/admin/users")
     @login_required
@@ -239,10 +543,33 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             flash("Bạn không có quyền truy cập.", "error")
             return redirect(url_for("main.dashboard"))
 
-        from database.models import User
+        try:
+            users, next_cursor = UserRepository.page(request.args.get("cursor"), 100)
+        except ValueError:
+            users, next_cursor = UserRepository.page(None, 100)
+        return render_template("admin/users.html", users=users, next_cursor=next_cursor)
 
-        users = User.query.order_by(User.created_at.desc()).all()
-        return render_template("admin/users.html", users=users)
+    @main_bp.route("/api/users")
+    @login_required
+    def api_users():
+        """Danh sách user, mới tạo trước, phân trang keyset (admin only).
+
+        Query: cursor, limit, role, active=1|0.
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem"}), 403
+
+        active = request.args.get("active")
+        try:
+            users, next_cursor = UserRepository.page(
+                request.args.get("cursor"),
+                page_size(request.args.get("limit", type=int)),
+                role=request.args.get("role") or None,
+                is_active=None if active is None else active.lower() in ("1", "true", "yes"),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({"users": [u.to_dict() for u in users], "next_cursor": next_cursor})
 
     # ============================================
     # OPERATION MODE API
@@ -274,16 +601,14 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
         if mode not in (OperationMode.AUTO, OperationMode.MANUAL):
             return jsonify({"error": "Invalid mode. Use 'auto' or 'manual'"}), 400
 
-        success = controller.mode_manager.set_mode(
+        # Chuyển chế độ + đồng bộ xuống Arduino (qua RPC nếu đang ở worker web)
+        success = controller.change_mode(
             mode=mode,
             user_id=current_user.id,
             username=current_user.username,
         )
 
         if success:
-            # Đồng bộ chế độ xuống Arduino
-            controller._sync_mode_to_arduino(mode)
-            
             return jsonify({
                 "status": "ok",
                 "mode": mode,
@@ -322,20 +647,20 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
     @main_bp.route("/api/slot/<int:slot_id>", methods=["POST"])
     @login_required
     def api_control_slot(slot_id: int):
-        """Điều khiển slot thủ công (admin only, MANUAL mode)."""
+        """Điều khiển slot thủ công (admin only, MANUAL mode).
+
+        Chính sách Slot 1 (chung với ``/api/control/batch``): được đặt thủ công
+        nhưng chỉ trên state của server, không gửi ``SLOT:1`` xuống Arduino vì
+        Slot 1 do sensor điều khiển - lần đọc sensor kế tiếp sẽ ghi đè.
+        """
         if not current_user.is_admin():
             return jsonify({"error": "Chỉ admin mới có quyền điều khiển slot"}), 403
         
         if not controller:
             return jsonify({"error": "Controller not available"}), 503
         
-        # Slot 1 không thể set manual (từ sensor)
-        if slot_id == 1:
-            return jsonify({"error": "Slot 1 được điều khiển bởi sensor, không thể set manual"}), 400
-        
-        # Chỉ cho phép Slot 2, 3
-        if slot_id < 2 or slot_id > ParkingConfig.TOTAL_SLOTS:
-            return jsonify({"error": f"Slot {slot_id} không hợp lệ. Chỉ có thể set Slot 2, 3"}), 400
+        if slot_id < 1 or slot_id > ParkingConfig.TOTAL_SLOTS:
+            return jsonify({"error": f"Slot {slot_id} không hợp lệ (1-{ParkingConfig.TOTAL_SLOTS})"}), 400
         
         data = request.get_json() or {}
         occupied = data.get("occupied", False)
@@ -349,6 +674,51 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             })
         return jsonify({"error": "Không thể điều khiển slot. Kiểm tra chế độ hoạt động."}), 400
 
+    @main_bp.route("/api/control/batch", methods=["POST"])
+    @login_required
+    def api_control_batch():
+        """Đặt nhiều slot + gate trong một request (admin only, MANUAL mode).
+
+        Body: ``{"slots": [{"slot_id": 2, "occupied": true}, ...], "gate": "open"}``
+        (cả hai đều tùy chọn). Một lần cập nhật state, một lần gửi xuống
+        Arduino; ``results`` cho biết từng mục thành công hay lỗi.
+
+        Slot 1 theo cùng chính sách với ``/api/slot/<id>``: đặt trên state của
+        server, không gửi ``SLOT:1`` (sensor điều khiển, lần đọc sau ghi đè).
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền điều khiển"}), 403
+
+        if not controller:
+            return jsonify({"error": "Controller not available"}), 503
+
+        data = request.get_json(silent=True) or {}
+        items = data.get("slots", [])
+        gate = data.get("gate")
+        if not isinstance(items, list) or not all(isinstance(item, dict) and "slot_id" in item for item in items):
+            return jsonify({"error": "slots phải là danh sách {slot_id, occupied}"}), 400
+        if len(items) > ParkingConfig.TOTAL_SLOTS:
+            return jsonify({"error": f"Tối đa {ParkingConfig.TOTAL_SLOTS} slot mỗi lần"}), 400
+        if not items and gate is None:
+            return jsonify({"error": "Không có lệnh nào (slots hoặc gate)"}), 400
+
+        # slot_id 1-based (1,2,3) => index 0-based như manual_set_slot. slot_id
+        # không phải số nguyên (kể cả true/false) hoặc occupied không phải bool
+        # => giữ nguyên để controller trả lỗi cho riêng mục đó
+        slots = [
+            (_slot_index(item["slot_id"]), item.get("occupied"))
+            for item in items
+        ]
+        outcome = controller.manual_apply_batch(
+            slots=slots,
+            gate=gate.lower() if isinstance(gate, str) else gate,
+            user_id=current_user.id,
+            username=current_user.username,
+        )
+        applied = any(item["ok"] for item in outcome["results"])
+        status = "ok" if outcome["ok"] else "partial" if applied else "error"
+        return jsonify({"status": status, "results": outcome["results"]}), 200 if applied else 400
+
     # ============================================
     # PRICING RULES API (Admin only)
     # ============================================
@@ -360,31 +730,13 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
         if not current_user.is_admin():
             return jsonify({"error": "Chỉ admin mới có quyền xem pricing rules"}), 403
         
-        from database.models import PricingRule
-        rules = PricingRule.query.order_by(PricingRule.priority.desc(), PricingRule.created_at.desc()).all()
-        
-        return jsonify({
-            "rules": [
-                {
-                    "id": r.id,
-                    "name": r.name,
-                    "rule_type": r.rule_type,
-                    "is_active": r.is_active,
-                    "priority": r.priority,
-                    "start_hour": r.start_hour,
-                    "end_hour": r.end_hour,
-                    "days_of_week": r.days_of_week,
-                    "first_hour_fee": r.first_hour_fee,
-                    "subsequent_hour_fee": r.subsequent_hour_fee,
-                    "flat_rate_fee": r.flat_rate_fee,
-                    "overnight_fee": r.overnight_fee,
-                    "user_id": r.user_id,
-                    "description": r.description,
-                    "created_at": r.created_at.isoformat() if r.created_at else None,
-                }
-                for r in rules
-            ]
-        })
+        # Mọi thay đổi rule qua API đều tăng version trong DB (pricing_engine.stage())
+        return conditional_json(
+            "pricing-rules",
+            (pricing_engine.version,),
+            lambda: {"rules": [r.to_dict() for r in PricingRuleRepository.list_all()]},
+            "private, no-cache",
+        )
     
     @main_bp.route("/api/pricing-rules", methods=["POST"])
     @login_required
@@ -415,7 +767,10 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
         )
         
         db.session.add(rule)
+        pricing_engine.stage()
         db.session.commit()
+        pricing_engine.invalidate()
+        repricing_runner.trigger(current_app._get_current_object())
         
         return jsonify({
             "status": "ok",
@@ -466,7 +821,10 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             rule.description = data["description"]
         
         rule.updated_at = datetime.now(UTC)
+        pricing_engine.stage()
         db.session.commit()
+        pricing_engine.invalidate()
+        repricing_runner.trigger(current_app._get_current_object())
         
         return jsonify({
             "status": "ok",
@@ -486,13 +844,187 @@ def init_main_routes(app, state_manager: StateManager, controller=None):
             return jsonify({"error": "Pricing rule không tồn tại"}), 404
         
         db.session.delete(rule)
+        pricing_engine.stage()
         db.session.commit()
+        pricing_engine.invalidate()
+        repricing_runner.trigger(current_app._get_current_object())
         
         return jsonify({
             "status": "ok",
             "message": "Đã xóa pricing rule thành công",
         })
     
+    @main_bp.route("/api/pricing-rules/reprice", methods=["GET"])
+    @login_required
+    def api_reprice_status():
+        """Tiến độ lần tính lại phí gần nhất (admin only)."""
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem"}), 403
+        
+        report = repricing_runner.last_report
+        return jsonify({
+            "running": repricing_runner.is_running(),
+            "report": report.to_dict() if report else None,
+        })
+    
+    @main_bp.route("/api/pricing-rules/reprice", methods=["POST"])
+    @login_required
+    def api_reprice_sessions():
+        """Tính lại phí các session chưa thanh toán theo bảng giá hiện hành (admin only)."""
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền tính lại phí"}), 403
+        
+        repricing_runner.trigger(current_app._get_current_object())
+        return jsonify({
+            "status": "ok",
+            "message": "Đã bắt đầu tính lại phí các session chưa thanh toán",
+        }), 202
+
+    @main_bp.route("/api/pricing-rules/simulate", methods=["POST"])
+    @login_required
+    def api_simulate_pricing():
+        """Thử các bộ pricing rules trên session lịch sử, không đổi phí thật (admin only).
+
+        Body: {"candidates": [{"name": ..., "rules": [...]}], "start": ISO, "end": ISO,
+               "include_current": true, "bins": 10}
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền mô phỏng bảng giá"}), 403
+
+        data = request.get_json() or {}
+        try:
+            start = parse_timestamp(data.get("start"))
+            end = parse_timestamp(data.get("end"))
+            result = run_simulation(
+                data.get("candidates") or [],
+                start=start,
+                end=end,
+                include_current=bool(data.get("include_current", True)),
+                bins=int(data.get("bins", DEFAULT_HISTOGRAM_BINS)),
+            )
+        except (TypeError, ValueError) as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        return jsonify(result)
+
+    @main_bp.route("/api/admin/stats/reconcile", methods=["POST"])
+    @login_required
+    def api_reconcile_stats():
+        """Dựng lại bộ đếm thống kê từ parking_sessions (admin only)."""
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền đối soát thống kê"}), 403
+
+        drift = statistics.reconcile()
+        return jsonify({
+            "status": "ok",
+            "message": "Đã đối soát thống kê",
+            "drift": drift,
+            "statistics": statistics.get_statistics(),
+        })
+
+    @main_bp.route("/api/admin/storage")
+    @login_required
+    def api_storage_stats():
+        """Pragma, kích thước DB/WAL, pool và số liệu checkpoint/vacuum (admin only)."""
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem"}), 403
+
+        info = storage_maintenance.describe(db.engine)
+        info["event_store"] = event_store.describe()
+        return jsonify(info)
+
+    @main_bp.route("/api/reports/usage")
+    @login_required
+    def api_usage_report():
+        """Báo cáo lượt vào/ra, công suất, doanh thu theo giờ/ngày (admin only, chỉ đọc rollup).
+
+        Query: granularity=hour|day, start, end (ISO), slot_id, by_slot=1
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem báo cáo"}), 403
+
+        granularity = request.args.get("granularity", "day")
+        try:
+            end = parse_timestamp(request.args.get("end")) or rollups.utcnow()
+            default_span = timedelta(days=30) if granularity == "day" else timedelta(hours=48)
+            start = parse_timestamp(request.args.get("start")) or end - default_span
+            slot_id = request.args.get("slot_id", type=int)
+            series = rollups.query_usage(
+                granularity, start, end,
+                slot_id=slot_id,
+                by_slot=request.args.get("by_slot", "").lower() in ("1", "true", "yes"),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        watermark = rollups.get_watermark()
+        return jsonify({
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "watermark": watermark.isoformat() if watermark else None,
+            "buckets": series,
+        })
+
+    @main_bp.route("/api/reports/dwell")
+    @login_required
+    def api_dwell_report():
+        """Percentile thời gian đỗ, lượt quay vòng và tỷ lệ lấp đầy (admin only, chỉ đọc sketch/rollup).
+
+        Query: start, end (ISO, mặc định 7 ngày gần nhất), slot_id, hour_of_week=1
+        """
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền xem báo cáo"}), 403
+
+        try:
+            end = parse_timestamp(request.args.get("end")) or rollups.utcnow()
+            start = parse_timestamp(request.args.get("start")) or end - timedelta(days=7)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        if start >= end:
+            return jsonify({"error": "'start' phải trước 'end'"}), 400
+        slot_id = request.args.get("slot_id", type=int)
+
+        dwell = dwell_sketches.window_sketch(start, end, slot_id=slot_id)
+        slots = 1 if slot_id is not None else ParkingConfig.TOTAL_SLOTS
+        days = (end - start).total_seconds() / 86400
+        result = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "slot_id": slot_id,
+            "dwell_minutes": dwell.summary(),
+            # Số lượt ra trung bình mỗi slot mỗi ngày
+            "turnover_per_slot_day": round(dwell.count / slots / days, 2),
+            "occupancy_rate": dwell_sketches.occupancy_sketch(start, end, slot_id=slot_id).summary(),
+        }
+        if request.args.get("hour_of_week", "").lower() in ("1", "true", "yes"):
+            result["hour_of_week"] = dwell_sketches.hour_of_week_summaries(slot_id=slot_id)
+        return jsonify(result)
+
+    @main_bp.route("/api/admin/rollups/backfill", methods=["POST"])
+    @login_required
+    def api_backfill_rollups():
+        """Dựng lại rollup từ một thời điểm (admin only). Body: {"start": ISO} (mặc định: từ đầu)."""
+        if not current_user.is_admin():
+            return jsonify({"error": "Chỉ admin mới có quyền dựng lại rollup"}), 403
+
+        data = request.get_json(silent=True) or {}
+        try:
+            start = rollups.request_backfill(parse_timestamp(data.get("start")))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        if rollups.rollup_job.is_running():
+            rollups.rollup_job.wake()
+            result = None
+        else:
+            result = rollups.run_once()
+        return jsonify({
+            "status": "ok",
+            "message": f"Đã yêu cầu dựng lại rollup từ {start.isoformat()}",
+            "result": result,
+        }), 202 if result is None else 200
+
     @main_bp.route("/admin/pricing")
     @login_required
     def admin_pricing():
@@ -0,0 +1,153 @@
+"""Chạy app bằng waitress (production) với drain êm khi nhận SIGTERM.
+
+Werkzeug ``app.run`` chỉ dành cho phát triển: một process, không giới hạn
+kết nối, và ``sys.exit`` trong signal handler cắt ngang request đang chạy.
+Ở đây:
+
+- ``ServerConfig.THREADS`` thread xử lý request mỗi process, keep-alive được
+  giữ tối đa ``KEEPALIVE_TIMEOUT`` giây khi rảnh
+- ``ServerConfig.WORKERS`` > 1: process controller mở socket lắng nghe rồi
+  chạy thêm worker ``python -m web.wsgi --fd N`` dùng chung socket đó
+  (pre-fork, kernel chia kết nối); worker đọc state từ shared memory và gửi
+  lệnh qua RPC
+- ``drain()``: ngừng nhận kết nối mới, đóng các stream SSE, chờ request đang
+  chạy xong (tối đa ``DRAIN_TIMEOUT`` giây) rồi mới đóng server
+
+waitress là dependency tùy chọn (``pip install waitress``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from config import ServerConfig
+
+try:
+    from waitress.server import create_server
+    from waitress import wasyncore
+except ImportError:  # pragma: no cover
+    create_server = None
+    wasyncore = None
+
+logger = logging.getLogger(__name__)
+
+
+def available() -> bool:
+    return create_server is not None
+
+
+def create_listener(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """Socket lắng nghe dùng chung cho process chính và các worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class GracefulServer:
+    """Server waitress chạy trong thread riêng, dừng bằng ``drain()``."""
+
+    def __init__(
+        self,
+        app,
+        sock: socket.socket,
+        threads: int = ServerConfig.THREADS,
+        connection_limit: int = ServerConfig.CONNECTION_LIMIT,
+        keepalive_timeout: int = ServerConfig.KEEPALIVE_TIMEOUT,
+    ) -> None:
+        if create_server is None:
+            raise RuntimeError("Chế độ production cần waitress: pip install waitress")
+        self.app = app
+        self._map: dict = {}
+        self.server = create_server(
+            app,
+            map=self._map,
+            sockets=[sock],
+            threads=threads,
+            connection_limit=connection_limit,
+            channel_timeout=keepalive_timeout,
+            asyncore_use_poll=True,  # select() giới hạn 1024 fd
+            ident="smart-eparking",
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.run, name="waitress", daemon=True)
+        self._thread.start()
+
+    def _busy(self) -> int:
+        """Số kết nối còn request đang xử lý hoặc dữ liệu chưa gửi xong."""
+        dispatcher = self.server.task_dispatcher
+        busy = len(dispatcher.queue) + dispatcher.active_count
+        for channel in list(self.server.active_channels.values()):
+            if channel.requests or channel.total_outbufs_len:
+                busy += 1
+        return busy
+
+    def drain(self, timeout: float = ServerConfig.DRAIN_TIMEOUT) -> bool:
+        """Ngừng nhận kết nối, chờ request đang chạy xong rồi đóng. True nếu xong trước hạn."""
+        from web.main_routes import close_streams
+
+        self.server.accepting = False
+        close_streams()
+        deadline = time.monotonic() + timeout
+        while self._busy() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        remaining = self._busy()
+        if remaining:
+            logger.warning("Hết thời gian drain, còn %s kết nối đang bận", remaining)
+        self.server.task_dispatcher.shutdown(cancel_pending=True, timeout=1)
+        wasyncore.close_all(self._map)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        return not remaining
+
+
+def spawn_workers(sock: socket.socket, count: int) -> List[subprocess.Popen]:
+    """Chạy ``count`` worker web dùng chung ``sock`` (xem web/wsgi.py)."""
+    fd = sock.fileno()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return [
+        subprocess.Popen([sys.executable, "-m", "web.wsgi", "--fd", str(fd)], pass_fds=(fd,), cwd=root)
+        for _ in range(count)
+    ]
+
+
+def stop_workers(workers: List[subprocess.Popen], timeout: float = ServerConfig.DRAIN_TIMEOUT) -> None:
+    for worker in workers:
+        if worker.poll() is None:
+            worker.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + timeout + 5
+    for worker in workers:
+        try:
+            worker.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            logger.warning("Worker %s không dừng kịp, kill", worker.pid)
+            worker.kill()
+
+
+def wait_for_signal(signals=(signal.SIGTERM, signal.SIGINT)) -> int:
+    """Chặn tới khi nhận một trong ``signals``; trả về số hiệu signal."""
+    received = threading.Event()
+    caught = []
+
+    def _handler(signum, _frame) -> None:
+        caught.append(signum)
+        received.set()
+
+    for signum in signals:
+        signal.signal(signum, _handler)
+    while not received.wait(1.0):
+        pass
+    return caught[0]
@@ -15,8 +15,14 @@ const gateStatusCard = document.getElementById('gate-status-card');
 let lastUpdateTime = null;
 let connectionStatus = 'connecting';
 let updateInterval = null;
+let eventSource = null;
+let liveState = {};
 let fetchErrorCount = 0;
 const MAX_FETCH_ERRORS = 3;
+let serverClockOffset = 0;  // ms: giờ server - giờ trình duyệt
+let arduinoWasConnected = null;
+let arduinoStale = false;
+const ARDUINO_STALE_SECONDS = 10;
 
 // ============================================
 // UTILITY FUNCTIONS
@@ -78,6 +84,49 @@ function formatTime(dateString) {
 // FETCH STATUS
 // ============================================
 
+// Tuổi dữ liệu Arduino (giây), tính từ arduino_last_update theo giờ server
+function arduinoUpdateAge(data) {
+  if (!data.arduino_last_update) return null;
+  const age = (Date.now() + serverClockOffset - Date.parse(data.arduino_last_update)) / 1000;
+  return Math.max(0, age);
+}
+
+// Toast chỉ khi chuyển trạng thái (mất kết nối / ngừng cập nhật), không phải mỗi delta
+function checkArduino(data) {
+  if (data.arduino_connected === undefined) return;
+  if (data.arduino_connected === false) {
+    if (arduinoWasConnected !== false) {
+      showToast('⚠️ Mất kết nối với Arduino', 'error');
+    }
+    arduinoStale = false;
+  } else {
+    const age = arduinoUpdateAge(data);
+    const stale = age !== null && age > ARDUINO_STALE_SECONDS;
+    if (stale && !arduinoStale) {
+      showToast(`⚠️ Arduino không cập nhật trong ${Math.round(age)}s`, 'warning');
+    }
+    arduinoStale = stale;
+  }
+  arduinoWasConnected = data.arduino_connected;
+}
+
+function applyStatus(data) {
+  render(data);
+
+  // Update connection status
+  if (data.arduino_connected === false) {
+    updateConnectionStatus('offline');
+  } else {
+    updateConnectionStatus('online');
+  }
+  checkArduino(data);
+
+  lastUpdateTime = data.last_update;
+
+  // Trang admin/client bổ sung phần riêng (thống kê, chế độ) qua sự kiện này
+  document.dispatchEvent(new CustomEvent('parking:status', { detail: data }));
+}
+
 async function fetchStatus() {
   try {
     const controller = new AbortController();
@@ -97,20 +146,12 @@ async function fetchStatus() {
     }
 
     const data = await res.json();
-    render(data);
-    
-    // Update connection status
-    if (data.arduino_connected) {
-      updateConnectionStatus('online');
-      if (data.arduino_update_age && data.arduino_update_age > 10) {
-        showToast(`⚠️ Arduino không cập nhật trong ${Math.round(data.arduino_update_age)}s`, 'warning');
-      }
-    } else {
-      updateConnectionStatus('offline');
-      showToast('⚠️ Mất kết nối với Arduino', 'error');
+    if (data.arduino_last_update && data.arduino_update_age != null) {
+      serverClockOffset = Date.parse(data.arduino_last_update) + data.arduino_update_age * 1000 - Date.now();
     }
-    
-    lastUpdateTime = data.last_update;
+    liveState = data;
+    applyStatus(data);
+    fetchErrorCount = 0;
 
     return data;
   } catch (err) {
@@ -133,22 +174,61 @@ async function fetchStatus() {
       `;
     }
 
-    // Exponential backoff: tăng delay khi có nhiều lỗi
-    if (fetchErrorCount >= MAX_FETCH_ERRORS) {
-      const backoffDelay = Math.min(5000 * Math.pow(2, fetchErrorCount - MAX_FETCH_ERRORS), 30000);
-      console.warn(`Backoff: đợi ${backoffDelay}ms trước khi retry`);
-      await new Promise(resolve => setTimeout(resolve, backoffDelay));
-    }
-
     return null;
-  } finally {
-    // Reset error count khi thành công
-    if (fetchErrorCount > 0) {
-      fetchErrorCount = 0;
-    }
   }
 }
 
+// ============================================
+// LIVE STREAM (SSE)
+// ============================================
+
+// Server gửi snapshot đầy đủ lúc đầu (event "snapshot"), sau đó chỉ các field
+// thay đổi (event "delta"). Khi mất kết nối, EventSource tự nối lại kèm
+// Last-Event-ID nên chỉ nhận phần còn thiếu.
+function connectStream() {
+  if (!window.EventSource) {
+    startPolling();
+    return;
+  }
+
+  eventSource = new EventSource('/api/stream');
+
+  eventSource.addEventListener('snapshot', (e) => {
+    liveState = JSON.parse(e.data);
+    serverClockOffset = liveState.server_time * 1000 - Date.now();
+    delete liveState.server_time;
+    applyStatus(liveState);
+  });
+
+  eventSource.addEventListener('delta', (e) => {
+    Object.assign(liveState, JSON.parse(e.data));
+    applyStatus(liveState);
+  });
+
+  eventSource.onerror = () => {
+    if (eventSource.readyState === EventSource.CLOSED) {
+      // Server từ chối (ví dụ hết phiên đăng nhập): quay về poll như cũ
+      eventSource = null;
+      startPolling();
+    } else {
+      updateConnectionStatus('connecting');
+    }
+  };
+}
+
+// Dự phòng khi trình duyệt không hỗ trợ SSE: poll /api/status, giãn dần khi lỗi
+function startPolling() {
+  if (updateInterval) return;
+  const poll = async () => {
+    await fetchStatus();
+    const delay = fetchErrorCount >= MAX_FETCH_ERRORS
+      ? Math.min(5000 * Math.pow(2, fetchErrorCount - MAX_FETCH_ERRORS), 30000)
+      : 1000;
+    updateInterval = setTimeout(poll, delay);
+  };
+  poll();
+}
+
 // ============================================
 // RENDER FUNCTIONS
 // ============================================
@@ -181,22 +261,7 @@ function render(data) {
     }`;
   }
 
-  // Update Arduino connection status
-  if (data.arduino_connected !== undefined) {
-    const arduinoStatusEl = document.getElementById('arduino-status');
-    if (arduinoStatusEl) {
-      if (data.arduino_connected) {
-        arduinoStatusEl.innerHTML = `
-          <span style="color: #22c55e;">●</span> Arduino: Kết nối
-          ${data.arduino_update_age ? ` (${Math.round(data.arduino_update_age)}s trước)` : ''}
-        `;
-      } else {
-        arduinoStatusEl.innerHTML = `
-          <span style="color: #ef4444;">●</span> Arduino: Mất kết nối
-        `;
-      }
-    }
-  }
+  renderArduinoStatus(data);
 
   // Update last update time
   if (lastUpdateEl && data.last_update) {
@@ -258,6 +323,23 @@ function render(data) {
   }
 }
 
+function renderArduinoStatus(data) {
+  if (data.arduino_connected === undefined) return;
+  const arduinoStatusEl = document.getElementById('arduino-status');
+  if (!arduinoStatusEl) return;
+  if (data.arduino_connected) {
+    const age = arduinoUpdateAge(data);
+    arduinoStatusEl.innerHTML = `
+      <span style="color: #22c55e;">●</span> Arduino: Kết nối
+      ${age !== null ? ` (${Math.round(age)}s trước)` : ''}
+    `;
+  } else {
+    arduinoStatusEl.innerHTML = `
+      <span style="color: #ef4444;">●</span> Arduino: Mất kết nối
+    `;
+  }
+}
+
 // ============================================
 // MANUAL CONTROL FUNCTIONS
 // ============================================
@@ -288,7 +370,7 @@ async function manualGate(state) {
       if (window.Notification && Notification.permission === 'granted') {
         new Notification(`Barrier ${state === 'open' ? 'đã mở' : 'đã đóng'}`);
       }
-      fetchStatus();
+      if (!eventSource) fetchStatus();
     } else {
       const errorMsg = data.error || 'Không thể điều khiển barrier';
       if (errorMsg.includes('AUTO mode')) {
@@ -332,7 +414,7 @@ async function manualSlot(slotId, occupied) {
       if (window.Notification && Notification.permission === 'granted') {
         new Notification(`Slot ${slotId} ${occupied ? 'có xe' : 'trống'}`);
       }
-      fetchStatus();
+      if (!eventSource) fetchStatus();
     } else {
       const errorMsg = data.error || 'Không thể đặt slot';
       if (errorMsg.includes('AUTO mode')) {
@@ -350,7 +432,8 @@ async function manualSlot(slotId, occupied) {
 }
 
 // Buzzer đã được loại bỏ, thay bằng web notifications
-// async function manualBuzzer(duration = 0.2) {
+/*
+async function manualBuzzer(duration = 0.2) {
   const btn = event?.target;
   if (btn) {
     btn.disabled = true;
@@ -377,6 +460,7 @@ async function manualSlot(slotId, occupied) {
     }
   }
 }
+*/
 
 function refreshData() {
   showToast('Đang làm mới dữ liệu...', 'info');
@@ -448,15 +532,16 @@ render = function (data) {
 // ============================================
 
 function init() {
-  // Initial fetch
-  fetchStatus();
-
   // Setup manual controls
   setupManualControls();
 
-  // Auto-refresh every 1 second
-  updateInterval = setInterval(() => {
-    fetchStatus();
+  // Nhận cập nhật qua SSE (poll /api/status nếu không hỗ trợ)
+  connectStream();
+
+  // Arduino im lặng thì không có delta nào: tự tăng tuổi dữ liệu mỗi giây
+  setInterval(() => {
+    renderArduinoStatus(liveState);
+    checkArduino(liveState);
   }, 1000);
 
   // Check connection health
@@ -483,7 +568,10 @@ if (document.readyState === 'loading') {
 
 // Cleanup on page unload
 window.addEventListener('beforeunload', () => {
+  if (eventSource) {
+    eventSource.close();
+  }
   if (updateInterval) {
-    clearInterval(updateInterval);
+    clearTimeout(updateInterval);
   }
 });
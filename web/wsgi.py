@@ -0,0 +1,67 @@
+"""WSGI entry cho worker web chạy ở process riêng (nhiều worker trên 4 core).
+
+``main.py`` vẫn là process duy nhất giữ cổng serial và ``StateManager``; nó ghi
+mỗi version state vào shared memory (xem core/shared_state.py). Module này tạo
+app trên ``SharedStateView`` chỉ-đọc, nên ``/status``, ``/api/status`` và
+``/api/stream`` được phục vụ song song mà không cần controller. Lệnh điều
+khiển (gate, slot, mode) được gửi tới controller qua Unix socket (core/rpc.py).
+
+Thường được ``python main.py --production`` chạy tự động (``WEB_WORKERS`` > 1)
+với socket lắng nghe dùng chung: ``python -m web.wsgi --fd N``. Cũng có thể
+dùng server WSGI khác khi ``main.py`` đang chạy, ví dụ::
+
+    gunicorn -w 4 -b 0.0.0.0:8000 'web.wsgi:app'
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+
+from config import ServerConfig
+from core.rpc import ControllerClient
+from core.shared_state import SharedControllerView, SharedStateView
+from web.app import create_app
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # pragma: no cover
+    load_dotenv = None
+
+
+def create_worker_app():
+    """App Flask cho một worker, gắn vào segment state của process controller."""
+    if load_dotenv:
+        load_dotenv()
+    view = SharedStateView(os.getenv("SHARED_STATE_NAME") or ServerConfig.SHARED_STATE_NAME)
+    commands = ControllerClient(os.getenv("CONTROLLER_SOCKET") or ServerConfig.RPC_SOCKET)
+    return create_app(view, controller=SharedControllerView(view, commands=commands))
+
+
+app = create_worker_app()
+
+
+def main() -> int:
+    """Worker do process controller chạy: phục vụ trên socket kế thừa, drain khi SIGTERM."""
+    from utils.logger import configure_logging
+    from web.server import GracefulServer, wait_for_signal
+
+    parser = argparse.ArgumentParser(description="Worker web dùng chung socket với process controller")
+    parser.add_argument("--fd", type=int, required=True, help="File descriptor của socket lắng nghe")
+    args = parser.parse_args()
+
+    configure_logging(level=os.getenv("LOG_LEVEL"))
+    sock = socket.socket(fileno=args.fd)
+    threads = int(os.getenv("WEB_THREADS") or ServerConfig.THREADS)
+    server = GracefulServer(app, sock, threads=threads)
+    server.start()
+    logging.info("Worker web %s sẵn sàng (%s thread)", os.getpid(), threads)
+    wait_for_signal()
+    server.drain()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())